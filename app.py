@@ -1,19 +1,49 @@
+from startup import StartupReport
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import plotly.express as px
-from scipy.signal import savgol_filter
-from scipy.interpolate import griddata
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output
-from dash import State
+from dash import State, Patch, ClientsideFunction
 from dash import callback_context
 import dash_bootstrap_components as dbc
-import trimesh
+import functools
+import logging
+import os
 import time
 from page import get_css, get_html_layout
+from ingest import ingest_telemetry
+from bundle import (
+    Bundle,
+    derivatives_frame,
+    sensor_frame,
+    sensor_rates,
+    stats_frame,
+    temperature_columns,
+)
+from casing import CASING_FILE, MAX_FACES, casing_lods, mesh_payload
+from compression import gzip_responses
+from derivatives import DERIV_WINDOW
+from events import describe, event_index
+from figure_cache import FigureCache
+from figure_patch import patch_3d_figure, trace_mask_key
+from frame_cube import FrameCube
+from interpolation import get_operator, grid_bounds
+from metrics import PHASES, CallbackMetrics, mark
+from playback import PLAYBACK_STEP, encode_block
+from profiling import CallbackProfiler
+from pyramid import MinMaxPyramid, zoom_window
+from sensors import SensorLayout
+from run_cache import load_run, run_values
+
+# Startup phases (imports, data load, mesh load, stats, frame cube, layout) are
+# logged and served as JSON on /_startup with the time to the first page. scipy and
+# trimesh are imported on first use: on a warm cache the dashboard starts without them
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+startup = StartupReport("dashboard")
+startup.mark("imports")
+
 # Initialize the Dash app with enhanced styling
 app = dash.Dash(
     __name__,
@@ -26,234 +56,273 @@ app = dash.Dash(
 
 server = app.server
 
-# Load the data from CSV
-data = pd.read_csv("data/endurance.csv")
-
-# Pre - processing
-if "D4 DC Bus Current" in data.columns and "D1 DC Bus Voltage" in data.columns:
-    data["POWER"] = data["D4 DC Bus Current"] * data["D1 DC Bus Voltage"]
-if "D4 DC Bus Current" in data.columns and "D1 DC Bus Voltage" in data.columns:
-    pack_internal_resistance = 0.017 / 8  # Ohms
-    data["THERMAL LOSS (W)"] = (
-        data["D4 DC Bus Current"] ** 2
-    ) * pack_internal_resistance
-if "Time" in data.columns:
-    data["Time"] = pd.to_datetime(data["Time"])
-
-data = data.iloc[::100].reset_index(drop=True)
-
-# Load the battery casing mesh
-battery_mesh = trimesh.load_mesh("stl/cassing.glb")
-battery_mesh.apply_transform(
-    trimesh.transformations.rotation_matrix(np.radians(-90), [0, 0, 1])
+# Responses gzipped for the browsers accepting it, HEATMAP_GZIP_LEVEL=0 disables it
+gzip_responses(server, level=int(os.environ.get("HEATMAP_GZIP_LEVEL", 5)))
+
+# Time, time split (compute / figure build / serialization / cache parsing), response
+# size and figure cache hits of the 3D, trend and playback callbacks, served in the
+# Prometheus text format on /metrics and shown in a debug panel below the graphs
+# with HEATMAP_DEBUG_PANEL=1
+callback_metrics = CallbackMetrics()
+callback_metrics.register(server)
+DEBUG_PANEL = os.environ.get("HEATMAP_DEBUG_PANEL") == "1"
+
+# On-demand profiling, only hooked with HEATMAP_PROFILE_DIR: /_profile/arm?callback=
+# update_3d_graph&count=5 runs the next 5 requests of the callback under cProfile
+# (&memory=1 adds tracemalloc), the .pstats and .speedscope.json files written to
+# the directory are listed on /_profile and downloaded from /_profile/<file>
+PROFILE_DIR = os.environ.get("HEATMAP_PROFILE_DIR") or None
+if PROFILE_DIR:
+    CallbackProfiler(PROFILE_DIR).register(app)
+
+# Load the data from CSV: streamed in float32 chunks, derived columns computed and
+# rows decimated chunk by chunk, through the columnar run cache (rebuilt when the CSV changes)
+# The decimation is picked at startup: HEATMAP_DECIMATION=minmax|lttb|stride and
+# HEATMAP_DECIMATION_STEP (rows reduction factor). minmax keeps every bucket's
+# extremes so thermal spikes and power peaks are not dropped.
+# With HEATMAP_BUNDLE=<directory>, every array of the run is mapped from a bundle
+# written by bundle.py instead, with the decimation it was built with.
+DATA_FILE = "data/endurance.csv"
+BUNDLE_DIR = os.environ.get("HEATMAP_BUNDLE") or None
+bundle = Bundle(BUNDLE_DIR) if BUNDLE_DIR else None
+if bundle:
+    DECIMATION_MODE = bundle.manifest["decimation"]["mode"]
+    DECIMATION_STEP = bundle.manifest["decimation"]["step"]
+else:
+    DECIMATION_MODE = os.environ.get("HEATMAP_DECIMATION", "minmax")
+    DECIMATION_STEP = int(os.environ.get("HEATMAP_DECIMATION_STEP", 100))
+DATA_LABEL = os.path.splitext(os.path.basename(DATA_FILE))[0]
+RUN_VARIANT = f"{DECIMATION_MODE}{DECIMATION_STEP}"
+
+# One pass over the CSV gives both cache entries, only done on a cache miss
+ingested = {}
+
+
+def ingest_once():
+    if not ingested:
+        ingested["runs"] = ingest_telemetry(DATA_FILE, DECIMATION_STEP, DECIMATION_MODE)
+    return ingested["runs"]
+
+
+# An entry of the run: mapped from the bundle, or from the run cache of DATA_FILE
+# (built by `build` on a miss)
+def load_entry(name, build, variant):
+    if bundle:
+        return bundle.entry(name)
+    return load_run(DATA_FILE, build=build, label=DATA_LABEL, variant=variant)
+
+
+data = load_entry("run", lambda: ingest_once()[0], RUN_VARIANT)
+
+# Full rate trend channels (pack min/avg/max, fan, power, SOC) as a min/max pyramid,
+# zooming a trend graph loads the level of detail matching the visible window
+trends = load_entry("trends", lambda: ingest_once()[1], "trends")
+trend_pyramid = MinMaxPyramid.load(
+    np.arange(len(trends)) / DECIMATION_STEP,
+    run_values(trends),
+    trends.columns,
+    trends.attrs["run_cache"]["path"],
+)
+startup.mark("data load")
+
+# Rendering of the 3D slices (HEATMAP_3D_RENDER): "mesh" merges every slice face in
+# one Mesh3d and every sensor in one Scatter3d, "surfaces" draws two Surface and one
+# Scatter3d per slice
+RENDER_MODE = os.environ.get("HEATMAP_3D_RENDER", "mesh")
+
+# Battery casing mesh, simplified once into levels of detail (HEATMAP_CASING_FACES
+# faces for the finest one) and cached on disk
+CASING_FACES = int(os.environ.get("HEATMAP_CASING_FACES", MAX_FACES))
+casing_levels = (bundle and bundle.casing_levels()) or casing_lods(
+    CASING_FILE, CASING_FACES
 )
-scale_factor = 0.036  # Adjust as needed to fit your unit scale
-battery_mesh.apply_scale(scale_factor)
-translation_vector = [0, 20.0, 0]
-battery_mesh.apply_translation(translation_vector)
-vertices = battery_mesh.vertices
-faces = battery_mesh.faces
-mesh_x, mesh_y, mesh_z = vertices.T
-mesh_i, mesh_j, mesh_k = faces.T
-
-# Y,Z coordinates of sensors in a module (16 sensors)
-map_module = [
-    (18.5, 5),
-    (16, 2),
-    (17, 7),
-    (13.5, 1),
-    (15, 7),
-    (12, 2),
-    (10, 2),
-    (13, 7),
-    (11, 6),
-    (9, 2),
-    (13.5, 7),
-    (11.5, 3),
-    (12.5, 1),
-    (15, 6),
-    (15, 2),
-    (17, 6),
-    (2.5, 5),
-    (0.5, 1),
-    (5, 6),
-    (3, 2),
-    (7.5, 7),
-    (5.5, 3),
-    (6.5, 1),
-    (8.5, 5),
-    (10, 6),
-    (7.5, 1),
-    (9, 7),
-    (5.5, 1),
-    (3.5, 1),
-    (5.5, 5),
-    (1.5, 1),
-    (5, 7),
-]
+startup.mark("mesh load")
 
 num_sensors = len(data.columns) - 1  # -1 to exclude the "Time" column
 num_timestamps = data.shape[0]
 
 # Get temperature columns (exclude non-temperature columns)
-temp_columns = [
-    col for col in data.columns if col.startswith("Module_") and "Group" in col
-]
+temp_columns = temperature_columns(data)
 power_columns = [col for col in data.columns if "POWER" in col.upper()]
 
-# Initialize a NumPy array to store temperatures
-temperatures = np.zeros((num_timestamps, len(temp_columns)))
-
-# Initialize empty lists for coordinates X, Y, Z and temperature of each sensor in the order of columns in the CSV
-x = []
-y = []
-z = []
-module_numbers = []
-x_convert = [2.5, 5.0, 7.5, 10.0, 12.5, 15.0]  # 6 modules spread across 0-15 range
-# x_convert = [1,3,15,12,6,0]
-
-
-for idx, col_name in enumerate(temp_columns):
-    i_split = col_name.split("_")
-    module = int(i_split[1]) if i_split[1] != "-1" else -1
-    sensor = int(i_split[2][5:])  # Extract sensor number from "Group6" -> 6
-    value = i_split[3][-1]  # Extract "1" or "2" to differentiate
-
-    if module == -1:
-        temperatures[:, idx] = data[col_name].values
-        continue
-
-    x_coord = x_convert[module]
-    try:
-        if module in [0, 1, 2]:
-            y_coord, z_coord = map_module[sensor - 1]
-        else:
-            y_coord, z_coord = map_module[sensor - 1]
-    except IndexError:
-        print(f"[Warning] Invalid sensor index: sensor={sensor}")
-        continue
-
-    x.append(x_coord)
-    y.append(y_coord)
-    z.append(z_coord)
-    module_numbers.append(module)
-
-    temperatures[:, idx] = data[col_name].values
-
-
-# Calculate temperature statistics for each timestamp
-def calculate_temp_stats():
-    temp_stats = []
-    for i in range(num_timestamps):
-        valid_temps = temperatures[i][temperatures[i] > 0]
-        if len(valid_temps) > 0:
-            temp_stats.append(
-                {
-                    "min_temp": np.min(valid_temps),
-                    "max_temp": np.max(valid_temps),
-                    "avg_temp": np.mean(valid_temps),
-                    "timestamp": i,
-                }
-            )
-        else:
-            temp_stats.append(
-                {"min_temp": 0, "max_temp": 0, "avg_temp": 0, "timestamp": i}
-            )
-    return pd.DataFrame(temp_stats)
-
+# Every array of the run below is a cache entry memory-mapped read-only: gunicorn
+# workers share the pages of one copy (see gunicorn.conf.py), the first one to start
+# builds the missing entries under a file lock while the others wait for it.
+# Temperatures of the placed sensors only (one column per sensor of the layout, in
+# layout order)
+layout = SensorLayout(temp_columns)
+sensor_columns = [temp_columns[i] for i in layout.column_index]
+if bundle:
+    bundle.check_layout(layout)
+sensors = load_entry(
+    "sensors",
+    lambda: sensor_frame(data, sensor_columns),
+    f"{RUN_VARIANT}_sensors",
+)
+sensor_temperatures = run_values(sensors)
+
+# Temperature statistics for each timestamp (pack min/max/avg/percentiles, readings
+# <= 0 missing), per module (module_<m>_<stat> columns) and the fan speed based on
+# the max temperature, in a few masked reductions
+temp_stats_df = load_entry(
+    "stats",
+    lambda: stats_frame(data, temp_columns, sensor_temperatures, layout.module),
+    f"{RUN_VARIANT}_stats",
+)
 
-temp_stats_df = calculate_temp_stats()
+# Temperature rates in °C/s (Savitzky-Golay derivative over the Time axis) of the
+# pack min/avg/max, of each module and of each sensor
+derivatives = load_entry(
+    "derivatives",
+    lambda: derivatives_frame(data, sensor_temperatures, sensor_columns, temp_stats_df),
+    f"{RUN_VARIANT}_deriv{DERIV_WINDOW}",
+)
 
-# Calculate fan speed based on max temperature
-max_temp = temp_stats_df["max_temp"]
-fan_speed = []
-for temp in max_temp:
-    if temp < 35:
-        fan_speed.append(0.0)
-    elif 35 <= temp < 50:
-        fan_speed.append((temp - 35) / 15 * 70.0)
-    else:
-        fan_speed.append(70.0)
-data["fan_speed"] = fan_speed
+# Thermal events of the run (threshold crossings, fastest heating, hottest sensors,
+# large spread), listed in the control panel to jump the time slider to them
+if bundle:
+    thermal_events = bundle.events()
+else:
+    thermal_events = event_index(
+        sensor_temperatures,
+        sensor_columns,
+        layout.module,
+        temp_stats_df,
+        sensor_rates(derivatives, len(sensor_columns)),
+    )
+startup.mark("stats")
 
 
 # Function to create interpolation grid with added width
-def create_interpolation_grid(x_val, points_y, points_z, temp_values, width=1.5):
-    y_min, y_max = min(points_y), max(points_y)
-    z_min, z_max = min(points_z), max(points_z)
+# The interpolation operator of a slice layout is built once and reused, so a frame
+# is a single matrix-vector product instead of a new triangulation
+def create_interpolation_grid(
+    x_val, points_y, points_z, temp_values, width=1.5, bounds=None, valid=None
+):
+    grid_y, grid_z, operator = get_operator(
+        points_y, points_z, bounds=bounds, valid=valid
+    )
+    if valid is not None:
+        temp_values = np.asarray(temp_values)[valid]
+    grid_temp = operator(temp_values)
 
-    grid_y, grid_z = np.mgrid[y_min:y_max:30j, z_min:z_max:30j]
+    return grid_y, grid_z, grid_temp, width
 
-    points = np.column_stack((points_y, points_z))
-    grid_temp = griddata(points, temp_values, (grid_y, grid_z), method="cubic")
 
-    return grid_y, grid_z, grid_temp, width
+# Interpolated grids of every frame of the full height slices, batched once per run
+# and memory-mapped next to the run cache entry (HEATMAP_CUBE_DTYPE=float16|float32)
+z_top = layout.z_top
+frame_cube = FrameCube.load(
+    sensor_temperatures,
+    layout.y,
+    layout.z,
+    layout.slices(),
+    data.attrs["run_cache"]["path"],
+    dtype=np.dtype(
+        bundle.manifest["cube_dtype"]
+        if bundle
+        else os.environ.get("HEATMAP_CUBE_DTYPE", "float16")
+    ),
+)
+startup.mark("frame cube")
+
+
+# Serialized 3D and trend figures of this run, bounded to HEATMAP_FIGURE_CACHE_MB in
+# memory, shared through HEATMAP_FIGURE_CACHE_DIR between workers and restarts (up
+# to HEATMAP_FIGURE_CACHE_DIR_MB)
+figure_cache = FigureCache(
+    max_bytes=int(float(os.environ.get("HEATMAP_FIGURE_CACHE_MB", 128)) * (1 << 20)),
+    directory=os.environ.get("HEATMAP_FIGURE_CACHE_DIR") or None,
+    max_disk_bytes=int(
+        float(os.environ.get("HEATMAP_FIGURE_CACHE_DIR_MB", 1024)) * (1 << 20)
+    ),
+    namespace="|".join(
+        (
+            data.attrs["run_cache"]["key"],
+            RENDER_MODE,
+            str(frame_cube.cube.dtype),
+        )
+    ),
+)
 
 
 # Define the layout of the app
 app.index_string = get_css()
-app.layout = get_html_layout(num_timestamps, z)
+app.layout = get_html_layout(num_timestamps, layout.z.tolist(), DEBUG_PANEL)
+startup.mark("layout")
+startup.register(server)
+
+
+# Triangles of a size x size grid (two per cell), as vertex indices into the grid
+@functools.lru_cache(maxsize=8)
+def grid_triangles(size):
+    cells = np.arange(size * size).reshape(size, size)[:-1, :-1].ravel()
+    v00, v01, v10, v11 = cells, cells + 1, cells + size, cells + size + 1
+    return np.concatenate(
+        (np.column_stack((v00, v10, v11)), np.column_stack((v00, v11, v01)))
+    )
 
 
+# All the slice faces as one Mesh3d: the front and back grids of every slice are
+# consecutive blocks of vertices colored by intensity, the triangles touching a
+# grid point outside the sensors are left out
+def slices_mesh(slices, temp_min, temp_max, opacity, meta=None):
+    xs, ys, zs, intensity, valid, triangles = [], [], [], [], [], []
+    offset = 0
+    for x_pos, grid_y, grid_z, grid_temp, width in slices:
+        n_points = grid_y.size
+        for x_face in (x_pos - width / 2, x_pos + width / 2):
+            xs.append(np.full(n_points, x_face))
+            ys.append(grid_y.ravel())
+            zs.append(grid_z.ravel())
+            intensity.append(grid_temp.ravel())
+            valid.append(~np.isnan(grid_temp.ravel()))
+            triangles.append(grid_triangles(grid_y.shape[0]) + offset)
+            offset += n_points
+
+    # Sent as float32 / uint16 typed arrays, half the size of float64 / int32
+    valid = np.concatenate(valid)
+    triangles = np.concatenate(triangles)
+    triangles = triangles[valid[triangles].all(axis=1)]
+    triangles = triangles.astype(np.uint16 if offset <= 1 << 16 else np.uint32)
+    intensity = np.concatenate(intensity).astype(np.float32)
+    return go.Mesh3d(
+        x=np.concatenate(xs).astype(np.float32),
+        y=np.concatenate(ys).astype(np.float32),
+        z=np.concatenate(zs).astype(np.float32),
+        i=triangles[:, 0],
+        j=triangles[:, 1],
+        k=triangles[:, 2],
+        intensity=np.where(valid, intensity, temp_min),
+        intensitymode="vertex",
+        colorscale="Jet",
+        cmin=temp_min,
+        cmax=temp_max,
+        opacity=opacity,
+        showscale=True,
+        colorbar=dict(title="Temperature (°C)", lenmode="fraction", len=0.75),
+        flatshading=True,
+        hoverinfo="skip",
+        name="Module slices",
+        meta=meta,
+    )
 
-# Define callback to update the 3D graph
-@app.callback(
-    Output("battery-3d-graph", "figure"),
-    [
-        Input("time-slider", "value"),
-        Input("z-slider", "value"),
-        Input("module-slider", "value"),
-        Input("opacity-slider", "value"),
-        Input("toggle-casing", "value"),
-    ],
-)
-def update_3d_graph(time_index, z_max, module_range, opacity, toggle_casing):
-    x_min, x_max = module_range
 
+# Build the 3D figure of one frame (sensor slices only, the casing is added in the browser)
+def build_3d_figure(time_index, z_max, module_range, opacity):
     # Create a new figure
     fig = make_subplots(specs=[[{"type": "scene"}]])
 
-    # Filter valid coordinates (exclude Module_-1)
-    valid_coords = [
-        (i, x_val, y_val, z_val)
-        for i, (x_val, y_val, z_val) in enumerate(zip(x, y, z))
-        if x_val is not None and y_val is not None and z_val is not None
-    ]
-
-    if not valid_coords:
-        return fig
-
-    valid_indices, valid_x, valid_y, valid_z = zip(*valid_coords)
-
-    # Filter points within the X range - need to account for the width offset
-    # Since sensors can be offset by +/- 0.75, we need to include those in the range
-    mask_x = (np.array(valid_x) >= (x_min - 1.0)) & (np.array(valid_x) <= (x_max + 1.0))
-
-    # Get unique X coordinates in the range (group nearby X values)
-    filtered_x = np.array(valid_x)[mask_x]
-    if len(filtered_x) > 0:
-        # Group X coordinates that are close together (within 1.5 units)
-        unique_x = []
-        sorted_x = np.sort(np.unique(filtered_x))
-        for x_val in sorted_x:
-            if not unique_x or abs(x_val - unique_x[-1]) > 1.5:
-                unique_x.append(x_val)
-        unique_x = np.array(unique_x)
-    else:
-        unique_x = np.array([])
+    # Sensors and slices of the module range, precomputed by the layout (slices
+    # include the sensors up to 1.0 unit away from their X position)
+    frame_temps = sensor_temperatures[time_index]
 
     # For temperature colorscale
-    valid_temp_indices = [
-        valid_indices[i] for i in range(len(valid_indices)) if mask_x[i]
-    ]
-    if valid_temp_indices:
-        filtered_temps = temperatures[time_index][valid_temp_indices]
-        filtered_temps = filtered_temps[filtered_temps > 0]
-        if len(filtered_temps) > 0:
-            temp_min = np.min(filtered_temps)
-            temp_max = np.max(filtered_temps)
-        else:
-            temp_min, temp_max = 20, 50
+    filtered_temps = frame_temps[layout.sensors(module_range)]
+    filtered_temps = filtered_temps[filtered_temps > 0]
+    if len(filtered_temps) > 0:
+        temp_min = float(np.min(filtered_temps))
+        temp_max = float(np.max(filtered_temps))
     else:
         temp_min, temp_max = 20, 50
 
@@ -261,131 +330,181 @@ def update_3d_graph(time_index, z_max, module_range, opacity, toggle_casing):
     temp_min = min(temp_min, 20)
     temp_max = max(temp_max, 50)
 
-    # For each unique X coordinate (module position)
-    for x_pos in unique_x:
-        # Create mask for this X position - include sensors within 1.0 unit of this position
-        position_mask = (
-            mask_x
-            & (np.abs(np.array(valid_x) - x_pos) <= 1.0)
-            & (np.array(valid_z) <= z_max)
-        )
-
-        if np.any(position_mask):
+    # Interpolated grid (or None) and valid sensors of each slice (module position)
+    slices = []
+    for x_pos, slice_indices in layout.slices(module_range, z_max):
+        if len(slice_indices):
             # Get points for this slice
-            slice_indices = [
-                valid_indices[i] for i in range(len(valid_indices)) if position_mask[i]
-            ]
-            points_y = np.array(valid_y)[position_mask]
-            points_z = np.array(valid_z)[position_mask]
-            temps = temperatures[time_index][slice_indices]
+            points_y = layout.y[slice_indices]
+            points_z = layout.z[slice_indices]
+            temps = frame_temps[slice_indices]
+            # The grid spans every sensor of the slice, dropped ones included
+            bounds = grid_bounds(points_y, points_z)
 
             # Filter out invalid temperatures
             valid_temp_mask = temps > 0
+            slice_y, slice_z, slice_temps = points_y, points_z, temps
             if np.any(valid_temp_mask):
                 points_y = points_y[valid_temp_mask]
                 points_z = points_z[valid_temp_mask]
                 temps = temps[valid_temp_mask]
 
+                grid = None
                 # Create interpolation grid with width
                 if len(points_y) > 3:  # Need at least 4 points for interpolation
-                    grid_y, grid_z, grid_temp, width = create_interpolation_grid(
-                        x_pos, points_y, points_z, temps
-                    )
-
-                    # Remove NaN values (outside the convex hull of the input points)
-                    mask_valid = ~np.isnan(grid_temp)
-
-                    if np.any(mask_valid):
-                        # Create multiple surfaces with width (front and back faces)
-                        half_width = width / 2
-
-                        # Front surface
-                        x_grid_front = np.full_like(grid_y, x_pos - half_width)
-                        z_grid_masked = np.where(mask_valid, grid_z, np.nan)
-
-                        fig.add_trace(
-                            go.Surface(
-                                x=x_grid_front,
-                                y=grid_y,
-                                z=z_grid_masked,
-                                surfacecolor=grid_temp,
-                                colorscale="Jet",
-                                cmin=temp_min,
-                                cmax=temp_max,
-                                opacity=opacity,
-                                showscale=True,
-                                colorbar=dict(
-                                    title="Temperature (°C)",
-                                    lenmode="fraction",
-                                    len=0.75,
-                                ),
-                                name=f"Module {x_pos} Front",
-                            )
+                    slot = frame_cube.slot(x_pos) if z_max >= z_top else None
+                    if slot is not None:
+                        # Full height slice: the frame is already in the run cube
+                        grid_y, grid_z = frame_cube.grid(slot)
+                        grid_temp = frame_cube.frame(time_index, slot)
+                        width = 1.5
+                    else:
+                        # Operator cached per slice and valid sensor mask
+                        grid_y, grid_z, grid_temp, width = create_interpolation_grid(
+                            x_pos,
+                            slice_y,
+                            slice_z,
+                            slice_temps,
+                            bounds=bounds,
+                            valid=valid_temp_mask,
                         )
 
-                        # Back surface
-                        x_grid_back = np.full_like(grid_y, x_pos + half_width)
-
-                        fig.add_trace(
-                            go.Surface(
-                                x=x_grid_back,
-                                y=grid_y,
-                                z=z_grid_masked,
-                                surfacecolor=grid_temp,
-                                colorscale="Jet",
-                                cmin=temp_min,
-                                cmax=temp_max,
-                                opacity=opacity,
-                                showscale=False,  # Only show colorbar once
-                                name=f"Module {x_pos} Back",
-                            )
+                    # Remove NaN values (outside the convex hull of the input points)
+                    if np.any(~np.isnan(grid_temp)):
+                        grid = (
+                            grid_y.astype(np.float32),
+                            grid_z.astype(np.float32),
+                            grid_temp.astype(np.float32),
+                            width,
                         )
 
-                # Add scatter points for actual sensor positions with larger markers
-                fig.add_trace(
-                    go.Scatter3d(
-                        x=[x_pos] * len(points_y),
-                        y=points_y,
-                        z=points_z,
-                        mode="markers",
-                        marker=dict(
-                            size=8,  # Increased marker size
-                            color=temps,
-                            colorscale="Jet",
-                            cmin=temp_min,
-                            cmax=temp_max,
-                            showscale=False,
-                            line=dict(width=2, color="black"),  # Add border to markers
-                        ),
-                        text=[f"{t:.1f} °C" for t in temps],  # Tooltip text
-                        hoverinfo="text",  # Only show the temperature
-                        showlegend=False,
-                        name=f"Sensors {x_pos}",
+                # Figure arrays are sent as float32 typed arrays
+                slices.append(
+                    (
+                        x_pos,
+                        points_y.astype(np.float32),
+                        points_z.astype(np.float32),
+                        temps.astype(np.float32),
+                        grid,
                     )
                 )
 
-    # Set the layout
-    camera = dict(
-        up=dict(x=0, y=0, z=1), center=dict(x=0, y=0, z=0), eye=dict(x=1.5, y=-1.5, z=1)
-    )
+    # The frame values are ready, the rest builds the figure
+    mark("compute")
+
+    if RENDER_MODE == "mesh":
+        # One Mesh3d for every slice face and one Scatter3d for every sensor
+        meshed = [(x_pos, *grid) for x_pos, *_, grid in slices if grid is not None]
+        if meshed:
+            # meta names every slice of the view, for the clientside playback
+            meta = [
+                f"Module {x_pos}" for x_pos, _ in layout.slices(module_range, z_max)
+            ]
+            fig.add_trace(slices_mesh(meshed, temp_min, temp_max, opacity, meta))
+        if slices:
+            fig.add_trace(
+                go.Scatter3d(
+                    x=np.concatenate(
+                        [np.full(len(s[1]), s[0], dtype=np.float32) for s in slices]
+                    ),
+                    y=np.concatenate([s[1] for s in slices]),
+                    z=np.concatenate([s[2] for s in slices]),
+                    mode="markers",
+                    marker=dict(
+                        size=8,
+                        color=np.concatenate([s[3] for s in slices]),
+                        colorscale="Jet",
+                        cmin=temp_min,
+                        cmax=temp_max,
+                        showscale=False,
+                        line=dict(width=2, color="black"),
+                    ),
+                    hovertemplate="%{marker.color:.1f} °C<extra></extra>",
+                    showlegend=False,
+                    name="Sensors",
+                )
+            )
 
-    # Add battery mesh
-    if toggle_casing:
+    # One Surface per slice face and one Scatter3d per slice
+    surface_slices = [] if RENDER_MODE == "mesh" else slices
+    for x_pos, points_y, points_z, temps, grid in surface_slices:
+        if grid is not None:
+            grid_y, grid_z, grid_temp, width = grid
+            mask_valid = ~np.isnan(grid_temp)
+
+            # Create multiple surfaces with width (front and back faces)
+            half_width = width / 2
+
+            # Front surface
+            x_grid_front = np.full_like(grid_y, x_pos - half_width)
+            z_grid_masked = np.where(mask_valid, grid_z, np.nan)
+
+            fig.add_trace(
+                go.Surface(
+                    x=x_grid_front,
+                    y=grid_y,
+                    z=z_grid_masked,
+                    surfacecolor=grid_temp,
+                    colorscale="Jet",
+                    cmin=temp_min,
+                    cmax=temp_max,
+                    opacity=opacity,
+                    showscale=True,
+                    colorbar=dict(
+                        title="Temperature (°C)",
+                        lenmode="fraction",
+                        len=0.75,
+                    ),
+                    name=f"Module {x_pos} Front",
+                )
+            )
+
+            # Back surface
+            x_grid_back = np.full_like(grid_y, x_pos + half_width)
+
+            fig.add_trace(
+                go.Surface(
+                    x=x_grid_back,
+                    y=grid_y,
+                    z=z_grid_masked,
+                    surfacecolor=grid_temp,
+                    colorscale="Jet",
+                    cmin=temp_min,
+                    cmax=temp_max,
+                    opacity=opacity,
+                    showscale=False,  # Only show colorbar once
+                    name=f"Module {x_pos} Back",
+                )
+            )
+
+        # Add scatter points for actual sensor positions with larger markers
         fig.add_trace(
-            go.Mesh3d(
-                x=mesh_x,
-                y=mesh_y,
-                z=mesh_z,
-                i=mesh_i,
-                j=mesh_j,
-                k=mesh_k,
-                color="lightgray",
-                opacity=0.40,
-                name="Battery Case",
-                showscale=False,
+            go.Scatter3d(
+                x=np.full(len(points_y), x_pos, dtype=np.float32),
+                y=points_y,
+                z=points_z,
+                mode="markers",
+                marker=dict(
+                    size=8,  # Increased marker size
+                    color=temps,
+                    colorscale="Jet",
+                    cmin=temp_min,
+                    cmax=temp_max,
+                    showscale=False,
+                    line=dict(width=2, color="black"),  # Add border to markers
+                ),
+                # Tooltip with only the temperature, formatted by plotly.js
+                hovertemplate="%{marker.color:.1f} °C<extra></extra>",
+                showlegend=False,
+                name=f"Sensors {x_pos}",
             )
         )
 
+    # Set the layout
+    camera = dict(
+        up=dict(x=0, y=0, z=1), center=dict(x=0, y=0, z=0), eye=dict(x=1.5, y=-1.5, z=1)
+    )
+
     fig.update_layout(
         title=f"Battery Temperature at Time {time_index} (X-axis: 0-15 range)",
         scene=dict(
@@ -403,20 +522,163 @@ def update_3d_graph(time_index, z_max, module_range, opacity, toggle_casing):
     return fig
 
 
+# Define callback to update the 3D graph
+# Scrubbing the time (or the opacity) only sends a Patch of the frame values, the
+# whole figure is only rebuilt when the z-cut, the module range or the set of drawn
+# slices changes. The figure goes to the battery-3d-figure store, the casing is
+# appended in the browser (assets/casing.js) before it reaches the graph.
+# Figures are cached by frame and by the sensors the z-cut and module range keep.
+@app.callback(
+    Output("battery-3d-figure", "data"),
+    Output("battery-3d-state", "data"),
+    [
+        Input("time-slider", "value"),
+        Input("z-slider", "value"),
+        Input("module-slider", "value"),
+        Input("opacity-slider", "value"),
+    ],
+    State("battery-3d-state", "data"),
+    State("interval-component", "disabled"),
+    State("playback-block", "data"),
+)
+@callback_metrics.instrument
+def update_3d_graph(
+    time_index, z_max, module_range, opacity, state, paused, playback_block
+):
+    # The time slider follows the clientside playback, which already draws the frames
+    if (
+        callback_context.triggered_id == "time-slider"
+        and not paused
+        and playback_block
+        and playback_block["clientside"]
+    ):
+        raise dash.exceptions.PreventUpdate
+
+    def build():
+        fig = build_3d_figure(time_index, z_max, module_range, opacity)
+        return {"figure": fig, "masks": [trace_mask_key(trace) for trace in fig.data]}
+
+    z_key = layout.z_key(z_max)
+    range_key = layout.range_key(module_range)
+    entry = figure_cache.memoize(["3d", time_index, z_key, range_key, opacity], build)
+    fig, masks = entry["figure"], entry["masks"]
+    geometry = {
+        "z_max": z_key,
+        "module_range": list(range_key),
+        "traces": [trace.get("name") for trace in fig["data"]],
+    }
+
+    if callback_context.triggered_id in ("time-slider", "opacity-slider"):
+        if state and state["geometry"] == geometry:
+            return patch_3d_figure(fig, masks, state["masks"]), {
+                "geometry": geometry,
+                "masks": masks,
+            }
+
+    return fig, {"geometry": geometry, "masks": masks}
+
+
+# The casing levels of detail are sent once per session, the first time it is shown
+@app.callback(
+    Output("casing-mesh", "data"),
+    Input("toggle-casing", "value"),
+    State("casing-mesh", "data"),
+)
+def load_casing_mesh(toggle_casing, meshes):
+    if not toggle_casing or meshes:
+        raise dash.exceptions.PreventUpdate
+    return mesh_payload(casing_levels)
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace="casing", function_name="merge"),
+    Output("battery-3d-graph", "figure"),
+    Input("battery-3d-figure", "data"),
+    Input("casing-mesh", "data"),
+    Input("toggle-casing", "value"),
+    Input("casing-detail", "value"),
+)
+
+
+# Time cursor of the trend graphs: a vertical line and its annotation, the first
+# shape and annotation of the figure
+def add_cursor(fig):
+    fig.add_vline(
+        x=0,
+        line_dash="dash",
+        line_color="orange",
+        annotation_text="Current Time: 0",
+    )
+
+
+def set_cursor(fig, current_time):
+    fig["layout"]["shapes"][0]["x0"] = current_time
+    fig["layout"]["shapes"][0]["x1"] = current_time
+    fig["layout"]["annotations"][0]["x"] = current_time
+    fig["layout"]["annotations"][0]["text"] = f"Current Time: {current_time}"
+    return fig
+
+
+# Trend graph at the current time: the base figure of the view (traces, layout and
+# cursor) is built once per key and cached, moving the time slider only sends a
+# Patch of the cursor. The zoomed window of each graph is kept in a store: the
+# relayout events not moving the x axis keep it and send nothing, changing the view
+# (`reset`, which also resets the zoom through uirevision) shows the whole run.
+def trend_window(relayout_data, previous, reset=None):
+    triggered = set(callback_context.triggered_prop_ids.values())
+    if reset in triggered:
+        return None, None
+    return zoom_window(relayout_data, previous)
+
+
+def trend_figure(name, current_time, key, build, window, previous):
+    triggered = set(callback_context.triggered_prop_ids.values())
+    if triggered == {"time-slider"}:
+        return set_cursor(Patch(), current_time), dash.no_update
+    if triggered == {f"{name}-graph"} and tuple(window) == tuple(
+        previous or (None, None)
+    ):
+        raise dash.exceptions.PreventUpdate
+    fig = set_cursor(figure_cache.memoize([name, *key], build), current_time)
+    return fig, list(window)
+
+
 # Define callback to update temperature trends
 @app.callback(
     Output("temp-trends-graph", "figure"),
-    [Input("time-slider", "value"), Input("temp-view-toggle", "value")],
+    Output("temp-trends-window", "data"),
+    [
+        Input("time-slider", "value"),
+        Input("temp-view-toggle", "value"),
+        Input("temp-trends-graph", "relayoutData"),
+    ],
+    State("temp-trends-window", "data"),
 )
-def update_temp_trends(current_time, view_mode):
+@callback_metrics.instrument
+def update_temp_trends(current_time, view_mode, relayout_data, previous):
+    window = trend_window(relayout_data, previous, "temp-view-toggle")
+    view_window = window if view_mode == "raw" else None
+    return trend_figure(
+        "temp-trends",
+        current_time,
+        [view_mode, view_window],
+        lambda: build_temp_trends(view_mode, view_window),
+        window,
+        previous,
+    )
+
+
+def build_temp_trends(view_mode, window):
     fig = go.Figure()
 
     if view_mode == "raw":
-        df = temp_stats_df
+        # Level of detail of the full rate pyramid matching the zoomed window
+        x_view, stats = trend_pyramid.view(*window)
+        columns = trend_pyramid.columns
         fig.add_trace(
             go.Scatter(
-                x=df["timestamp"],
-                y=df["max_temp"],
+                x=x_view,
+                y=stats[:, columns.index("max_temp")],
                 mode="lines",
                 name="Max Temperature",
                 line=dict(color="red", width=2),
@@ -424,8 +686,8 @@ def update_temp_trends(current_time, view_mode):
         )
         fig.add_trace(
             go.Scatter(
-                x=df["timestamp"],
-                y=df["avg_temp"],
+                x=x_view,
+                y=stats[:, columns.index("avg_temp")],
                 mode="lines",
                 name="Average Temperature",
                 line=dict(color="blue", width=2),
@@ -433,8 +695,8 @@ def update_temp_trends(current_time, view_mode):
         )
         fig.add_trace(
             go.Scatter(
-                x=df["timestamp"],
-                y=df["min_temp"],
+                x=x_view,
+                y=stats[:, columns.index("min_temp")],
                 mode="lines",
                 name="Min Temperature",
                 line=dict(color="green", width=2),
@@ -442,16 +704,12 @@ def update_temp_trends(current_time, view_mode):
         )
         y_title = "Temperature (°C)"
     else:
-        smoothed = temp_stats_df[["min_temp", "avg_temp", "max_temp"]].apply(
-            lambda col: savgol_filter(col, window_length=50, polyorder=2, mode="interp")
-        )
-        deriv = smoothed.diff().fillna(0)
-        deriv["timestamp"] = temp_stats_df["timestamp"]
-
+        # Rates precomputed over the true time axis of the run
+        timestamps = np.arange(num_timestamps)
         fig.add_trace(
             go.Scatter(
-                x=deriv["timestamp"],
-                y=deriv["max_temp"],
+                x=timestamps,
+                y=derivatives["pack_max_temp"].to_numpy(),
                 mode="lines",
                 name="Max Temp Derivative",
                 line=dict(color="red", width=2),
@@ -459,8 +717,8 @@ def update_temp_trends(current_time, view_mode):
         )
         fig.add_trace(
             go.Scatter(
-                x=deriv["timestamp"],
-                y=deriv["avg_temp"],
+                x=timestamps,
+                y=derivatives["pack_avg_temp"].to_numpy(),
                 mode="lines",
                 name="Avg Temp Derivative",
                 line=dict(color="blue", width=2),
@@ -468,8 +726,8 @@ def update_temp_trends(current_time, view_mode):
         )
         fig.add_trace(
             go.Scatter(
-                x=deriv["timestamp"],
-                y=deriv["min_temp"],
+                x=timestamps,
+                y=derivatives["pack_min_temp"].to_numpy(),
                 mode="lines",
                 name="Min Temp Derivative",
                 line=dict(color="green", width=2),
@@ -477,12 +735,7 @@ def update_temp_trends(current_time, view_mode):
         )
         y_title = "Temperature Derivative (°C/s)"
 
-    fig.add_vline(
-        x=current_time,
-        line_dash="dash",
-        line_color="orange",
-        annotation_text=f"Current Time: {current_time}",
-    )
+    add_cursor(fig)
 
     fig.update_layout(
         title="Temperature Trends Over Time",
@@ -491,6 +744,7 @@ def update_temp_trends(current_time, view_mode):
         legend=dict(x=0, y=1),
         margin=dict(l=0, r=0, b=0, t=40),
         height=400,
+        uirevision=view_mode,  # keep the user's zoom when the data is refined
     )
 
     return fig
@@ -499,9 +753,29 @@ def update_temp_trends(current_time, view_mode):
 # Define callback to update power graph
 @app.callback(
     Output("power-graph", "figure"),
-    [Input("time-slider", "value"), Input("power-view-toggle", "value")],
+    Output("power-window", "data"),
+    [
+        Input("time-slider", "value"),
+        Input("power-view-toggle", "value"),
+        Input("power-graph", "relayoutData"),
+    ],
+    State("power-window", "data"),
 )
-def update_power_graph(current_time, power_view_mode):
+@callback_metrics.instrument
+def update_power_graph(current_time, power_view_mode, relayout_data, previous):
+    window = trend_window(relayout_data, previous, "power-view-toggle")
+    view_window = window if power_view_mode != "smoothed" else None
+    return trend_figure(
+        "power",
+        current_time,
+        [power_view_mode, view_window],
+        lambda: build_power_graph(power_view_mode, view_window),
+        window,
+        previous,
+    )
+
+
+def build_power_graph(power_view_mode, window):
     fig = go.Figure()
     power_col = None
     # Try to find a power column
@@ -512,6 +786,8 @@ def update_power_graph(current_time, power_view_mode):
     if power_col:
         y = data[power_col]
         if power_view_mode == "smoothed":
+            from scipy.signal import savgol_filter
+
             # Use Savitzky-Golay filter for smoothing
             window = min(51, len(y) if len(y) % 2 == 1 else len(y) - 1)
             if window < 5:
@@ -524,30 +800,26 @@ def update_power_graph(current_time, power_view_mode):
             fig.add_trace(
                 go.Scatter(
                     x=data.index,
-                    y=y_smoothed,
+                    y=y_smoothed.astype(np.float32),
                     mode="lines",
                     name="Smoothed Power",
                     line=dict(color="purple", width=2, dash="dash"),
                 )
             )
         else:
+            x_view, y_view = trend_pyramid.channel("POWER", *window)
             fig.add_trace(
                 go.Scatter(
-                    x=data.index,
-                    y=y,
+                    x=x_view,
+                    y=y_view,
                     mode="lines",
                     name="Raw Power",
                     line=dict(color="purple", width=2),
                 )
             )
 
-    # Add vertical line for current time
-    fig.add_vline(
-        x=current_time,
-        line_dash="dash",
-        line_color="orange",
-        annotation_text=f"Current Time: {current_time}",
-    )
+    # Cursor at the current time, moved by trend_figure
+    add_cursor(fig)
 
     fig.update_layout(
         title="Power Over Time",
@@ -556,6 +828,7 @@ def update_power_graph(current_time, power_view_mode):
         legend=dict(x=0, y=1),
         margin=dict(l=0, r=0, b=0, t=40),
         height=400,
+        uirevision=power_view_mode,
     )
 
     return fig
@@ -564,30 +837,40 @@ def update_power_graph(current_time, power_view_mode):
 # Add another graph for Fan Speed
 @app.callback(
     Output("fan-graph", "figure"),
-    [Input("time-slider", "value"), Input("power-view-toggle", "value")],
+    Output("fan-window", "data"),
+    [
+        Input("time-slider", "value"),
+        Input("power-view-toggle", "value"),
+        Input("fan-graph", "relayoutData"),
+    ],
+    State("fan-window", "data"),
 )
-def update_fan_graph(current_time, toggle_casing):
+@callback_metrics.instrument
+def update_fan_graph(current_time, toggle_casing, relayout_data, previous):
+    window = trend_window(relayout_data, previous)
+    return trend_figure(
+        "fan", current_time, [window], lambda: build_fan_graph(window), window, previous
+    )
+
+
+def build_fan_graph(window):
     fig = go.Figure()
 
     # Add fan speed data if available
-    if "fan_speed" in data.columns:
+    if "fan_speed" in trend_pyramid.columns:
+        x_view, y_view = trend_pyramid.channel("fan_speed", *window)
         fig.add_trace(
             go.Scatter(
-                x=data.index,
-                y=data["fan_speed"],
+                x=x_view,
+                y=y_view,
                 mode="lines",
                 name="Fan Speed",
                 line=dict(color="orange", width=2),
             )
         )
 
-    # Add vertical line for current time
-    fig.add_vline(
-        x=current_time,
-        line_dash="dash",
-        line_color="orange",
-        annotation_text=f"Current Time: {current_time}",
-    )
+    # Cursor at the current time, moved by trend_figure
+    add_cursor(fig)
 
     fig.update_layout(
         title="Fan Speed Over Time",
@@ -596,6 +879,7 @@ def update_fan_graph(current_time, toggle_casing):
         legend=dict(x=0, y=1),
         margin=dict(l=0, r=0, b=0, t=40),
         height=400,
+        uirevision="fan",
     )
 
     return fig
@@ -604,30 +888,40 @@ def update_fan_graph(current_time, toggle_casing):
 # add new line graph for SOC PERCENT
 @app.callback(
     Output("soc-graph", "figure"),
-    [Input("time-slider", "value"), Input("power-view-toggle", "value")],
+    Output("soc-window", "data"),
+    [
+        Input("time-slider", "value"),
+        Input("power-view-toggle", "value"),
+        Input("soc-graph", "relayoutData"),
+    ],
+    State("soc-window", "data"),
 )
-def update_soc_graph(current_time, view_mode):
+@callback_metrics.instrument
+def update_soc_graph(current_time, view_mode, relayout_data, previous):
+    window = trend_window(relayout_data, previous)
+    return trend_figure(
+        "soc", current_time, [window], lambda: build_soc_graph(window), window, previous
+    )
+
+
+def build_soc_graph(window):
     fig = go.Figure()
 
     # Add SOC PERCENT data if available
-    if "SOC PERCENT" in data.columns:
+    if "SOC PERCENT" in trend_pyramid.columns:
+        x_view, y_view = trend_pyramid.channel("SOC PERCENT", *window)
         fig.add_trace(
             go.Scatter(
-                x=data.index,
-                y=data["SOC PERCENT"],
+                x=x_view,
+                y=y_view,
                 mode="lines",
                 name="SOC Percent",
                 line=dict(color="green", width=2),
             )
         )
 
-    # Add vertical line for current time
-    fig.add_vline(
-        x=current_time,
-        line_dash="dash",
-        line_color="orange",
-        annotation_text=f"Current Time: {current_time}",
-    )
+    # Cursor at the current time, moved by trend_figure
+    add_cursor(fig)
 
     fig.update_layout(
         title="State of Charge (SOC) Over Time",
@@ -636,22 +930,102 @@ def update_soc_graph(current_time, view_mode):
         legend=dict(x=0, y=1),
         margin=dict(l=0, r=0, b=0, t=40),
         height=400,
+        uirevision="soc",
     )
 
     return fig
 
 
+# Blocks of upcoming frames for the clientside playback (assets/playback.js), read
+# from the run cube. Slices cut by the z slider are not in the cube, the client then
+# falls back to stepping the time slider and the server renders every frame.
+@app.callback(
+    Output("playback-block", "data"),
+    Input("playback-request", "data"),
+    State("z-slider", "value"),
+    State("module-slider", "value"),
+    prevent_initial_call=True,
+)
+def load_playback_block(request, z_max, module_range):
+    if not request:
+        raise dash.exceptions.PreventUpdate
+    if z_max < z_top:
+        return {
+            "token": request["token"],
+            "clientside": False,
+            "start": request["start"],
+            "step": PLAYBACK_STEP,
+            "total": num_timestamps,
+        }
+    markers = [
+        (x_pos, layout.y[idx], layout.z[idx], idx)
+        for x_pos, idx in layout.slices(module_range)
+        if len(idx)
+    ]
+    block = encode_block(
+        frame_cube,
+        sensor_temperatures,
+        layout.sensors(module_range),
+        request["start"],
+        markers=markers,
+    )
+    block["token"] = request["token"]
+    return block
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace="playback", function_name="tick"),
+    Output("playback-position", "data"),
+    Output("playback-request", "data", allow_duplicate=True),
+    Output("playback-end", "data"),
+    Output("time-slider", "value", allow_duplicate=True),
+    Input("interval-component", "n_intervals"),
+    State("playback-block", "data"),
+    State("playback-request", "data"),
+    State("time-slider", "value"),
+    prevent_initial_call=True,
+)
+
+
+# Events of the selected kind in the event picker, the value is the event row
+@app.callback(Output("event-select", "options"), Input("event-kind", "value"))
+def list_events(kind):
+    events = thermal_events
+    if kind != "all":
+        events = events[events["kind"] == kind]
+    return [
+        {"label": describe(event), "value": int(i)}
+        for i, event in zip(events.index, events.itertuples())
+    ]
+
+
+# Play starts a playback session (one token per click), pause and the end of the run
+# move the time slider to the last frame played, which refreshes every graph once.
+# Picking an event pauses the playback and moves the time slider to its frame.
 @app.callback(
     Output("time-slider", "value"),
     Output("interval-component", "disabled"),
     Output("play-button", "children"),
-    Input("interval-component", "n_intervals"),
+    Output("playback-request", "data"),
     Input("play-button", "n_clicks"),
+    Input("playback-end", "data"),
+    Input("event-select", "value"),
     State("time-slider", "value"),
     State("interval-component", "disabled"),
+    State("playback-position", "data"),
+    State("playback-request", "data"),
 )
-def handle_play_pause_or_advance(n_intervals, n_clicks, current_value, is_disabled):
+@callback_metrics.instrument
+def handle_play_pause_or_advance(
+    n_clicks, end, event, current_value, is_disabled, position, request
+):
     triggered_id = callback_context.triggered_id
+    play_label = [html.I(className="fas fa-play", style={"marginRight": "8px"}), "Play"]
+    pause_label = [
+        html.I(className="fas fa-pause", style={"marginRight": "8px"}),
+        "Pause",
+    ]
+    token = request["token"] if request else None
 
     if triggered_id == "play-button":
         # Toggle play/pause
@@ -659,36 +1033,53 @@ def handle_play_pause_or_advance(n_intervals, n_clicks, current_value, is_disabl
             return (
                 current_value,
                 False,
-                [
-                    html.I(className="fas fa-pause", style={"marginRight": "8px"}),
-                    "Pause",
-                ],
-            )
-        else:
-            return (
-                current_value,
-                True,
-                [html.I(className="fas fa-play", style={"marginRight": "8px"}), "Play"],
+                pause_label,
+                {"token": n_clicks, "start": current_value},
             )
+        if position and position["token"] == token:
+            current_value = position["index"]
+        return current_value, True, play_label, dash.no_update
 
-    elif triggered_id == "interval-component" and not is_disabled:
-        # Wait 2 seconds before advancing
-        next_value = current_value + 20
-        if next_value >= num_timestamps:
-            return (
-                num_timestamps - 20,
-                True,
-                [html.I(className="fas fa-play", style={"marginRight": "8px"}), "Play"],
-            )  # Pause at end
-        return (
-            next_value,
-            False,
-            [html.I(className="fas fa-pause", style={"marginRight": "8px"}), "Pause"],
-        )
+    elif triggered_id == "playback-end" and end and end["token"] == token:
+        # Pause at end
+        return end["index"], True, play_label, dash.no_update
+
+    elif triggered_id == "event-select" and event is not None:
+        frame = int(thermal_events.at[event, "frame"])
+        return frame, True, play_label, dash.no_update
 
     raise dash.exceptions.PreventUpdate
 
 
+# Averages of the instrumented callbacks in every worker, refreshed every few seconds
+if DEBUG_PANEL:
+
+    @app.callback(
+        Output("metrics-table", "children"), Input("metrics-interval", "n_intervals")
+    )
+    def show_metrics(n_intervals):
+        header = ["Callback", "Requests", "Mean ms", "Max ms"]
+        header += [f"{phase.capitalize()} ms" for phase in PHASES]
+        header += ["Mean KB", "Cache hits"]
+        rows = [
+            html.Tr(
+                [
+                    html.Td(row["callback"]),
+                    html.Td(row["requests"]),
+                    html.Td(f"{row['mean_ms']:.1f}"),
+                    html.Td(f"{row['max_ms']:.1f}"),
+                    *[html.Td(f"{row[f'{phase}_ms']:.1f}") for phase in PHASES],
+                    html.Td(f"{row['mean_kb']:.1f}"),
+                    html.Td(
+                        "-" if row["hit_rate"] is None else f"{row['hit_rate']:.0%}"
+                    ),
+                ]
+            )
+            for row in callback_metrics.summary()
+        ]
+        return [html.Thead(html.Tr([html.Th(h) for h in header])), html.Tbody(rows)]
+
+
 # Run the app
 if __name__ == "__main__":
     app.run(debug=True, port=10000)
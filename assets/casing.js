@@ -0,0 +1,46 @@
+// Battery casing of the 3D figure, added in the browser.
+//
+// The server sends the casing mesh (every level of detail) once per session into
+// the casing-mesh store and renders the 3D figure without it. The casing trace is
+// built once per level and appended to each figure, so neither the time steps nor
+// the casing toggle send the mesh again.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    casing: (function () {
+        var traces = {};
+
+        function casingTrace(meshes, level) {
+            if (!traces[level]) {
+                var mesh = meshes[level];
+                traces[level] = {
+                    type: "mesh3d",
+                    x: mesh.x,
+                    y: mesh.y,
+                    z: mesh.z,
+                    i: mesh.i,
+                    j: mesh.j,
+                    k: mesh.k,
+                    color: "lightgray",
+                    opacity: 0.4,
+                    name: "Battery Case",
+                    showscale: false,
+                };
+            }
+            return traces[level];
+        }
+
+        return {
+            merge: function (figure, meshes, toggle_casing, level) {
+                if (!figure) {
+                    return window.dash_clientside.no_update;
+                }
+                if (!meshes || !toggle_casing || !toggle_casing.length) {
+                    return figure;
+                }
+                level = Math.min(level || 0, meshes.length - 1);
+                return Object.assign({}, figure, {
+                    data: figure.data.concat([casingTrace(meshes, level)]),
+                });
+            },
+        };
+    })(),
+});
@@ -0,0 +1,274 @@
+// Clientside playback of the 3D battery figure.
+//
+// The server sends blocks of upcoming frames (quantized surface colors of every
+// module slice, see playback.py). Each interval tick renders the next frame in the
+// browser with Plotly.restyle, on the Surface traces of the slices or on the slices
+// Mesh3d, and asks for the following block once half of the current one has been
+// played, so playback does not wait on the server. The sensor markers are moved
+// with the frames, and the time slider (and so the trend cursors) follows every
+// SLIDER_SYNC frames.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    playback: (function () {
+        var NAN_CODE = 255;
+        var SLIDER_SYNC = 10;
+        var session = { token: null, index: 0, blocks: {}, requested: {}, ended: false };
+
+        function decode(block) {
+            var raw = atob(block.frames.replace(/-/g, "+").replace(/_/g, "/"));
+            var bytes = new Uint8Array(raw.length);
+            for (var i = 0; i < raw.length; i++) {
+                bytes[i] = raw.charCodeAt(i);
+            }
+            block.bytes = bytes;
+            return block;
+        }
+
+        // Surface colors of one slice at frame f, and its z grid masked like the colors
+        function frameGrid(block, f, slice) {
+            var size = block.size;
+            var scale = (block.hi - block.lo) / 254;
+            var offset = (f * block.slots + slice.slot) * size * size;
+            var colors = [];
+            var z = [];
+            for (var r = 0; r < size; r++) {
+                var color_row = new Array(size);
+                var z_row = new Array(size);
+                for (var c = 0; c < size; c++) {
+                    var code = block.bytes[offset + r * size + c];
+                    color_row[c] = code === NAN_CODE ? NaN : block.lo + code * scale;
+                    z_row[c] = code === NAN_CODE ? NaN : slice.z[r][c];
+                }
+                colors.push(color_row);
+                z.push(z_row);
+            }
+            return { colors: colors, z: z };
+        }
+
+        // Slices Mesh3d of one frame: front and back grids of each slice in view as
+        // consecutive vertex blocks, two triangles per cell kept when their corners are
+        // all inside the sensors (as slices_mesh in app.py)
+        function meshFrame(block, f, names) {
+            var size = block.size;
+            var scale = (block.hi - block.lo) / 254;
+            var mesh = { x: [], y: [], z: [], i: [], j: [], k: [], intensity: [] };
+            block.traces.forEach(function (slice) {
+                if (names.indexOf(slice.slice) < 0) {
+                    return;
+                }
+                var offset = (f * block.slots + slice.slot) * size * size;
+                [slice.x - block.width / 2, slice.x + block.width / 2].forEach(function (x_face) {
+                    var base = mesh.x.length;
+                    for (var r = 0; r < size; r++) {
+                        for (var c = 0; c < size; c++) {
+                            var code = block.bytes[offset + r * size + c];
+                            mesh.x.push(x_face);
+                            mesh.y.push(slice.y[r][c]);
+                            mesh.z.push(slice.z[r][c]);
+                            mesh.intensity.push(code === NAN_CODE ? block.cmin[f] : block.lo + code * scale);
+                        }
+                    }
+                    for (r = 0; r < size - 1; r++) {
+                        for (c = 0; c < size - 1; c++) {
+                            var v00 = offset + r * size + c;
+                            var in00 = block.bytes[v00] !== NAN_CODE;
+                            var in01 = block.bytes[v00 + 1] !== NAN_CODE;
+                            var in10 = block.bytes[v00 + size] !== NAN_CODE;
+                            var in11 = block.bytes[v00 + size + 1] !== NAN_CODE;
+                            var cell = base + r * size + c;
+                            if (in00 && in10 && in11) {
+                                mesh.i.push(cell);
+                                mesh.j.push(cell + size);
+                                mesh.k.push(cell + size + 1);
+                            }
+                            if (in00 && in11 && in01) {
+                                mesh.i.push(cell);
+                                mesh.j.push(cell + size + 1);
+                                mesh.k.push(cell + 1);
+                            }
+                        }
+                    }
+                });
+            });
+            return mesh;
+        }
+
+        // Valid (> 0) sensors of each slice at frame f, slices without any left out (as
+        // build_3d_figure in app.py)
+        function markerFrame(block, f) {
+            var temps = block.marker_temps[f];
+            var offset = 0;
+            var slices = [];
+            block.markers.forEach(function (marker) {
+                var points = { name: marker.name, x: [], y: [], z: [], color: [] };
+                for (var s = 0; s < marker.y.length; s++) {
+                    var temp = temps[offset + s];
+                    if (temp > 0) {
+                        points.x.push(marker.x);
+                        points.y.push(marker.y[s]);
+                        points.z.push(marker.z[s]);
+                        points.color.push(temp);
+                    }
+                }
+                offset += marker.y.length;
+                if (points.color.length) {
+                    slices.push(points);
+                }
+            });
+            return slices;
+        }
+
+        function render(block, f) {
+            var gd = document.querySelector("#battery-3d-graph .js-plotly-plot");
+            if (!gd || !gd.data) {
+                return;
+            }
+            gd.data.forEach(function (trace, i) {
+                if (trace.type === "mesh3d" && Array.isArray(trace.meta)) {
+                    var mesh = meshFrame(block, f, trace.meta);
+                    Plotly.restyle(
+                        gd,
+                        {
+                            x: [mesh.x],
+                            y: [mesh.y],
+                            z: [mesh.z],
+                            i: [mesh.i],
+                            j: [mesh.j],
+                            k: [mesh.k],
+                            intensity: [mesh.intensity],
+                            cmin: block.cmin[f],
+                            cmax: block.cmax[f],
+                        },
+                        [i]
+                    );
+                }
+            });
+            // One "Sensors" trace for every slice in mesh mode, one "Sensors <x>" per slice
+            // otherwise
+            var markers = markerFrame(block, f);
+            gd.data.forEach(function (trace, i) {
+                if (trace.type !== "scatter3d") {
+                    return;
+                }
+                var points = markers.filter(function (slice) {
+                    return trace.name === "Sensors" || slice.name === trace.name;
+                });
+                if (!points.length) {
+                    return;
+                }
+                var concat = function (key) {
+                    return [].concat.apply([], points.map(function (slice) { return slice[key]; }));
+                };
+                Plotly.restyle(
+                    gd,
+                    {
+                        x: [concat("x")],
+                        y: [concat("y")],
+                        z: [concat("z")],
+                        "marker.color": [concat("color")],
+                        "marker.cmin": block.cmin[f],
+                        "marker.cmax": block.cmax[f],
+                    },
+                    [i]
+                );
+            });
+            var colors = [];
+            var z = [];
+            var indices = [];
+            block.traces.forEach(function (slice) {
+                var grid = null;
+                gd.data.forEach(function (trace, i) {
+                    if (slice.names.indexOf(trace.name) >= 0) {
+                        grid = grid || frameGrid(block, f, slice);
+                        colors.push(grid.colors);
+                        z.push(grid.z);
+                        indices.push(i);
+                    }
+                });
+            });
+            if (indices.length) {
+                Plotly.restyle(
+                    gd,
+                    {
+                        surfacecolor: colors,
+                        z: z,
+                        cmin: indices.map(function () { return block.cmin[f]; }),
+                        cmax: indices.map(function () { return block.cmax[f]; }),
+                    },
+                    indices
+                );
+            }
+            Plotly.relayout(gd, {
+                "title.text": "Battery Temperature at Time " + block.index[f] + " (X-axis: 0-15 range)",
+            });
+        }
+
+        function findBlock(index) {
+            for (var start in session.blocks) {
+                var block = session.blocks[start];
+                if (index >= block.start && index < block.start + block.count * block.step) {
+                    return block;
+                }
+            }
+            return null;
+        }
+
+        return {
+            // Returns [playback-position, playback-request, playback-end, time-slider value]
+            tick: function (n_intervals, block, request, slider_value) {
+                var no = window.dash_clientside.no_update;
+                if (!block || !request || block.token !== request.token) {
+                    return [no, no, no, no];
+                }
+                if (session.token !== block.token) {
+                    session = { token: block.token, index: block.start, blocks: {}, requested: {}, ended: false };
+                }
+                if (session.ended) {
+                    return [no, no, no, no];
+                }
+
+                // No precomputed frames for this view (z-cut): the server renders each step
+                if (!block.clientside) {
+                    var next_value = slider_value + block.step;
+                    if (next_value >= block.total) {
+                        session.ended = true;
+                        return [no, no, { token: block.token, index: block.total - block.step }, no];
+                    }
+                    return [no, no, no, next_value];
+                }
+
+                if (!session.blocks[block.start]) {
+                    session.blocks[block.start] = decode(block);
+                }
+                var next = session.index + block.step;
+                if (next >= block.total) {
+                    session.ended = true;
+                    return [no, no, { token: block.token, index: session.index }, no];
+                }
+                var current = findBlock(next);
+                if (!current) {
+                    // The next block is still on its way
+                    return [no, no, no, no];
+                }
+                var f = (next - current.start) / current.step;
+                render(current, f);
+                session.index = next;
+
+                // Forget the blocks already played
+                for (var start in session.blocks) {
+                    if (session.blocks[start] !== current && Number(start) < current.start) {
+                        delete session.blocks[start];
+                    }
+                }
+
+                var prefetch = no;
+                var next_start = current.start + current.count * current.step;
+                if (f >= current.count / 2 && next_start < current.total && !session.requested[next_start]) {
+                    session.requested[next_start] = true;
+                    prefetch = { start: next_start, token: block.token };
+                }
+                var slider = f % SLIDER_SYNC === 0 ? next : no;
+                return [{ token: block.token, index: next }, prefetch, no, slider];
+            },
+        };
+    })(),
+});
@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from casing import CASING_FILE, MAX_FACES, casing_lods, read_lods, write_lods
+from decimate import decimate_frame
+from demux import demux_ld
+from derivatives import DERIV_WINDOW, build_derivatives
+from events import event_index
+from frame_cube import FrameCube
+from ingest import fan_speed, ingest_telemetry, trend_channels
+from pyramid import MinMaxPyramid
+from run_cache import content_hash, open_run, run_values, write_run
+from sensors import SensorLayout
+from stats import run_stats, split_modules
+
+# A run artifact bundle is a directory holding everything the dashboard derives
+# from a run, written once by `python bundle.py <run.csv|run.ld> <directory>` and
+# memory-mapped by app.py at startup (HEATMAP_BUNDLE=<directory>)
+BUNDLE_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+LAYOUT_FILE = "layout.json"
+EVENTS_FILE = "events.json"
+CASING_LODS_FILE = "casing.npz"
+# Run cache entries of a bundle: decimated run (with the frame cube), full rate
+# trend channels (with their pyramid), sensor temperatures, statistics and rates
+ENTRIES = ("run", "trends", "sensors", "stats", "derivatives")
+
+
+def read_source(path, step=100, mode="minmax"):
+    """(decimated run, full rate trend channels) of a telemetry CSV or a .ld log."""
+    if path.lower().endswith(".ld"):
+        # The .ld parser (ldparser submodule) is only needed for .ld logs
+        from ld_reader import LdFile
+
+        full = demux_ld(LdFile(path))
+        return decimate_frame(full, step, mode), trend_channels(full)
+    return ingest_telemetry(path, step, mode)
+
+
+def temperature_columns(data):
+    """Module_* temperature columns of a run."""
+    return [col for col in data.columns if col.startswith("Module_") and "Group" in col]
+
+
+def sensor_frame(data, sensor_columns):
+    """Temperatures of the placed sensors, in layout order."""
+    return data[sensor_columns + ["Time"]]
+
+
+def stats_frame(data, temp_columns, sensor_temps, modules):
+    """
+    Pack and module statistics of every frame (run_stats) and the fan speed
+    based on the max temperature.
+    """
+    stats = run_stats(
+        np.asarray(data[temp_columns], dtype=np.float32), sensor_temps, modules
+    )
+    stats["fan_speed"] = fan_speed(stats["max_temp"].to_numpy())
+    stats["Time"] = data["Time"].to_numpy()
+    return stats
+
+
+def derivatives_frame(data, sensor_temps, sensor_columns, stats):
+    """Temperature rates of the pack, of each module and of each sensor."""
+    return build_derivatives(
+        data["Time"].to_numpy(),
+        sensor_temps,
+        sensor_columns,
+        stats,
+        split_modules(stats),
+    )
+
+
+def sensor_rates(derivatives, n_sensors):
+    """Mapped (frames, sensors) rates, the sensor columns are the last block."""
+    return run_values(derivatives)[:, -n_sensors:]
+
+
+def write_bundle(
+    source,
+    directory,
+    step=100,
+    mode="minmax",
+    cube_dtype=np.float16,
+    casing_path=CASING_FILE,
+    casing_faces=MAX_FACES,
+    force=False,
+):
+    """
+    Decodes `source` and writes every artifact of the run to `directory` (built
+    in a temporary directory, then renamed over it). Returns the manifest.
+
+    An existing `directory` is only replaced when it is a bundle (or empty),
+    unless `force` is set.
+    """
+    if (
+        not force
+        and os.path.exists(directory)
+        and not os.path.exists(os.path.join(directory, MANIFEST_FILE))
+        and not (os.path.isdir(directory) and not os.listdir(directory))
+    ):
+        raise ValueError(
+            f"{directory} exists and is not a run bundle, replace it with force (--force)"
+        )
+    tmp = f"{os.path.abspath(directory)}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    timings = {}
+
+    def timed(name, build):
+        t0 = time.perf_counter()
+        result = build()
+        timings[name] = round(time.perf_counter() - t0, 3)
+        print(f"{name:<12} {timings[name]:8.2f} s")
+        return result
+
+    def entry(name, frame):
+        write_run(os.path.join(tmp, name), frame, {"source": os.path.abspath(source)})
+        return open_run(os.path.join(tmp, name))
+
+    label = os.path.splitext(os.path.basename(source))[0]
+    key = f"{label}_{content_hash(source)}_{mode}{step}"
+    data, trends = timed("decode", lambda: read_source(source, step, mode))
+    data = entry("run", data)
+    trends = entry("trends", trends)
+    timed(
+        "pyramid",
+        lambda: MinMaxPyramid(
+            np.arange(len(trends)) / step, run_values(trends), trends.columns
+        ).save(os.path.join(tmp, "trends")),
+    )
+
+    temp_columns = temperature_columns(data)
+    layout = SensorLayout(temp_columns)
+    sensor_columns = [temp_columns[i] for i in layout.column_index]
+    sensors = entry("sensors", sensor_frame(data, sensor_columns))
+    sensor_temps = run_values(sensors)
+    stats = entry(
+        "stats",
+        timed(
+            "stats",
+            lambda: stats_frame(data, temp_columns, sensor_temps, layout.module),
+        ),
+    )
+    derivatives = entry(
+        "derivatives",
+        timed(
+            "derivatives",
+            lambda: derivatives_frame(data, sensor_temps, sensor_columns, stats),
+        ),
+    )
+
+    timed(
+        "frame cube",
+        lambda: FrameCube.build(
+            sensor_temps,
+            layout.y,
+            layout.z,
+            layout.slices(),
+            os.path.join(tmp, "run"),
+            dtype=np.dtype(cube_dtype),
+        ),
+    )
+    events = timed(
+        "events",
+        lambda: event_index(
+            sensor_temps,
+            sensor_columns,
+            layout.module,
+            stats,
+            sensor_rates(derivatives, len(sensor_columns)),
+        ),
+    )
+    events.to_json(os.path.join(tmp, EVENTS_FILE), orient="records")
+    with open(os.path.join(tmp, LAYOUT_FILE), "w", encoding="utf-8") as f:
+        json.dump(layout.geometry(), f)
+    if casing_path and os.path.exists(casing_path):
+        lods = timed("casing", lambda: casing_lods(casing_path, casing_faces))
+        write_lods(os.path.join(tmp, CASING_LODS_FILE), lods)
+
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "key": key,
+        "source": os.path.abspath(source),
+        "rows": len(data),
+        "decimation": {"mode": mode, "step": step},
+        "cube_dtype": str(np.dtype(cube_dtype)),
+        "deriv_window": DERIV_WINDOW,
+        "casing_faces": casing_faces,
+        "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "timings": timings,
+    }
+    with open(os.path.join(tmp, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    return manifest
+
+
+class Bundle:
+    """
+    Read-only view of a bundle written by write_bundle: the run cache entries
+    are memory-mapped, the events, the layout and the casing loaded.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"{directory} is not a run bundle: {e}") from e
+        if self.manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(
+                f"{directory} was written by another bundle version, rebuild it"
+            )
+
+    def entry(self, name):
+        """One of the ENTRIES, memory-mapped."""
+        data = open_run(os.path.join(self.directory, name))
+        if data is None:
+            raise ValueError(f"{self.directory} has no valid '{name}' entry")
+        data.attrs["run_cache"]["key"] = f"{self.manifest['key']}_{name}"
+        return data
+
+    def events(self):
+        """Event index of the run (events.event_index)."""
+        with open(os.path.join(self.directory, EVENTS_FILE), encoding="utf-8") as f:
+            return pd.DataFrame(json.load(f))
+
+    def check_layout(self, layout):
+        """
+        Raises ValueError when the sensors of `layout` (a SensorLayout of the
+        run columns) are not the ones the bundle was built with: the sensor
+        entry, the frame cube and the events follow the layout order.
+        """
+        with open(os.path.join(self.directory, LAYOUT_FILE), encoding="utf-8") as f:
+            built = json.load(f)
+        if built != layout.geometry():
+            raise ValueError(
+                f"{self.directory} was built with another sensor layout, rebuild it"
+            )
+
+    def casing_levels(self):
+        """Casing levels of detail, None if the bundle was built without casing."""
+        return read_lods(os.path.join(self.directory, CASING_LODS_FILE))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precomputes the artifacts of a run (telemetry CSV or .ld log) "
+        "into a bundle directory, served with HEATMAP_BUNDLE=<directory>."
+    )
+    parser.add_argument("source", help="telemetry CSV or .ld log")
+    parser.add_argument("directory", help="bundle directory, replaced if it exists")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="replace the directory even if it is not a bundle",
+    )
+    parser.add_argument("--step", type=int, default=100, help="decimation step")
+    parser.add_argument(
+        "--mode", default="minmax", choices=("minmax", "lttb", "stride")
+    )
+    parser.add_argument(
+        "--cube-dtype", default="float16", choices=("float16", "float32")
+    )
+    parser.add_argument("--casing", default=CASING_FILE, help="casing mesh file")
+    parser.add_argument("--casing-faces", type=int, default=MAX_FACES)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        manifest = write_bundle(
+            args.source,
+            args.directory,
+            step=args.step,
+            mode=args.mode,
+            cube_dtype=np.dtype(args.cube_dtype),
+            casing_path=args.casing,
+            casing_faces=args.casing_faces,
+            force=args.force,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - t0
+    print(f"{manifest['rows']} frames written to {args.directory} in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import base64
+import os
+
+import numpy as np
+
+from run_cache import DEFAULT_CACHE_DIR, content_hash
+
+CASING_FILE = "stl/cassing.glb"
+# Faces of the finest level of detail, each next level has LOD_FACTOR times fewer
+MAX_FACES = 20000
+LOD_LEVELS = 3
+LOD_FACTOR = 4
+CACHE_VERSION = 1
+
+# Placement of the casing in the sensor coordinates
+ROTATION_DEG = -90
+SCALE = 0.036
+TRANSLATION = [0, 20.0, 0]
+
+
+def load_casing(path=CASING_FILE):
+    """Casing mesh rotated, scaled and moved into the sensor coordinates."""
+    # trimesh is only needed to simplify the mesh, not to serve cached levels
+    import trimesh
+
+    mesh = trimesh.load_mesh(path)
+    mesh.apply_transform(
+        trimesh.transformations.rotation_matrix(np.radians(ROTATION_DEG), [0, 0, 1])
+    )
+    mesh.apply_scale(SCALE)
+    mesh.apply_translation(TRANSLATION)
+    return mesh
+
+
+def cluster_vertices(vertices, faces, cell):
+    """
+    Vertex clustering: vertices in the same cubic cell of side `cell` are merged
+    at their mean, the faces left degenerate or duplicated are dropped.
+    """
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell).astype(np.int64)
+    _, inverse, counts = np.unique(
+        cells, axis=0, return_inverse=True, return_counts=True
+    )
+    inverse = inverse.ravel()
+    merged = np.zeros((len(counts), 3))
+    np.add.at(merged, inverse, vertices)
+    merged /= counts[:, None]
+
+    faces = inverse[faces]
+    keep = (
+        (faces[:, 0] != faces[:, 1])
+        & (faces[:, 1] != faces[:, 2])
+        & (faces[:, 0] != faces[:, 2])
+    )
+    faces = faces[keep]
+    _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    return merged, faces[np.sort(first)]
+
+
+def simplify(vertices, faces, max_faces):
+    """
+    Simplifies a mesh down to at most `max_faces` faces: quadric decimation when
+    trimesh has its backend (fast_simplification), vertex clustering otherwise,
+    with the smallest cell that fits the budget.
+    """
+    if len(faces) <= max_faces:
+        return vertices, faces
+    try:
+        import trimesh
+
+        mesh = trimesh.Trimesh(vertices, faces, process=False)
+        mesh = mesh.simplify_quadric_decimation(face_count=max_faces)
+        if len(mesh.faces) <= max_faces:
+            return np.asarray(mesh.vertices), np.asarray(mesh.faces)
+    except ImportError:
+        pass
+
+    lo, hi = 0.0, float(np.ptp(vertices, axis=0).max())
+    best = cluster_vertices(vertices, faces, hi)
+    for _ in range(20):
+        cell = (lo + hi) / 2
+        result = cluster_vertices(vertices, faces, cell)
+        if len(result[1]) <= max_faces:
+            best, hi = result, cell
+        else:
+            lo = cell
+    return best
+
+
+def casing_lods(
+    path=CASING_FILE,
+    max_faces=MAX_FACES,
+    levels=LOD_LEVELS,
+    cache_dir=DEFAULT_CACHE_DIR,
+):
+    """
+    Levels of detail of the casing, finest first, as (vertices float32, faces
+    int32) pairs. Simplified once, then loaded from an .npz file in the cache
+    directory keyed by the content of the mesh file and the face budget.
+    """
+    key = f"casing_v{CACHE_VERSION}_{content_hash(path)}_{max_faces}x{levels}.npz"
+    cache_path = os.path.join(cache_dir, key)
+    lods = read_lods(cache_path)
+    if lods is not None and len(lods) == levels:
+        return lods
+
+    mesh = load_casing(path)
+    vertices, faces = np.asarray(mesh.vertices), np.asarray(mesh.faces)
+    lods = []
+    for level in range(levels):
+        vertices, faces = simplify(vertices, faces, max_faces // LOD_FACTOR**level)
+        lods.append((vertices.astype(np.float32), faces.astype(np.int32)))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    write_lods(cache_path, lods)
+    return lods
+
+
+def read_lods(path):
+    """Levels of detail saved by write_lods, None if the file is missing or invalid."""
+    try:
+        with np.load(path) as saved:
+            levels = len(saved.files) // 2
+            return [
+                (saved[f"vertices{level}"], saved[f"faces{level}"])
+                for level in range(levels)
+            ]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def write_lods(path, lods):
+    """Saves levels of detail to an .npz file (written then renamed)."""
+    tmp = f"{path}.tmp{os.getpid()}.npz"
+    arrays = {}
+    for level, (vertices, faces) in enumerate(lods):
+        arrays[f"vertices{level}"] = vertices
+        arrays[f"faces{level}"] = faces
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def _typed_array(values):
+    values = np.ascontiguousarray(values)
+    dtype = {np.dtype(np.float32): "f4", np.dtype(np.int32): "i4"}[values.dtype]
+    return {"dtype": dtype, "bdata": base64.b64encode(values.tobytes()).decode("ascii")}
+
+
+def mesh_payload(lods):
+    """
+    Every level of detail as Mesh3d coordinates and indices in plotly.js typed
+    array form, for the one time transfer to the browser.
+    """
+    return [
+        {
+            "x": _typed_array(vertices[:, 0]),
+            "y": _typed_array(vertices[:, 1]),
+            "z": _typed_array(vertices[:, 2]),
+            "i": _typed_array(faces[:, 0]),
+            "j": _typed_array(faces[:, 1]),
+            "k": _typed_array(faces[:, 2]),
+            "faces": int(len(faces)),
+        }
+        for vertices, faces in lods
+    ]
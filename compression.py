@@ -0,0 +1,46 @@
+import gzip
+
+from flask import request
+
+# Responses smaller than this are sent as is, gzip would barely shrink them
+MIN_SIZE = 1024
+COMPRESSED_TYPES = (
+    "application/json",
+    "application/javascript",
+    "text/css",
+    "text/html",
+    "text/javascript",
+)
+
+
+def gzip_responses(server, level=5, min_size=MIN_SIZE):
+    """
+    Gzips the responses of a Flask server (Dash callbacks, layout, assets) for
+    the clients accepting it, like Dash(compress=True) but without the
+    flask_compress dependency. Level 0 leaves the responses as they are.
+    """
+    if not level:
+        return None
+
+    @server.after_request
+    def compress(response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSED_TYPES
+            or "gzip" not in request.headers.get("Accept-Encoding", "").lower()
+        ):
+            return response
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        body = gzip.compress(body, compresslevel=level)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = "gzip"
+        response.headers["Content-Length"] = str(len(body))
+        response.vary.add("Accept-Encoding")
+        return response
+
+    return compress
@@ -0,0 +1,151 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Frame modes: how many output rows each bucket of samples produces
+MODES = {"stride": 1, "lttb": 1, "minmax": 2}
+
+# One value per bucket, usable as a per channel override in any mode
+REDUCERS = {
+    "first": lambda b: b[:, 0],
+    "mean": lambda b: np.nanmean(b, axis=1),
+    "min": lambda b: np.nanmin(b, axis=1),
+    "max": lambda b: np.nanmax(b, axis=1),
+    "absmax": lambda b: np.take_along_axis(
+        b, np.nanargmax(np.abs(np.nan_to_num(b, nan=0.0)), axis=1)[:, None], axis=1
+    )[:, 0],
+}
+
+
+def bucket_size(step, mode):
+    """
+    Samples per bucket. `step` is the row reduction factor, so every mode
+    outputs the same number of rows: minmax keeps 2 rows out of 2 * step.
+    """
+    return step * MODES[mode]
+
+
+def _buckets(values, size):
+    """(n, c) -> (n_buckets, size, c), the last bucket padded with NaN."""
+    n_buckets = -(-len(values) // size)
+    padded = np.full((n_buckets * size,) + values.shape[1:], np.nan, values.dtype)
+    padded[: len(values)] = values
+    return padded.reshape((n_buckets, size) + values.shape[1:])
+
+
+def minmax(values, size):
+    """
+    Keeps the min and the max of every bucket of every column, in the order
+    they occur, so spikes in either direction survive. Returns (2 * n_buckets, c).
+    """
+    buckets = _buckets(np.asarray(values, dtype=np.float32), size)
+    missing = np.isnan(buckets)
+    low = np.where(missing, np.inf, buckets).argmin(axis=1)
+    high = np.where(missing, -np.inf, buckets).argmax(axis=1)
+    pair = np.stack((np.minimum(low, high), np.maximum(low, high)), axis=1)
+    picked = np.take_along_axis(buckets, pair, axis=1)
+    return picked.reshape((-1,) + buckets.shape[2:])
+
+
+def lttb(values, n_out):
+    """
+    Largest-Triangle-Three-Buckets on every column at once. The loop runs over
+    the buckets, each step is vectorized over the columns. Returns the selected
+    sample indices, shape (n_out, c).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n, n_cols = values.shape
+    if n_out >= n or n_out < 3:
+        picked = np.linspace(0, n - 1, n_out).round().astype(np.int64)
+        return np.tile(picked[:, None], (1, n_cols))
+    values = np.nan_to_num(values, nan=0.0)
+    cols = np.arange(n_cols)
+
+    # First and last samples are kept, the others split in n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty((n_out, n_cols), dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = (edges[i + 1] + next_stop - 1) / 2
+        next_y = values[edges[i + 1] : next_stop].mean(axis=0)
+
+        prev = selected[i]
+        prev_x = prev
+        prev_y = values[prev, cols]
+        x = np.arange(start, stop)[:, None]
+        area = np.abs(
+            (prev_x - next_x) * (values[start:stop] - prev_y)
+            - (prev_x - x) * (next_y - prev_y)
+        )
+        selected[i + 1] = start + area.argmax(axis=0)
+    return selected
+
+
+def decimate_values(values, step, mode="minmax", channel_modes=None):
+    """
+    Decimates a (n, c) float matrix by `step`. `channel_modes` maps a column
+    index to another frame mode or to one of REDUCERS for that channel only.
+    Returns (decimated values, index of the sample giving the time of each row).
+    """
+    values = np.asarray(values, dtype=np.float32)
+    if values.ndim == 1:
+        values = values[:, None]
+    rows_per_bucket = MODES[mode]
+    size = bucket_size(step, mode)
+    n_buckets = -(-len(values) // size)
+    n_rows = n_buckets * rows_per_bucket
+
+    # Channels sharing a mode are decimated together
+    modes = np.array([mode] * values.shape[1], dtype=object)
+    for col, channel_mode in (channel_modes or {}).items():
+        modes[col] = channel_mode
+
+    out = np.empty((n_rows, values.shape[1]), dtype=np.float32)
+    for channel_mode in set(modes):
+        cols = np.flatnonzero(modes == channel_mode)
+        block = values[:, cols]
+        if channel_mode == "minmax":
+            if rows_per_bucket != 2:
+                raise ValueError("minmax channels need the minmax frame mode")
+            out[:, cols] = minmax(block, size)
+        elif channel_mode == "lttb":
+            picked = lttb(block, n_rows)
+            out[:, cols] = np.take_along_axis(block, picked, axis=0)
+        elif channel_mode == "stride":
+            out[:, cols] = np.repeat(block[::size], rows_per_bucket, axis=0)
+        else:
+            reduced = REDUCERS[channel_mode](_buckets(block, size))
+            out[:, cols] = np.repeat(reduced, rows_per_bucket, axis=0)
+
+    # Time of each row: start of its bucket (and middle of it for the 2nd row)
+    offsets = np.arange(rows_per_bucket) * (size // rows_per_bucket)
+    time_rows = (np.arange(n_buckets)[:, None] * size + offsets).ravel()
+    return out, np.minimum(time_rows, len(values) - 1)
+
+
+def decimate_frame(data, step, mode="minmax", channel_modes=None):
+    """
+    Decimates every numeric column of a DataFrame by `step`, Time is taken at
+    the start (and middle, in minmax mode) of each bucket.
+    """
+    columns = [col for col in data.columns if col != "Time"]
+    col_index = {col: i for i, col in enumerate(columns)}
+    overrides = {
+        col_index[col]: channel_mode
+        for col, channel_mode in (channel_modes or {}).items()
+        if col in col_index
+    }
+    # All-NaN buckets (sensor not logged yet) stay NaN without warning
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        values, time_rows = decimate_values(
+            data[columns].to_numpy(np.float32), step, mode, overrides
+        )
+    reduced = pd.DataFrame(values, columns=columns)
+    if "Time" in data.columns:
+        reduced["Time"] = data["Time"].to_numpy()[time_rows]
+    return reduced
@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Names of the multiplexed temperature channels in the .ld logs
+TEMPS_CHANNELS = ["TEMPS MODULE", "TEMPS GROUP", "TEMPS VALUE1", "TEMPS VALUE2"]
+
+# VALUE2 of a frame belongs to the second half of the module's sensors
+VALUE2_GROUP_OFFSET = 16
+
+# Logging rate (Hz) of the TEMPS channels
+LOG_FREQ = 500
+
+
+def demux_temps(module, group, value1, value2, time_s):
+    """
+    Turns the multiplexed (module, group, value1, value2) stream into the wide
+    Module_{m}_Group{g}_Value{1,2} table, one row per distinct frame.
+
+    Each frame only carries two readings, the other cells are forward filled
+    from the previous frames (and back filled before a sensor's first frame).
+    Every step is an array operation so the cost is linear in the log length.
+    """
+    stream = np.column_stack(
+        [np.asarray(a, dtype=np.float64) for a in (module, group, value1, value2)]
+    )
+    time_s = np.asarray(time_s, dtype=np.float64)
+
+    # Drop incomplete samples, then the samples repeating the previous frame
+    # (the CAN frames are slower than the 500 Hz logging rate)
+    valid = np.isfinite(stream).all(axis=1) & np.isfinite(time_s)
+    order = np.argsort(time_s[valid], kind="stable")
+    stream, time_s = stream[valid][order], time_s[valid][order]
+    keep = np.ones(len(stream), dtype=bool)
+    keep[1:] = np.any(stream[1:] != stream[:-1], axis=1)
+    stream, time_s = stream[keep], time_s[keep]
+    if not len(stream):
+        # Empty or truncated log: no sensor seen, only the Time column
+        return pd.DataFrame({"Time": pd.Series(dtype="datetime64[ns]")})
+
+    modules = stream[:, 0].astype(np.int64)
+    groups = stream[:, 1].astype(np.int64)
+
+    # One column pair per (module, group) seen in the log, laid out per module
+    # as all the Value1 columns followed by all the Value2 columns
+    pairs, inverse = np.unique(
+        np.column_stack((modules, groups)), axis=0, return_inverse=True
+    )
+    inverse = inverse.ravel()
+    _, first, counts = np.unique(pairs[:, 0], return_index=True, return_counts=True)
+    module_first = np.repeat(first, counts)
+    module_count = np.repeat(counts, counts)
+    rank = np.arange(len(pairs)) - module_first
+    col_value1 = 2 * module_first + rank
+    col_value2 = 2 * module_first + module_count + rank
+
+    columns = np.empty(2 * len(pairs), dtype=object)
+    columns[col_value1] = [f"Module_{m}_Group{g + 1}_Value1" for m, g in pairs]
+    columns[col_value2] = [
+        f"Module_{m}_Group{g + 1 + VALUE2_GROUP_OFFSET}_Value2" for m, g in pairs
+    ]
+
+    # Scatter every frame into its two cells
+    values = np.full((len(stream), len(columns)), np.nan, dtype=np.float32)
+    rows = np.arange(len(stream))
+    values[rows, col_value1[inverse]] = stream[:, 2]
+    values[rows, col_value2[inverse]] = stream[:, 3]
+
+    # Forward fill: each cell takes the row of the last frame that set it
+    source = np.where(np.isnan(values), 0, rows[:, None].astype(np.int32))
+    np.maximum.accumulate(source, axis=0, out=source)
+    cols = np.arange(len(columns))
+    values = values[source, cols]
+
+    # Back fill the cells before each sensor's first frame
+    first = np.argmax(~np.isnan(values), axis=0)
+    values = np.where(np.isnan(values), values[first, cols], values)
+
+    flattened_data = pd.DataFrame(values, columns=list(columns))
+    flattened_data["Time"] = pd.to_datetime(time_s, unit="s")
+    return flattened_data
+
+
+def demux_ld(ld, freq=LOG_FREQ):
+    """
+    Wide temperature table of a .ld log (ld_reader.LdFile): only the TEMPS
+    channels are decoded, aligned on the shortest one and timed at `freq` Hz.
+    """
+    temps = ld.read(TEMPS_CHANNELS)
+    n = min(len(temps[chan]) for chan in TEMPS_CHANNELS)
+    time_s = np.arange(n) / freq
+    return demux_temps(*(temps[chan][:n] for chan in TEMPS_CHANNELS), time_s)
+
+
+def _synthetic_stream(n_samples, n_modules=6, n_groups=16, repeat=5, seed=0):
+    """Fake TEMPS stream cycling over every (module, group) like the BMS does."""
+    rng = np.random.default_rng(seed)
+    n_frames = -(-n_samples // repeat)
+    frame = np.arange(n_frames) % (n_modules * n_groups)
+    module = np.repeat(frame // n_groups, repeat)[:n_samples]
+    group = np.repeat(frame % n_groups, repeat)[:n_samples]
+    value1 = np.repeat(rng.uniform(20, 60, n_frames).round(1), repeat)[:n_samples]
+    value2 = np.repeat(rng.uniform(20, 60, n_frames).round(1), repeat)[:n_samples]
+    time_s = np.arange(n_samples) / 500
+    return module, group, value1, value2, time_s
+
+
+def benchmark(sizes=(50_000, 100_000, 200_000, 400_000, 800_000), repeats=3):
+    """Times demux_temps on growing synthetic logs, the cost per sample should stay flat."""
+    print(f"{'samples':>10} {'seconds':>10} {'us/sample':>10}")
+    for n_samples in sizes:
+        stream = _synthetic_stream(n_samples)
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            demux_temps(*stream)
+            best = min(best, time.perf_counter() - start)
+        print(f"{n_samples:>10} {best:>10.3f} {best / n_samples * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
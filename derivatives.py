@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+# Savitzky-Golay window (samples of the uniform time grid) and polynomial order
+DERIV_WINDOW = 51
+DERIV_POLYORDER = 2
+# The uniform grid has at most this many times the rows of the run, a run with
+# long gaps gets a coarser step rather than a huge grid
+MAX_GRID_RATIO = 4
+
+
+def seconds(time):
+    """Time axis (datetime64 or seconds) as float seconds from the first row."""
+    time = np.asarray(time)
+    if np.issubdtype(time.dtype, np.datetime64):
+        time = (time - time[0]) / np.timedelta64(1, "s")
+    time = np.asarray(time, dtype=np.float64)
+    return time - time[0]
+
+
+def _weights(t, at):
+    """Linear interpolation of samples at times `t` onto times `at`."""
+    idx = np.clip(np.searchsorted(t, at, side="right") - 1, 0, max(len(t) - 2, 0))
+    span = t[np.minimum(idx + 1, len(t) - 1)] - t[idx]
+    frac = np.divide(at - t[idx], span, out=np.zeros(len(at)), where=span > 0)
+    return idx, np.clip(frac, 0.0, 1.0)[:, None]
+
+
+def _interp(values, idx, frac):
+    upper = values[np.minimum(idx + 1, len(values) - 1)]
+    return values[idx] * (1 - frac) + upper * frac
+
+
+def fill_missing(values):
+    """Readings <= 0 or NaN replaced by the last valid one (the next one at start)."""
+    values = np.array(values, dtype=np.float64)
+    valid = values > 0
+    rows = np.arange(len(values))[:, None]
+    last = np.maximum.accumulate(np.where(valid, rows, 0), axis=0)
+    first = np.argmax(valid, axis=0)
+    last = np.where(np.maximum.accumulate(valid, axis=0), last, first)
+    return np.take_along_axis(values, last, axis=0), valid
+
+
+def time_derivative(time, values, window=DERIV_WINDOW, polyorder=DERIV_POLYORDER):
+    """
+    Smoothed d(values)/dt in units per second of a (rows, channels) matrix
+    sampled at `time`: Savitzky-Golay with deriv=1 and the true sample period
+    as delta. Non uniform rows (decimated runs) are first interpolated onto a
+    uniform grid at their median period, the derivative is then read back at
+    each row.
+    """
+    from scipy.signal import savgol_filter
+
+    t = seconds(time)
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        return time_derivative(time, values[:, None], window, polyorder)[:, 0]
+    if len(t) < 2:
+        return np.zeros_like(values)
+
+    steps = np.diff(t)
+    dt = float(np.median(steps[steps > 0])) if np.any(steps > 0) else 1.0
+    uniform = np.allclose(steps, dt, rtol=1e-6)
+    if uniform:
+        grid_values = values
+    else:
+        # The grid ends on the last row, past it the values would be held flat
+        n_grid = min(max(int(round(t[-1] / dt)), 1) + 1, MAX_GRID_RATIO * len(t))
+        dt = t[-1] / (n_grid - 1)
+        grid = np.arange(n_grid) * dt
+        grid_values = _interp(values, *_weights(t, grid))
+
+    window = min(window, len(grid_values) - (1 - len(grid_values) % 2))
+    if window <= polyorder:
+        return np.zeros_like(values)
+    deriv = savgol_filter(
+        grid_values, window, polyorder, deriv=1, delta=dt, axis=0, mode="interp"
+    )
+    if uniform:
+        return deriv
+    return _interp(deriv, *_weights(grid, t))
+
+
+def sensor_derivatives(time, temps, **kwargs):
+    """
+    Temperature rate (°C/s) of each sensor, missing readings (<= 0) bridged for
+    the filter and NaN in the result.
+    """
+    filled, valid = fill_missing(temps)
+    deriv = time_derivative(time, filled, **kwargs)
+    return np.where(valid, deriv, np.nan)
+
+
+def build_derivatives(time, sensor_temps, sensor_columns, pack, modules, **kwargs):
+    """
+    Temperature rates of a run as one frame: pack_<stat> for the pack min/avg/max,
+    module_<m>_<stat> for each module and one column per sensor, with the Time
+    column of the run.
+    """
+    stat_names = ["min_temp", "avg_temp", "max_temp"]
+    columns = {}
+    deriv = time_derivative(time, pack[stat_names].to_numpy(), **kwargs)
+    for i, name in enumerate(stat_names):
+        columns[f"pack_{name}"] = deriv[:, i]
+    for module, stats in modules.items():
+        deriv = time_derivative(time, stats[stat_names].to_numpy(), **kwargs)
+        for i, name in enumerate(stat_names):
+            columns[f"module_{module}_{name}"] = deriv[:, i]
+    deriv = sensor_derivatives(time, sensor_temps, **kwargs)
+    for i, name in enumerate(sensor_columns):
+        columns[name] = deriv[:, i]
+
+    frame = pd.DataFrame(columns, dtype=np.float32)
+    frame["Time"] = np.asarray(time)
+    return frame
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+
+# Temperatures (°C) whose crossings are events, one event per sensor and crossing
+THRESHOLDS = (50, 55)
+# Crossings of a sensor closer than this many frames are one event
+MIN_GAP = 5
+# Sensors with the fastest heating rate listed
+TOP_RATES = 10
+# Hottest sensors listed per window of frames
+TOP_K = 3
+EVENT_WINDOW = 50
+# Spread (pack max - min, °C) above which the pack is flagged
+SPREAD_LIMIT = 15
+# Threshold crossings (per threshold) and spread events kept, the most extreme ones
+MAX_EVENTS = 500
+
+EVENT_KINDS = {
+    "threshold": "Threshold crossings",
+    "rate": "Fastest heating",
+    "hottest": "Hottest sensors",
+    "spread": "Temperature spread",
+}
+
+
+def runs(mask, gap=0):
+    """
+    Runs of True of each column of a (rows, columns) mask, runs of a column
+    closer than `gap` rows merged. Returns the start rows, end rows (exclusive)
+    and columns, sorted by column then start.
+    """
+    rows, cols = mask.shape
+    padded = np.zeros((cols, rows + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask.T
+    edges = np.diff(padded, axis=1)
+    columns, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    if gap and len(starts) > 1:
+        split = (columns[1:] != columns[:-1]) | (starts[1:] - ends[:-1] >= gap)
+        starts = starts[np.r_[True, split]]
+        ends = ends[np.r_[split, True]]
+        columns = columns[np.r_[True, split]]
+    return starts, ends, columns
+
+
+def run_peaks(values, starts, ends, columns):
+    """Max value and its row in each run of the columns of `values`."""
+    if not len(starts):
+        return np.empty(0, dtype=values.dtype), np.empty(0, dtype=np.intp)
+    # The values of every run laid end to end, one reduceat segment per run
+    lengths = ends - starts
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    run_id = np.repeat(np.arange(len(starts)), lengths)
+    position = np.arange(lengths.sum()) - offsets[run_id]
+    run_values = values.T[columns[run_id], starts[run_id] + position]
+    peaks = np.maximum.reduceat(run_values, offsets)
+    # Row of the peak: first row of the run holding it
+    at_peak = np.flatnonzero(run_values == peaks[run_id])
+    first = at_peak[np.unique(run_id[at_peak], return_index=True)[1]]
+    return peaks, starts + position[first]
+
+
+def _events(kind, label, starts, ends, frames, sensors, values, columns, modules):
+    return pd.DataFrame(
+        {
+            "kind": kind,
+            "label": label,
+            "start": starts,
+            "end": ends,
+            "frame": frames,
+            "sensor": np.asarray(columns, dtype=object)[sensors],
+            "module": modules[sensors],
+            "value": values,
+        }
+    )
+
+
+def _strongest(events, limit=MAX_EVENTS):
+    return events.nlargest(limit, "value") if len(events) > limit else events
+
+
+def event_index(temps, columns, modules, stats, rates=None):
+    """
+    Thermal events of a run, from the (frames, sensors) temperature matrix
+    (readings <= 0 missing), the sensor names and modules, the pack statistics
+    and optionally the (frames, sensors) heating rates in °C/s.
+
+    Returns a DataFrame with one event per row: kind, label, start and end
+    frames (end exclusive), frame to show, sensor and module involved (missing
+    and -1 for the pack) and value (peak temperature, rate or spread).
+    """
+    temps = np.asarray(temps, dtype=np.float32)
+    modules = np.asarray(modules)
+    n_frames, n_sensors = temps.shape
+    masked = np.where(temps > 0, temps, -np.inf)
+    found = []
+
+    # Threshold crossings: runs above each threshold, shown at their first frame
+    for threshold in THRESHOLDS:
+        starts, ends, sensors = runs(masked > threshold, MIN_GAP)
+        peaks, _ = run_peaks(masked, starts, ends, sensors)
+        events = _events(
+            "threshold",
+            f"> {threshold:g} °C",
+            starts,
+            ends,
+            starts,
+            sensors,
+            peaks,
+            columns,
+            modules,
+        )
+        found.append(_strongest(events))
+
+    # Fastest heating: peak rate of each sensor, over the frames above half of it
+    if rates is not None:
+        rates = np.where(np.isnan(rates), -np.inf, np.asarray(rates, np.float32))
+        peak_frames = np.argmax(rates, axis=0)
+        peak_rates = rates[peak_frames, np.arange(n_sensors)]
+        sensors = np.argsort(-peak_rates)[:TOP_RATES]
+        sensors = sensors[peak_rates[sensors] > 0]
+        starts, ends, runs_sensor = runs(rates[:, sensors] > peak_rates[sensors] / 2)
+        # The run of each sensor holding its peak
+        peak_at = peak_frames[sensors][runs_sensor]
+        holding = (starts <= peak_at) & (peak_at < ends)
+        starts, ends = starts[holding], ends[holding]
+        found.append(
+            _events(
+                "rate",
+                "Heating rate",
+                starts,
+                ends,
+                peak_frames[sensors],
+                sensors,
+                peak_rates[sensors],
+                columns,
+                modules,
+            )
+        )
+
+    # Hottest sensors of each window of frames, shown at their peak frame
+    n_windows = -(-n_frames // EVENT_WINDOW)
+    windows = np.full((n_windows * EVENT_WINDOW, n_sensors), -np.inf, np.float32)
+    windows[:n_frames] = masked
+    windows = windows.reshape(n_windows, EVENT_WINDOW, n_sensors)
+    window_max = windows.max(axis=1)
+    window_peak = windows.argmax(axis=1)
+    k = min(TOP_K, n_sensors)
+    top = np.argpartition(-window_max, k - 1, axis=1)[:, :k]
+    peaks = np.take_along_axis(window_max, top, axis=1)
+    window, rank = np.nonzero(np.isfinite(peaks))
+    sensors = top[window, rank]
+    starts = window * EVENT_WINDOW
+    # Already bounded to TOP_K per window, every stretch of the run keeps its own
+    found.append(
+        _events(
+            "hottest",
+            "Hottest sensor",
+            starts,
+            np.minimum(starts + EVENT_WINDOW, n_frames),
+            starts + window_peak[window, sensors],
+            sensors,
+            peaks[window, rank],
+            columns,
+            modules,
+        )
+    )
+
+    # Spread of the pack above the limit, shown at its widest frame
+    spread = np.where(
+        stats["valid_count"] > 0, stats["max_temp"] - stats["min_temp"], -np.inf
+    ).astype(np.float32)[:, None]
+    starts, ends, _ = runs(spread > SPREAD_LIMIT, MIN_GAP)
+    peaks, frames = run_peaks(spread, starts, ends, np.zeros_like(starts))
+    events = _events(
+        "spread",
+        f"Spread > {SPREAD_LIMIT:g} °C",
+        starts,
+        ends,
+        frames,
+        np.zeros_like(starts),
+        peaks,
+        [None],
+        np.array([-1]),
+    )
+    found.append(_strongest(events))
+
+    events = pd.concat(found, ignore_index=True)
+    events["frame"] = events["frame"].astype(np.int64)
+    return events.sort_values(["start", "kind"], ignore_index=True)
+
+
+def describe(event):
+    """One line label of an event row, for the event picker."""
+    value = (
+        f"{event.value:+.3f} °C/s" if event.kind == "rate" else f"{event.value:.1f} °C"
+    )
+    where = event.sensor if isinstance(event.sensor, str) else "Pack"
+    return f"{event.label} · {where} · {value} · frames {event.start}–{event.end - 1}"
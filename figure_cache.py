@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from metrics import cache_lookup, mark
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+# Bytes of serialized figures kept in memory, and in the disk tier
+FIGURE_CACHE_BYTES = 128 << 20
+FIGURE_CACHE_DISK_BYTES = 1 << 30
+# The disk tier is pruned down to this share of its budget, and rescanned after
+# this share of it has been written by the worker (the other workers write too)
+DISK_PRUNE_TARGET = 0.9
+DISK_RESCAN_SHARE = 0.125
+
+
+def serialize(obj):
+    """Figure (or any plotly JSON-able object) as compact JSON bytes."""
+    return pio.to_json(obj, validate=False).encode("utf-8")
+
+
+def plain(obj):
+    """
+    Figures of an entry in their JSON form (dicts and lists, arrays kept), the
+    form a cache hit returns.
+    """
+    if hasattr(obj, "to_plotly_json"):
+        return obj.to_plotly_json()
+    if isinstance(obj, dict):
+        return {name: plain(value) for name, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [plain(value) for value in obj]
+    return obj
+
+
+def entry_key(key):
+    """Digest of a cache key, the file name of the entry in the disk tier."""
+    text = json.dumps(key, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FigureCache:
+    """
+    LRU cache of serialized figures bounded by their total size in bytes, with
+    hit/miss counters.
+
+    With a `directory`, entries are also written there as JSON files and
+    looked up on a memory miss, so gunicorn workers and restarts share the
+    figures already built. Keys are digested with `namespace` (the run). The
+    files are bounded to `max_disk_bytes`, the least recently used ones (by
+    modification time, refreshed on a hit) are removed first.
+    """
+
+    def __init__(
+        self,
+        max_bytes=FIGURE_CACHE_BYTES,
+        directory=None,
+        namespace="",
+        max_disk_bytes=FIGURE_CACHE_DISK_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.namespace = namespace
+        self.max_disk_bytes = max_disk_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Size of the disk tier at the last scan, and bytes written since
+        self._disk_bytes = 0
+        self._disk_written = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.prune_disk()
+
+    def _disk_path(self, digest):
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def prune_disk(self):
+        """
+        Removes the oldest files of the disk tier until it is under
+        DISK_PRUNE_TARGET of its budget. Returns the bytes left.
+        """
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        if total > self.max_disk_bytes:
+            target = DISK_PRUNE_TARGET * self.max_disk_bytes
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+        with self._lock:
+            self._disk_bytes = total
+            self._disk_written = 0
+        return total
+
+    def _store(self, digest, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(digest, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[digest] = payload
+            self.bytes += len(payload)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def get(self, key):
+        """Serialized entry of `key`, None when it is in neither tier."""
+        digest = entry_key([self.namespace, key])
+        with self._lock:
+            payload = self._entries.get(digest)
+            if payload is not None:
+                self.hits += 1
+                self._entries.move_to_end(digest)
+                return payload
+        if self.directory:
+            path = self._disk_path(digest)
+            try:
+                with open(path, "rb") as f:
+                    payload = f.read()
+                os.utime(path)
+            except OSError:
+                pass
+            if payload is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._store(digest, payload)
+                return payload
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, payload):
+        digest = entry_key([self.namespace, key])
+        self._store(digest, payload)
+        if self.directory:
+            path = self._disk_path(digest)
+            tmp = f"{path}.tmp{os.getpid()}_{threading.get_ident()}"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp, path)
+            except OSError:
+                return
+            with self._lock:
+                self._disk_bytes += len(payload)
+                self._disk_written += len(payload)
+                scan = (
+                    self._disk_bytes > self.max_disk_bytes
+                    or self._disk_written > DISK_RESCAN_SHARE * self.max_disk_bytes
+                )
+            if scan:
+                self.prune_disk()
+
+    def memoize(self, key, build):
+        """
+        Entry of `key` as a JSON object, built (a figure or a dict holding
+        figures), serialized and stored on a miss, parsed on a hit. The lookup,
+        the build, the serialization and the parsing are reported to the
+        callback metrics.
+        """
+        payload = self.get(key)
+        cache_lookup(payload is not None)
+        if payload is not None:
+            entry = loads(payload)
+            mark("deserialize")
+            return entry
+        mark("compute")
+        entry = build()
+        mark("figure")
+        self.put(key, serialize(entry))
+        entry = plain(entry)
+        mark("serialize")
+        return entry
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = self.disk_hits = self.misses = 0
@@ -0,0 +1,60 @@
+import hashlib
+
+import numpy as np
+from dash import Patch
+
+
+def trace_mask_key(trace):
+    """
+    Key of the frame dependent geometry of a 3D figure trace: the NaN mask of a
+    surface z grid, the triangles of the slices mesh, the positions of the valid
+    sensors of a Scatter3d.
+    """
+    if trace.type == "surface":
+        arrays = [np.packbits(np.isnan(np.asarray(trace.z, dtype=float)))]
+    elif trace.type == "mesh3d":
+        arrays = [np.asarray(trace[axis], dtype=np.int64) for axis in "ijk"]
+    else:
+        arrays = [np.asarray(trace[axis], dtype=float) for axis in "xyz"]
+    digest = hashlib.blake2b(digest_size=8)
+    for array in arrays:
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def patch_3d_figure(fig, masks, previous_masks):
+    """
+    Partial update of the 3D figure on the client: only the per frame colors and
+    values, and the geometry of the traces whose mask key changed (a sensor
+    dropping out moves the markers of the Scatter3d). `fig` is the JSON form of
+    the figure, as kept by the figure cache.
+    """
+    patched = Patch()
+    for i, trace in enumerate(fig["data"]):
+        changed = masks[i] != previous_masks[i]
+        if trace["type"] == "surface":
+            if changed:
+                patched["data"][i]["z"] = trace["z"]
+            patched["data"][i]["surfacecolor"] = trace["surfacecolor"]
+            patched["data"][i]["cmin"] = trace["cmin"]
+            patched["data"][i]["cmax"] = trace["cmax"]
+            patched["data"][i]["opacity"] = trace["opacity"]
+        elif trace["type"] == "mesh3d":
+            if changed:
+                for axis in "ijk":
+                    patched["data"][i][axis] = trace[axis]
+            patched["data"][i]["intensity"] = trace["intensity"]
+            patched["data"][i]["cmin"] = trace["cmin"]
+            patched["data"][i]["cmax"] = trace["cmax"]
+            patched["data"][i]["opacity"] = trace["opacity"]
+        elif trace["type"] == "scatter3d":
+            if changed:
+                for axis in "xyz":
+                    patched["data"][i][axis] = trace[axis]
+            patched["data"][i]["marker"]["color"] = trace["marker"]["color"]
+            patched["data"][i]["marker"]["cmin"] = trace["marker"]["cmin"]
+            patched["data"][i]["marker"]["cmax"] = trace["marker"]["cmax"]
+            if "text" in trace:
+                patched["data"][i]["text"] = trace["text"]
+    patched["layout"]["title"]["text"] = fig["layout"]["title"]["text"]
+    return patched
@@ -0,0 +1,167 @@
+import json
+import os
+
+import numpy as np
+
+from interpolation import GRID_SIZE, get_operator, grid_bounds, slice_grid
+from run_cache import locked
+
+CUBE_FILE = "frame_cube.npy"
+CUBE_META_FILE = "frame_cube.json"
+
+# Frames interpolated per matrix product, bounds the temporary grids
+BATCH_FRAMES = 4096
+# Fewest valid sensors a slice needs to be interpolated
+MIN_POINTS = 4
+
+
+def group_slices(x, z, x_range=None, z_max=None, gap=1.5, width=1.0):
+    """
+    Groups the sensors by module slice: X positions closer than `gap` are one
+    slice, holding the sensors within `width` of it (and under `z_max`).
+    Returns a list of (x_pos, sensor indices).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+    mask_x = np.ones(len(x), dtype=bool)
+    if x_range is not None:
+        mask_x = (x >= x_range[0] - width) & (x <= x_range[1] + width)
+    mask_z = np.ones(len(z), dtype=bool) if z_max is None else z <= z_max
+
+    slices = []
+    for x_val in np.unique(x[mask_x]):
+        if not slices or abs(x_val - slices[-1]) > gap:
+            slices.append(x_val)
+    return [
+        (x_pos, np.flatnonzero(mask_x & mask_z & (np.abs(x - x_pos) <= width)))
+        for x_pos in slices
+    ]
+
+
+def interpolate_run(temperatures, y, z, slices, out, size=GRID_SIZE):
+    """
+    Interpolates every frame of every slice into `out` (time, slice, size, size).
+
+    Frames are grouped by the set of valid (> 0) sensors of the slice, each
+    group is interpolated with one operator in batched matrix products. The
+    grid of a slice spans all its sensors so every frame shares it.
+    """
+    from scipy.spatial import QhullError
+
+    for s, (_, idx) in enumerate(slices):
+        bounds = grid_bounds(y[idx], z[idx])
+        temps = temperatures[:, idx]
+        valid = temps > 0
+        masks, inverse = np.unique(valid, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        for m, mask in enumerate(masks):
+            frames = np.flatnonzero(inverse == m)
+            try:
+                if mask.sum() < MIN_POINTS:
+                    raise QhullError("not enough sensors")
+                _, _, operator = get_operator(
+                    y[idx], z[idx], size, bounds=bounds, valid=mask
+                )
+            except QhullError:
+                out[frames, s] = np.nan
+                continue
+            for start in range(0, len(frames), BATCH_FRAMES):
+                batch = frames[start : start + BATCH_FRAMES]
+                grids = operator(temps[batch][:, mask].T)
+                out[batch, s] = np.moveaxis(grids, -1, 0)
+    return out
+
+
+class FrameCube:
+    """
+    Interpolated grid of every frame and every module slice of a run, as a
+    (time, slice, size, size) array memory-mapped from disk.
+    """
+
+    def __init__(self, cube, x_positions, bounds, size):
+        self.cube = cube
+        self.x_positions = list(x_positions)
+        self.bounds = [tuple(b) for b in bounds]
+        self.size = size
+
+    @classmethod
+    def build(
+        cls, temperatures, y, z, slices, directory, size=GRID_SIZE, dtype=np.float16
+    ):
+        """Interpolates the whole run into `directory`, then maps it back."""
+        y = np.asarray(y, dtype=np.float64)
+        z = np.asarray(z, dtype=np.float64)
+        path = os.path.join(directory, CUBE_FILE)
+        tmp = f"{path}.tmp{os.getpid()}.npy"
+        cube = np.lib.format.open_memmap(
+            tmp,
+            mode="w+",
+            dtype=dtype,
+            shape=(len(temperatures), len(slices), size, size),
+        )
+        interpolate_run(np.asarray(temperatures), y, z, slices, cube, size)
+        cube.flush()
+        del cube
+        os.replace(tmp, path)
+
+        meta = {
+            "x_positions": [float(x_pos) for x_pos, _ in slices],
+            "bounds": [grid_bounds(y[idx], z[idx]) for _, idx in slices],
+            "sensors": [idx.tolist() for _, idx in slices],
+            "size": size,
+        }
+        # Written aside then renamed, a reader never sees a partial file
+        meta_path = os.path.join(directory, CUBE_META_FILE)
+        meta_tmp = f"{meta_path}.tmp{os.getpid()}"
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_tmp, meta_path)
+        return cls.open(directory)
+
+    @classmethod
+    def open(cls, directory, slices=None, size=GRID_SIZE):
+        """
+        Maps an existing cube, or returns None when there is none or when it was
+        built for other slices / another grid size.
+        """
+        try:
+            with open(os.path.join(directory, CUBE_META_FILE), encoding="utf-8") as f:
+                meta = json.load(f)
+            cube = np.load(os.path.join(directory, CUBE_FILE), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if meta["size"] != size:
+            return None
+        if slices is not None and meta["sensors"] != [
+            idx.tolist() for _, idx in slices
+        ]:
+            return None
+        return cls(cube, meta["x_positions"], meta["bounds"], meta["size"])
+
+    @classmethod
+    def load(
+        cls, temperatures, y, z, slices, directory, size=GRID_SIZE, dtype=np.float16
+    ):
+        """Opens the cube of this run, building it first if needed."""
+        cube = cls.open(directory, slices, size)
+        if cube is None or cube.cube.dtype != np.dtype(dtype):
+            with locked(os.path.join(directory, CUBE_FILE)):
+                cube = cls.open(directory, slices, size)
+                if cube is None or cube.cube.dtype != np.dtype(dtype):
+                    cube = cls.build(temperatures, y, z, slices, directory, size, dtype)
+        return cube
+
+    def slot(self, x_pos):
+        """Index of the slice at x_pos, None if the cube has no such slice."""
+        for s, x_cube in enumerate(self.x_positions):
+            if abs(x_cube - x_pos) < 1e-9:
+                return s
+        return None
+
+    def grid(self, s):
+        """(grid_y, grid_z) of slice s."""
+        return slice_grid(self.bounds[s], self.size)
+
+    def frame(self, t, s):
+        """Interpolated temperatures of slice s at frame t, NaN outside the sensors."""
+        return np.asarray(self.cube[t, s], dtype=np.float64)
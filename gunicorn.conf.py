@@ -0,0 +1,16 @@
+# Gunicorn settings of the dashboard: gunicorn -c gunicorn.conf.py app:server
+#
+# The app is imported once by the master before the workers are forked, the run
+# cache entries, frame cube and trend pyramid it maps read-only are then the same
+# pages in every worker. Without preloading, the workers map the same files and the
+# first one to start builds the missing entries under a file lock.
+# The callback metrics and the armed profiles (metrics.py, profiling.py) are only
+# shared by the workers with preloading.
+import multiprocessing
+import os
+
+bind = os.environ.get("HEATMAP_BIND", "0.0.0.0:10000")
+workers = int(os.environ.get("HEATMAP_WORKERS", min(4, multiprocessing.cpu_count())))
+preload_app = True
+# Building the caches of a new run on the first start can take a while
+timeout = 300
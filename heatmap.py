@@ -1,85 +1,36 @@
+from startup import StartupReport
 import sys
 import os
+import logging
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.widgets import Slider, RangeSlider
-from matplotlib.widgets import Button
-from scipy.interpolate import griddata
+from interpolation import get_operator
 import pandas as pd
-from submodules.ldparser.ldparser import ldData
-import threading
-import tkinter as tk
-from tkinter import filedialog
-
-def save_csv_in_background(data, filename):
-    """Sauvegarde le DataFrame en CSV dans un thread séparé."""
-    def save_csv():
-        data.to_csv(filename, index=False)
-        print(f"Fichier CSV sauvegardé : {filename}")
-    
-    thread = threading.Thread(target=save_csv)
-    thread.start()  # Démarre la sauvegarde en arrière-plan
-
-def process_ld_file(l,name):
+from demux import demux_ld
+from run_cache import load_run
+
+# Phases du démarrage (imports, chargement, premier affichage) dans le log. tkinter,
+# matplotlib et le parser .ld ne sont importés que lorsqu'ils servent
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+startup = StartupReport("viewer")
+startup.mark("imports")
+
+def process_ld_file(l):
     target_freq = 500 # fréquence des données cibles temp ect
 
     #trouver l'index correspondant à la fréquence cible
-    target_channel = next(chan for chan in l.channs if chan.freq == target_freq)
+    target_channel = next(chan for chan in l.channels.values() if chan.freq == target_freq)
     target_channel_index = target_channel.data_len
     print(f"Le Csv comportera {target_channel_index} valeurs par channel")
 
-    # Créer un index pour le DataFrame final
-    new_index = range(0, target_channel_index)
-
-    dataframes = []
-
-    for i in l.channs :
-        df = pd.DataFrame({i.name: i.data})
-        if i.name == "TEMPS MODULE" or i.name == "TEMPS GROUP" or i.name == "TEMPS VALUE1" or i.name == "TEMPS VALUE2":
-            dataframes.append(df)
-
-    combined_df = pd.concat(dataframes, axis=1)
-    combined_df.index = pd.Series([i / target_freq for i in new_index], name="Time")
-
-    df = combined_df.reset_index()
-    #keep  column temps_data = data[['TEMPS MODULE', 'TEMPS GROUP', 'TEMPS VALUE1', 'TEMPS VALUE2']].dropna()
-
-    # Convert columns to numeric, ignoring non-numeric conversion errors
-    temps_data = df[['TEMPS MODULE', 'TEMPS GROUP', 'TEMPS VALUE1', 'TEMPS VALUE2', 'Time']].dropna()
-    temps_data['TEMPS MODULE'] = pd.to_numeric(temps_data['TEMPS MODULE'], errors='coerce')
-    temps_data['TEMPS GROUP'] = pd.to_numeric(temps_data['TEMPS GROUP'], errors='coerce')
-    temps_data['TEMPS VALUE1'] = pd.to_numeric(temps_data['TEMPS VALUE1'], errors='coerce')
-    temps_data['TEMPS VALUE2'] = pd.to_numeric(temps_data['TEMPS VALUE2'], errors='coerce')
-
-    #except for the column drop all the rows that are same as the previous row
-    temps_data_unique = temps_data.loc[:, temps_data.columns != 'Time']
-    temps_data_unique = temps_data_unique.drop_duplicates(keep='first')
-
-    # Add the 'Time' column back to the DataFrame (aligning indexes)
-    temps_data_unique['Time'] = temps_data.loc[temps_data_unique.index, 'Time']
-    flattened_data = pd.DataFrame()
-
-    for _, row in temps_data_unique.iterrows():
-        module = int(row['TEMPS MODULE'])
-        group = int(row['TEMPS GROUP'])
-        col_name_value1 = f'Module_{module}_Group{group + 1}_Value1'
-        col_name_value2 = f'Module_{module}_Group{group + 17}_Value2'
-        flattened_data.at[row.name, col_name_value1] = row['TEMPS VALUE1']
-        flattened_data.at[row.name, col_name_value2] = row['TEMPS VALUE2']
-
-    flattened_data['Time'] = temps_data_unique['Time'].reset_index(drop=True)
-
-
-    flattened_data['Time'] = pd.to_datetime(flattened_data['Time'], errors='coerce')
-    flattened_data = flattened_data.sort_values(by='Time')
-    flattened_data = flattened_data.ffill().bfill().drop_duplicates()
-
-    # Sauvegarder les données dans un fichier CSV en arrière-plan
-    save_csv_in_background(flattened_data, name)
-
-    return flattened_data
+    # Seuls les 4 channels TEMPS sont décodés (alignés sur le plus court), les
+    # autres restent sur le disque
+    return demux_ld(l, target_freq)
 
 def plot_heatmap(data):
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Slider, RangeSlider
+    from matplotlib.widgets import Button
+
     # 1 module de batterie fait 8 cellules par 16, donc 128 cellules par module
     # 1 batterie fait 6 modules, donc 768 cellules par batterie 
     # nous on a 32 sensors par modules donc 192 sensors par batterie
@@ -135,15 +86,10 @@ def plot_heatmap(data):
             temperatures[:, idx] = data[col_name].values  # Insérer les valeurs de température
 
     # Création de la grille d'interpolation
+    # L'opérateur d'interpolation d'une slice est calculé une seule fois puis réutilisé
     def create_interpolation_grid(x_val, points_y, points_z, temp_values):
-        y_min, y_max = min(points_y), max(points_y)
-        z_min, z_max = min(points_z), max(points_z)
-        
-        grid_y, grid_z = np.mgrid[y_min:y_max:25j, z_min:z_max:25j]
-        
-        # Créer les points pour l'interpolation
-        points = np.column_stack((points_y, points_z))
-        grid_temp = griddata(points, temp_values, (grid_y, grid_z), method='cubic')
+        grid_y, grid_z, operator = get_operator(points_y, points_z, size=25)
+        grid_temp = operator(temp_values)
         
         return grid_y, grid_z, grid_temp
 
@@ -153,6 +99,8 @@ def plot_heatmap(data):
     gs = fig.add_gridspec(1, 2, width_ratios=[20, 1])  # Ratio pour le graphique principal et la colorbar
     ax = fig.add_subplot(gs[0], projection='3d')
     cax = fig.add_subplot(gs[1])  # Axe dédié pour la colorbar
+    # Temps jusqu'au premier affichage de la figure
+    fig.canvas.mpl_connect("draw_event", lambda event: startup.first("plot"))
 
     # Sliders
     ax_time = plt.axes([0.2, 0.02, 0.65, 0.03], facecolor="lightgoldenrodyellow")
@@ -271,6 +219,9 @@ def plot_heatmap(data):
     plt.show()
 
 def select_file_via_dialog():
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()  # Cacher la fenêtre principale Tkinter
     file_path = filedialog.askopenfilename(
@@ -295,27 +246,45 @@ if not file_path.lower().endswith('.ld'):
     print("Erreur: Le fichier fourni n'est pas un fichier ld.")
     sys.exit(1)
 
-try:
-    l = ldData.fromfile(file_path)
-except Exception as e:
-    print(f"Erreur lors du chargement du fichier : {e}")
-    sys.exit(1)
-
-print(l.head)
-#print(list(map(str, l))) # list of channels
-print()
-
 if hasattr(sys, '_MEIPASS'):
     temp_dir = os.path.join(sys._MEIPASS, "data_temp")
 else:
     temp_dir = "data_temp"
 
-name = l.head.datetime.strftime(f"{temp_dir}/TEMP_%Y-%m-%d_%H-%M-%S.csv")
+def load_ld_file(file_path):
+    # Le parser .ld n'est importé que si le cache doit être reconstruit
+    from ld_reader import LdFile
 
-if os.path.exists(name):
-    flattened_data = pd.read_csv(name)
-else:
-    flattened_data = process_ld_file(l,name)
+    try:
+        l = LdFile(file_path)
+    except Exception as e:
+        print(f"Erreur lors du chargement du fichier : {e}")
+        sys.exit(1)
+
+    print(l.head)
+    #print(list(l.channels)) # list of channels
+    print()
+    return l
+
+# Le .ld n'est décodé que si le cache est absent ou périmé
+loaded = {}
+
+def ld_label():
+    # Le cache est nommé d'après la date du header du .ld (+ hash du contenu)
+    loaded["l"] = load_ld_file(file_path)
+    return loaded["l"].head.datetime.strftime("TEMP_%Y-%m-%d_%H-%M-%S")
+
+def build_run():
+    l = loaded.get("l") or load_ld_file(file_path)
+    return process_ld_file(l)
+
+# Un chemin invalide échoue dès la clé du cache, avant l'ouverture du .ld
+try:
+    flattened_data = load_run(file_path, build_run, ld_label, cache_dir=temp_dir)
+except OSError as e:
+    print(f"Erreur lors du chargement du fichier : {e}")
+    sys.exit(1)
+startup.mark("data load")
 
-# loader les données du csv
+# loader les données du cache
 plot_heatmap(flattened_data)
@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('data_temp', 'data_temp')],
-    hiddenimports=['tkinter','pandas','matplotlib.widgets','matplotlib.pyplot','numpy','scipy.interpolate', 'submodules.ldparser.ldparser'],
+    hiddenimports=['tkinter','pandas','matplotlib.widgets','matplotlib.pyplot','numpy','scipy.interpolate', 'scipy.spatial', 'submodules.ldparser.ldparser'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from decimate import bucket_size, decimate_frame
+from stats import masked_stats
+
+# Telemetry channels used by the dashboard besides the Module_* temperatures
+TIME_COLUMN = "Time"
+DC_BUS_CURRENT = "D4 DC Bus Current"
+DC_BUS_VOLTAGE = "D1 DC Bus Voltage"
+SOC_COLUMN = "SOC PERCENT"
+
+PACK_INTERNAL_RESISTANCE = 0.017 / 8  # Ohms
+
+# Fan command: off below FAN_START, linear ramp up to FAN_MAX at FAN_FULL
+FAN_START, FAN_FULL, FAN_MAX = 35.0, 50.0, 70.0
+
+# Chunk length, in decimation buckets so a bucket never spans two chunks
+BUCKETS_PER_CHUNK = 1000
+
+
+def telemetry_columns(path):
+    """Columns of the CSV header kept by the ingest (column projection)."""
+    header = pd.read_csv(path, nrows=0).columns
+    keep = {TIME_COLUMN, DC_BUS_CURRENT, DC_BUS_VOLTAGE, SOC_COLUMN}
+    return [
+        col
+        for col in header
+        if col in keep or (col.startswith("Module_") and "Group" in col)
+    ]
+
+
+def add_derived_columns(chunk):
+    """POWER and THERMAL LOSS (W), computed on full rate samples."""
+    if DC_BUS_CURRENT not in chunk.columns or DC_BUS_VOLTAGE not in chunk.columns:
+        return chunk
+    current = chunk[DC_BUS_CURRENT]
+    derived = pd.DataFrame(
+        {
+            "POWER": current * chunk[DC_BUS_VOLTAGE],
+            "THERMAL LOSS (W)": (current**2) * np.float32(PACK_INTERNAL_RESISTANCE),
+        },
+        index=chunk.index,
+    )
+    return pd.concat([chunk, derived], axis=1)
+
+
+def iter_telemetry_chunks(path, chunksize):
+    """
+    Streams the CSV as float32 chunks restricted to the useful columns, with the
+    derived columns added.
+    """
+    columns = telemetry_columns(path)
+    dtypes = {col: np.float32 for col in columns if col != TIME_COLUMN}
+    reader = pd.read_csv(
+        path,
+        usecols=columns,
+        dtype=dtypes,
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        if TIME_COLUMN in chunk.columns:
+            chunk[TIME_COLUMN] = pd.to_datetime(chunk[TIME_COLUMN])
+        yield add_derived_columns(chunk)
+
+
+def fan_speed(max_temp):
+    """Fan command (%) from the pack max temperature."""
+    ramp = (np.asarray(max_temp) - FAN_START) / (FAN_FULL - FAN_START)
+    return np.clip(ramp, 0.0, 1.0) * FAN_MAX
+
+
+def trend_channels(chunk):
+    """
+    Full rate channels of the trend graphs: pack min/avg/max temperature (readings
+    <= 0 are missing, 0 when no sensor is valid), fan speed, POWER and SOC.
+    """
+    temp_columns = [
+        col for col in chunk.columns if col.startswith("Module_") and "Group" in col
+    ]
+    stats = masked_stats(chunk[temp_columns], percentiles=())
+    trends = pd.DataFrame(
+        {name: stats[name] for name in ("min_temp", "avg_temp", "max_temp")}
+    )
+    trends["fan_speed"] = fan_speed(trends["max_temp"]).astype(np.float32)
+    for col in ("POWER", SOC_COLUMN):
+        if col in chunk.columns:
+            trends[col] = chunk[col].to_numpy(np.float32)
+    return trends
+
+
+def ingest_telemetry(path, step=100, mode="minmax", channel_modes=None):
+    """
+    Reads a telemetry CSV chunk by chunk, decimating each chunk by `step` (see
+    decimate.decimate_frame for the modes) before reading the next one, so peak
+    memory only depends on the chunk size and the reduced output, not on the
+    length of the run. Chunks hold whole buckets, so the result does not depend
+    on where the chunks are cut (except for lttb, which restarts every chunk).
+
+    Returns (decimated frame, full rate trend channels).
+    """
+    chunksize = bucket_size(step, mode) * BUCKETS_PER_CHUNK
+    parts, trends = [], []
+    for chunk in iter_telemetry_chunks(path, chunksize):
+        parts.append(decimate_frame(chunk, step, mode, channel_modes))
+        trends.append(trend_channels(chunk))
+    return pd.concat(parts, ignore_index=True), pd.concat(trends, ignore_index=True)
+
+
+def read_telemetry(path, step=100, mode="minmax", channel_modes=None):
+    """Decimated telemetry only, see ingest_telemetry."""
+    return ingest_telemetry(path, step, mode, channel_modes)[0]
@@ -0,0 +1,165 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Grid resolution of a module slice (GRID_SIZE x GRID_SIZE)
+GRID_SIZE = 30
+# Weights are kept as a dense array above this ratio of non zero weights
+DENSE_RATIO = 0.25
+# Operators kept in memory (slice layouts x valid sensor masks)
+OPERATOR_CACHE_SIZE = 256
+
+
+def grid_bounds(points_y, points_z):
+    """(y_min, y_max, z_min, z_max) of the sensors of a slice."""
+    return (
+        float(np.min(points_y)),
+        float(np.max(points_y)),
+        float(np.min(points_z)),
+        float(np.max(points_z)),
+    )
+
+
+def slice_grid(bounds, size=GRID_SIZE):
+    """Regular (y, z) grid over the bounding box of the sensors of a slice."""
+    y_min, y_max, z_min, z_max = bounds
+    return np.mgrid[y_min : y_max : size * 1j, z_min : z_max : size * 1j]
+
+
+class InterpolationOperator:
+    """
+    Interpolation of a fixed set of sensor positions onto a fixed grid, as a
+    (grid points x sensors) weight matrix, sparse unless most weights are used.
+
+    The triangulation and the interpolation weights are computed once, then
+    interpolating a frame is one matrix-vector product. Both methods
+    are linear in the sensor values, so the weights are the interpolation of
+    the identity: "linear" gives the barycentric weights of the Delaunay
+    triangle holding each grid point, "cubic" the Clough-Tocher weights (the
+    same scheme as griddata(method="cubic")). Grid points outside the convex
+    hull of the sensors are NaN, like with griddata.
+    """
+
+    def __init__(self, points, grid_y, grid_z, method="cubic"):
+        # scipy is imported by the first operator built, not at startup
+        from scipy import sparse
+        from scipy.interpolate import CloughTocher2DInterpolator
+        from scipy.spatial import Delaunay
+
+        points = np.asarray(points, dtype=np.float64)
+        self.shape = grid_y.shape
+        xi = np.column_stack((grid_y.ravel(), grid_z.ravel()))
+        tri = Delaunay(points)
+
+        if method == "linear":
+            simplex = tri.find_simplex(xi)
+            inside = simplex >= 0
+            transform = tri.transform[simplex[inside]]
+            bary = np.einsum(
+                "ijk,ik->ij", transform[:, :2], xi[inside] - transform[:, 2]
+            )
+            weights = np.column_stack((bary, 1 - bary.sum(axis=1)))
+            rows = np.repeat(np.flatnonzero(inside), 3)
+            cols = tri.simplices[simplex[inside]].ravel()
+            matrix = sparse.csr_matrix(
+                (weights.ravel(), (rows, cols)), shape=(len(xi), len(points))
+            )
+        elif method == "cubic":
+            dense = CloughTocher2DInterpolator(tri, np.eye(len(points)))(xi)
+            inside = ~np.isnan(dense).any(axis=1)
+            dense[~inside] = 0.0
+            dense[np.abs(dense) < 1e-12] = 0.0
+            matrix = sparse.csr_matrix(dense)
+        else:
+            raise ValueError(f"Unknown interpolation method: {method}")
+
+        # Clough-Tocher weights are mostly dense on a module slice, a plain
+        # array product is then cheaper than the sparse one
+        if matrix.nnz > DENSE_RATIO * np.prod(matrix.shape):
+            matrix = matrix.toarray()
+        self.matrix = matrix
+        self.outside = ~inside
+
+    def __call__(self, values):
+        """
+        Interpolates sensor values, shape (sensors,) or (sensors, frames), into
+        grids of shape grid_shape or grid_shape + (frames,).
+        """
+        grid = np.asarray(self.matrix @ values, dtype=np.float64)
+        grid[self.outside] = np.nan
+        return grid.reshape(self.shape + grid.shape[1:])
+
+
+class OperatorCache:
+    """
+    LRU cache of interpolation operators, keyed by slice layout and by the
+    bitmask of the sensors valid in the frame, with hit/miss counters.
+    Runs with flaky sensors only see a few distinct masks, which all end up
+    precomputed.
+    """
+
+    def __init__(self, maxsize=OPERATOR_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, build):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        entry = self._entries[key] = build()
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+operator_cache = OperatorCache()
+
+
+def get_operator(
+    points_y, points_z, size=GRID_SIZE, method="cubic", bounds=None, valid=None
+):
+    """
+    Operator for this slice layout (sensor positions, grid over `bounds`, by
+    default the bounding box of the sensors) restricted to the `valid` sensors
+    (all of them by default), built on the first call and then served from
+    operator_cache. Returns (grid_y, grid_z, operator).
+    """
+    points = np.column_stack((points_y, points_z)).astype(np.float64)
+    if valid is None:
+        valid = np.ones(len(points), dtype=bool)
+    valid = np.asarray(valid, dtype=bool)
+    if bounds is None:
+        bounds = grid_bounds(points[valid, 0], points[valid, 1])
+    key = (
+        points.tobytes(),
+        np.packbits(valid).tobytes(),
+        tuple(bounds),
+        size,
+        method,
+    )
+
+    def build():
+        grid_y, grid_z = slice_grid(bounds, size)
+        operator = InterpolationOperator(points[valid], grid_y, grid_z, method)
+        return grid_y, grid_z, operator
+
+    return operator_cache.get(key, build)
@@ -0,0 +1,128 @@
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+# Start of the .ld header: marker, pointer to the first channel descriptor, pointer to the data
+HEAD_FMT = "<I4xII"
+
+# Channel descriptor, same layout as ldparser.ldChan
+CHAN_FMT = "<" + (
+    "IIII"  # prev_meta_ptr next_meta_ptr data_ptr data_len
+    "H"  # counter
+    "HHH"  # dtype_a dtype freq
+    "hhhh"  # shift mul scale dec
+    "32s"  # name
+    "8s"  # short name
+    "12s"  # unit
+    "40x"
+)
+CHAN_SIZE = struct.calcsize(CHAN_FMT)
+
+LdChannel = namedtuple(
+    "LdChannel",
+    "name short_name unit freq data_ptr data_len dtype shift mul scale dec meta_ptr",
+)
+
+
+def _decode_string(raw):
+    return raw.decode("ascii", errors="ignore").rstrip("\0").strip()
+
+
+def _sample_dtype(dtype_a, dtype):
+    if dtype_a == 0x07:
+        sample = [None, np.float16, None, np.float32][dtype - 1]
+    elif dtype_a in (0x00, 0x03, 0x05):
+        sample = [None, np.int16, None, np.int32][dtype - 1]
+    else:
+        sample = None
+    if sample is None:
+        raise ValueError(f"Datatype {dtype_a}/{dtype} not recognized")
+    return np.dtype(sample).newbyteorder("<")
+
+
+def read_channel_directory(f):
+    """Walks the linked list of channel descriptors without touching any sample."""
+    f.seek(0)
+    _, meta_ptr, _ = struct.unpack(HEAD_FMT, f.read(struct.calcsize(HEAD_FMT)))
+
+    channels = {}
+    while meta_ptr:
+        f.seek(meta_ptr)
+        (
+            _,
+            next_meta_ptr,
+            data_ptr,
+            data_len,
+            _,
+            dtype_a,
+            dtype,
+            freq,
+            shift,
+            mul,
+            scale,
+            dec,
+            name,
+            short_name,
+            unit,
+        ) = struct.unpack(CHAN_FMT, f.read(CHAN_SIZE))
+        chan = LdChannel(
+            _decode_string(name),
+            _decode_string(short_name),
+            _decode_string(unit),
+            freq,
+            data_ptr,
+            data_len,
+            _sample_dtype(dtype_a, dtype),
+            shift,
+            mul,
+            scale,
+            dec,
+            meta_ptr,
+        )
+        channels.setdefault(chan.name, chan)
+        meta_ptr = next_meta_ptr
+    return channels
+
+
+def read_channels(path, channels, names):
+    """
+    Decodes the `names` channels of the `channels` directory into physical
+    values, (raw / scale * 10^-dec + shift) * mul. Returns {name: float array}.
+    """
+    data = {}
+    with open(path, "rb") as f:
+        for name in names:
+            chan = channels[name]
+            f.seek(chan.data_ptr)
+            raw = np.fromfile(f, dtype=chan.dtype, count=chan.data_len)
+            values = raw.astype(np.float64)
+            values /= chan.scale
+            values *= 10.0**-chan.dec
+            values += chan.shift
+            values *= chan.mul
+            data[name] = values
+    return data
+
+
+class LdFile:
+    """
+    Lazy view of a .ld log: the header and the channel directory are read on
+    open, the samples of a channel are only read (by offset) when asked for.
+    """
+
+    def __init__(self, path):
+        # The ldparser submodule only reads the header
+        from submodules.ldparser.ldparser import ldHead
+
+        self.path = path
+        with open(path, "rb") as f:
+            self.head = ldHead.fromfile(f)
+            self.channels = read_channel_directory(f)
+
+    def __contains__(self, name):
+        return name in self.channels
+
+    def read(self, names):
+        """Decodes the given channels into physical values, returns {name: float array}."""
+        return read_channels(self.path, self.channels, names)
@@ -0,0 +1,296 @@
+import functools
+import multiprocessing
+import threading
+import time
+
+import numpy as np
+
+# Route of the Dash callback requests
+CALLBACK_PATH = "/_dash-update-component"
+# Parts of a callback request: computing the frame values, building the figure,
+# serializing it (figure cache and Dash response encoding) and parsing the figures
+# read from the figure cache
+PHASES = ("compute", "figure", "serialize", "deserialize")
+# Upper bounds of the request time (s) and response size (bytes) histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (1 << 10, 4 << 10, 16 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20)
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Callbacks that can be instrumented, rows of the shared counters
+MAX_CALLBACKS = 32
+
+# Callback request being served by this thread, None outside of one
+_local = threading.local()
+
+
+class _Request:
+    __slots__ = ("start", "last", "returned", "callback", "phases", "hits", "misses")
+
+    def __init__(self):
+        self.start = self.last = self.returned = time.perf_counter()
+        self.callback = None
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.hits = self.misses = 0
+
+
+def mark(phase):
+    """
+    Ends the `phase` of the current callback request, begun at the previous mark
+    (or at the start of the callback). No-op outside of an instrumented callback.
+    """
+    current = getattr(_local, "request", None)
+    if current is not None and current.callback is not None:
+        now = time.perf_counter()
+        current.phases[phase] += now - current.last
+        current.last = now
+
+
+def cache_lookup(hit):
+    """Counts a figure cache lookup of the current callback request."""
+    current = getattr(_local, "request", None)
+    if current is not None and current.callback is not None:
+        if hit:
+            current.hits += 1
+        else:
+            current.misses += 1
+
+
+class Histogram:
+    """
+    Prometheus style histogram: counts per bucket upper bound, sum and count,
+    held in `values` (one slot per bucket, then the sum and the count).
+    """
+
+    def __init__(self, buckets, values=None):
+        self.buckets = buckets
+        self.values = np.zeros(len(buckets) + 2) if values is None else values
+
+    @property
+    def counts(self):
+        return self.values[: len(self.buckets)].astype(np.int64)
+
+    @property
+    def sum(self):
+        return float(self.values[-2])
+
+    @property
+    def count(self):
+        return int(self.values[-1])
+
+    def observe(self, value):
+        i = np.searchsorted(self.buckets, value)
+        if i < len(self.buckets):
+            self.values[i] += 1
+        self.values[-2] += value
+        self.values[-1] += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6g}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class CallbackStats:
+    """Counters of one callback, a view on its row of the shared counters."""
+
+    # Row layout: the two histograms, the time of each phase, max time, hits, misses
+    SECONDS = slice(0, len(LATENCY_BUCKETS) + 2)
+    BYTES = slice(SECONDS.stop, SECONDS.stop + len(SIZE_BUCKETS) + 2)
+    PHASE_SECONDS = slice(BYTES.stop, BYTES.stop + len(PHASES))
+    MAX_SECONDS, HITS, MISSES = range(PHASE_SECONDS.stop, PHASE_SECONDS.stop + 3)
+    SIZE = MISSES + 1
+
+    def __init__(self, row=None):
+        self.row = np.zeros(self.SIZE) if row is None else row
+        self.seconds = Histogram(LATENCY_BUCKETS, self.row[self.SECONDS])
+        self.bytes = Histogram(SIZE_BUCKETS, self.row[self.BYTES])
+
+    @property
+    def phases(self):
+        return dict(zip(PHASES, self.row[self.PHASE_SECONDS].tolist()))
+
+    @property
+    def max_seconds(self):
+        return float(self.row[self.MAX_SECONDS])
+
+    @property
+    def hits(self):
+        return int(self.row[self.HITS])
+
+    @property
+    def misses(self):
+        return int(self.row[self.MISSES])
+
+
+class CallbackMetrics:
+    """
+    Time, time split, response size and figure cache lookups of the Dash callbacks
+    wrapped by instrument(), per callback.
+
+    A request is timed from the start of the Flask request to its response: the
+    callback itself is "compute" except for the parts ended by mark() (figure
+    build, serialization and parsing in the figure cache), the encoding of its
+    output by Dash is "serialize". The size is the one of the response before compression.
+
+    The counters are in shared memory with a process shared lock, created with
+    the instance: created before gunicorn forks its workers (preload_app, see
+    gunicorn.conf.py), every worker adds to them and serves the totals.
+    """
+
+    def __init__(self, max_callbacks=MAX_CALLBACKS):
+        self.callbacks = {}
+        self.max_callbacks = max_callbacks
+        self._shared = multiprocessing.RawArray("d", max_callbacks * CallbackStats.SIZE)
+        self._rows = np.frombuffer(self._shared).reshape(max_callbacks, -1)
+        self._lock = multiprocessing.Lock()
+
+    def instrument(self, func):
+        """Decorator of a Dash callback, placed under @app.callback."""
+        name = func.__name__
+        with self._lock:
+            if name not in self.callbacks:
+                if len(self.callbacks) == self.max_callbacks:
+                    raise ValueError(f"more than {self.max_callbacks} callbacks")
+                self.callbacks[name] = CallbackStats(self._rows[len(self.callbacks)])
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            current = getattr(_local, "request", None)
+            if current is None:
+                return func(*args, **kwargs)
+            current.callback = name
+            current.last = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                mark("compute")
+                current.returned = current.last
+
+        return wrapper
+
+    def record(self, current, size):
+        now = time.perf_counter()
+        current.phases["serialize"] += now - current.returned
+        stats = self.callbacks[current.callback]
+        row = stats.row
+        with self._lock:
+            stats.seconds.observe(now - current.start)
+            stats.bytes.observe(size)
+            row[stats.MAX_SECONDS] = max(row[stats.MAX_SECONDS], now - current.start)
+            row[stats.PHASE_SECONDS] += [current.phases[phase] for phase in PHASES]
+            row[stats.HITS] += current.hits
+            row[stats.MISSES] += current.misses
+
+    def register(self, server, route="/metrics"):
+        """
+        Times the callback requests of a Flask server and serves the metrics in
+        the Prometheus text format on `route`.
+        """
+        from flask import Response, request
+
+        @server.before_request
+        def start_request():
+            if request.path == CALLBACK_PATH:
+                _local.request = _Request()
+
+        # Registered after gzip_responses, so it runs before it and sees the
+        # uncompressed body
+        @server.after_request
+        def end_request(response):
+            current = getattr(_local, "request", None)
+            _local.request = None
+            if current is not None and current.callback is not None:
+                size = 0 if response.is_streamed else len(response.get_data())
+                self.record(current, size)
+            return response
+
+        @server.teardown_request
+        def clear_request(exc):
+            _local.request = None
+
+        server.add_url_rule(
+            route,
+            "callback_metrics",
+            lambda: Response(self.prometheus(), content_type=PROMETHEUS_TYPE),
+        )
+
+    def summary(self):
+        """Averages per callback, for the debug panel."""
+        rows = []
+        with self._lock:
+            for name, stats in self.callbacks.items():
+                n = stats.seconds.count
+                lookups = stats.hits + stats.misses
+                rows.append(
+                    {
+                        "callback": name,
+                        "requests": n,
+                        "mean_ms": 1000 * stats.seconds.sum / n if n else 0.0,
+                        "max_ms": 1000 * stats.max_seconds,
+                        **{
+                            f"{phase}_ms": 1000 * seconds / n if n else 0.0
+                            for phase, seconds in stats.phases.items()
+                        },
+                        "mean_kb": stats.bytes.sum / 1024 / n if n else 0.0,
+                        "hit_rate": stats.hits / lookups if lookups else None,
+                    }
+                )
+        return rows
+
+    def prometheus(self):
+        """Metrics of every instrumented callback in the Prometheus text format."""
+        seconds, sizes, phases, hits, misses = [], [], [], [], []
+        with self._lock:
+            for name, stats in self.callbacks.items():
+                labels = f'callback="{name}"'
+                seconds.extend(stats.seconds.lines("heatmap_callback_seconds", labels))
+                sizes.extend(
+                    stats.bytes.lines("heatmap_callback_response_bytes", labels)
+                )
+                for phase, total in stats.phases.items():
+                    phases.append(
+                        f"heatmap_callback_phase_seconds_total"
+                        f'{{{labels},phase="{phase}"}} {total:.6g}'
+                    )
+                hits.append(
+                    f"heatmap_callback_cache_hits_total{{{labels}}} {stats.hits}"
+                )
+                misses.append(
+                    f"heatmap_callback_cache_misses_total{{{labels}}} {stats.misses}"
+                )
+
+        lines = []
+        for name, kind, help_text, samples in (
+            (
+                "heatmap_callback_seconds",
+                "histogram",
+                "Time of the callback requests",
+                seconds,
+            ),
+            (
+                "heatmap_callback_phase_seconds_total",
+                "counter",
+                "Time of the callback requests spent computing, building, serializing and parsing figures",
+                phases,
+            ),
+            (
+                "heatmap_callback_response_bytes",
+                "histogram",
+                "Size of the callback responses before compression",
+                sizes,
+            ),
+            ("heatmap_callback_cache_hits_total", "counter", "Figure cache hits", hits),
+            (
+                "heatmap_callback_cache_misses_total",
+                "counter",
+                "Figure cache misses",
+                misses,
+            ),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
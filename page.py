@@ -4,6 +4,7 @@ from dash.dependencies import Input, Output
 from dash import State
 from dash import callback_context
 import dash_bootstrap_components as dbc
+from events import EVENT_KINDS
 def get_css():
     return """
 <!DOCTYPE html>
@@ -177,10 +178,58 @@ def get_css():
 """
 
 # Define the app layout
-def get_html_layout(num_timestamps, z):
+def get_metrics_panel():
+    """
+    Debug panel of the callback metrics (time, time split, response size, cache
+    hits), filled by app.py every few seconds.
+    """
+    return html.Div(
+        [
+            html.Div(
+                [
+                    html.H2(
+                        [
+                            html.I(
+                                className="fas fa-stopwatch",
+                                style={"marginRight": "10px"},
+                            ),
+                            "Callback Metrics",
+                        ],
+                        style={
+                            "margin": "0 0 10px",
+                            "color": "white",
+                            "fontSize": "28px",
+                            "fontWeight": "600",
+                        },
+                    ),
+                    html.P(
+                        "Server time and payload of the dashboard callbacks in every worker, also served on /metrics",
+                        style={"margin": "0", "opacity": "0.9", "fontSize": "16px"},
+                    ),
+                ],
+                className="section-header",
+            ),
+            html.Div(
+                [
+                    html.Table(
+                        id="metrics-table",
+                        className="table table-sm",
+                        style={"fontSize": "13px"},
+                    ),
+                    dcc.Interval(id="metrics-interval", interval=3000),
+                ],
+                className="section-content",
+            ),
+        ],
+        className="section-card",
+    )
+
+
+def get_html_layout(num_timestamps, z, debug_panel=False):
     """
     Returns the HTML layout for the Dash app.
-    This includes a hero section, quick start guide, and feature highlights.
+    This includes a hero section, quick start guide, and feature highlights,
+    and the callback metrics panel with `debug_panel`.
     """
 
 
@@ -817,6 +866,10 @@ def get_html_layout(num_timestamps, z):
                                                                 n_intervals=0,
                                                                 disabled=True,
                                                             ),
+                                                            dcc.Store(id="playback-request"),
+                                                            dcc.Store(id="playback-block"),
+                                                            dcc.Store(id="playback-position"),
+                                                            dcc.Store(id="playback-end"),
                                                         ]
                                                     ),
                                                 ],
@@ -1008,6 +1061,72 @@ def get_html_layout(num_timestamps, z):
                                                     "color": "#444",
                                                 },
                                             ),
+                                            dcc.RadioItems(
+                                                id="casing-detail",
+                                                options=[
+                                                    {"label": " High detail", "value": 0},
+                                                    {"label": " Medium", "value": 1},
+                                                    {"label": " Low", "value": 2},
+                                                ],
+                                                value=0,
+                                                inline=True,
+                                                inputStyle={"marginRight": "6px"},
+                                                labelStyle={
+                                                    "marginRight": "15px",
+                                                    "fontSize": "14px",
+                                                    "color": "#444",
+                                                },
+                                                style={"marginTop": "10px"},
+                                            ),
+                                        ],
+                                        className="control-item",
+                                        style={"gridColumn": "span 2"},
+                                    ),
+                                    html.Div(
+                                        [
+                                            html.Label(
+                                                [
+                                                    html.I(
+                                                        className="fas fa-fire",
+                                                        style={"marginRight": "8px"},
+                                                    ),
+                                                    "Thermal Events",
+                                                ],
+                                                style={
+                                                    "fontWeight": "600",
+                                                    "color": "#1f2c56",
+                                                    "fontSize": "16px",
+                                                    "marginBottom": "15px",
+                                                    "display": "block",
+                                                },
+                                            ),
+                                            html.P(
+                                                "Jump the time slider to a threshold crossing, a fast heating, the hottest sensors of a period or a large temperature spread",
+                                                className="help-text",
+                                                style={"marginBottom": "10px"},
+                                            ),
+                                            dcc.RadioItems(
+                                                id="event-kind",
+                                                options=[{"label": " All", "value": "all"}]
+                                                + [
+                                                    {"label": f" {label}", "value": kind}
+                                                    for kind, label in EVENT_KINDS.items()
+                                                ],
+                                                value="all",
+                                                inline=True,
+                                                inputStyle={"marginRight": "6px"},
+                                                labelStyle={
+                                                    "marginRight": "15px",
+                                                    "fontSize": "14px",
+                                                    "color": "#444",
+                                                },
+                                                style={"marginBottom": "10px"},
+                                            ),
+                                            dcc.Dropdown(
+                                                id="event-select",
+                                                placeholder="Select an event to jump to its frame",
+                                                clearable=True,
+                                            ),
                                         ],
                                         className="control-item",
                                         style={"gridColumn": "span 2"},
@@ -1097,6 +1216,11 @@ def get_html_layout(num_timestamps, z):
                                             "borderRadius": "12px",
                                         },
                                     ),
+                                    # Geometry of the figure on the client, decides
+                                    # between a Patch and a full rebuild
+                                    dcc.Store(id="battery-3d-state"),
+                                    dcc.Store(id="battery-3d-figure"),
+                                    dcc.Store(id="casing-mesh"),
                                 ],
                                 className="section-content",
                                 style={"padding": "20px"},
@@ -1248,6 +1372,7 @@ def get_html_layout(num_timestamps, z):
                                                 style={"marginBottom": "20px"},
                                             ),
                                             dcc.Graph(id="temp-trends-graph"),
+                                            dcc.Store(id="temp-trends-window"),
                                         ],
                                         style={"marginBottom": "40px"},
                                     ),
@@ -1349,6 +1474,7 @@ def get_html_layout(num_timestamps, z):
                                                 style={"marginBottom": "20px"},
                                             ),
                                             dcc.Graph(id="power-graph"),
+                                            dcc.Store(id="power-window"),
                                         ],
                                         style={"marginBottom": "40px"},
                                     ),
@@ -1419,6 +1545,7 @@ def get_html_layout(num_timestamps, z):
                                                 style={"marginBottom": "20px"},
                                             ),
                                             dcc.Graph(id="fan-graph"),
+                                            dcc.Store(id="fan-window"),
                                         ],
                                         style={"marginBottom": "40px"},
                                     ),
@@ -1476,6 +1603,7 @@ def get_html_layout(num_timestamps, z):
                                                 style={"marginBottom": "20px"},
                                             ),
                                             dcc.Graph(id="soc-graph"),
+                                            dcc.Store(id="soc-window"),
                                         ]
                                     ),
                                 ],
@@ -1484,6 +1612,7 @@ def get_html_layout(num_timestamps, z):
                         ],
                         className="section-card",
                     ),
+                    *([get_metrics_panel()] if debug_panel else []),
                 ],
                 className="main-container",
             ),
@@ -0,0 +1,94 @@
+import base64
+
+import numpy as np
+
+# Frames sent to the browser per block, and rows advanced per playback frame
+BLOCK_FRAMES = 40
+PLAYBACK_STEP = 20
+# Distance between the front and back faces of a slice drawn from the cube
+SLICE_WIDTH = 1.5
+
+# Quantized colors are 0..254, 255 marks the grid points outside the sensors
+NAN_CODE = 255
+
+
+def quantize(grids):
+    """Quantizes float grids to uint8 between their min and max, NaN as NAN_CODE."""
+    grids = np.asarray(grids, dtype=np.float32)
+    finite = np.isfinite(grids)
+    lo = float(grids[finite].min()) if finite.any() else 0.0
+    hi = float(grids[finite].max()) if finite.any() else 1.0
+    scale = 254.0 / (hi - lo) if hi > lo else 0.0
+    codes = np.where(finite, np.round((grids - lo) * scale), NAN_CODE)
+    return codes.astype(np.uint8), lo, hi
+
+
+def color_range(temperatures, frames, sensors):
+    """Colorscale range of the 3D figure for each frame, as in build_3d_figure."""
+    temps = np.asarray(temperatures[frames][:, sensors], dtype=np.float64)
+    valid = temps > 0
+    has_valid = valid.any(axis=1)
+    temp_min = np.where(has_valid, np.where(valid, temps, np.inf).min(axis=1), 20)
+    temp_max = np.where(has_valid, np.where(valid, temps, -np.inf).max(axis=1), 50)
+    return np.minimum(temp_min, 20), np.maximum(temp_max, 50)
+
+
+def encode_block(
+    frame_cube, temperatures, sensors, start, step=PLAYBACK_STEP, markers=()
+):
+    """
+    Block of upcoming frames for the clientside playback: the surface colors of
+    every cube slice, quantized to uint8 and base64 encoded, with the names of
+    the traces drawing each slice (Surface traces by name, the slices Mesh3d by
+    its meta), their y/z grids and the colorscale range of each frame.
+
+    `markers` are the (x_pos, y, z, sensor indices) of the slices in view, their
+    sensor temperatures are sent for each frame to move the sensor markers.
+    """
+    total = len(frame_cube.cube)
+    frames = np.arange(start, total, step)[:BLOCK_FRAMES]
+    codes, lo, hi = quantize(frame_cube.cube[frames])
+    cmin, cmax = color_range(temperatures, frames, sensors)
+    order = np.concatenate([idx for *_, idx in markers] or [np.zeros(0, int)])
+    marker_temps = np.nan_to_num(
+        np.asarray(temperatures[frames][:, order], dtype=np.float64), nan=0.0
+    )
+    return {
+        "clientside": True,
+        "start": int(start),
+        "step": int(step),
+        "count": int(len(frames)),
+        "total": int(total),
+        "index": frames.tolist(),
+        "slots": len(frame_cube.x_positions),
+        "size": frame_cube.size,
+        "width": SLICE_WIDTH,
+        "lo": lo,
+        "hi": hi,
+        "cmin": cmin.round(2).tolist(),
+        "cmax": cmax.round(2).tolist(),
+        "traces": [
+            {
+                "slot": s,
+                "slice": f"Module {x_pos}",
+                "names": [f"Module {x_pos} Front", f"Module {x_pos} Back"],
+                "x": x_pos,
+                "y": np.round(frame_cube.grid(s)[0], 4).tolist(),
+                "z": np.round(frame_cube.grid(s)[1], 4).tolist(),
+            }
+            for s, x_pos in enumerate(frame_cube.x_positions)
+        ],
+        "markers": [
+            {
+                "name": f"Sensors {x_pos}",
+                "x": x_pos,
+                "y": np.round(y, 4).tolist(),
+                "z": np.round(z, 4).tolist(),
+            }
+            for x_pos, y, z, _ in markers
+        ],
+        # Sensor temperatures of each frame, in the order of the markers
+        "marker_temps": marker_temps.round(1).tolist(),
+        # URL safe alphabet, the "/" of plain base64 is escaped by the JSON encoder
+        "frames": base64.urlsafe_b64encode(codes.tobytes()).decode("ascii"),
+    }
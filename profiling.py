@@ -0,0 +1,321 @@
+import cProfile
+import ctypes
+import itertools
+import json
+import multiprocessing
+import os
+import pstats
+import re
+import threading
+import time
+
+from metrics import CALLBACK_PATH
+
+# Stacks of the speedscope profiles with less than this share of the total time
+# are merged into their parent, bounds the size of the file
+MIN_STACK_SHARE = 1e-4
+# Deepest stack rebuilt for the speedscope profiles
+MAX_DEPTH = 200
+# Allocation sites listed in the tracemalloc report
+TOP_ALLOCATIONS = 50
+# Profiled requests kept in the directory, the oldest ones are removed
+MAX_PROFILES = 100
+# Files saved for each profiled request
+PROFILE_SUFFIXES = (".pstats", ".speedscope.json", ".memory.txt")
+# Callbacks armed at once, and longest callback name (UTF-8 bytes)
+MAX_ARMED = 16
+MAX_NAME_BYTES = 255
+
+
+class _Armed(ctypes.Structure):
+    _fields_ = [
+        ("name", ctypes.c_char * (MAX_NAME_BYTES + 1)),
+        ("remaining", ctypes.c_int),
+        ("memory", ctypes.c_bool),
+    ]
+
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def speedscope(stats, name):
+    """
+    pstats.Stats as a speedscope "sampled" profile. cProfile only keeps the time
+    of each caller -> callee edge, so the stacks are rebuilt from the roots by
+    splitting the time of a function between its callers in proportion to the
+    time of each edge (like flame graphs of cProfile output).
+    """
+    min_seconds = MIN_STACK_SHARE * stats.total_tt
+    entries = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    # Edges of recursive calls overlap, the callees of a function are scaled to
+    # the time it did not spend itself
+    for func, edges in callees.items():
+        if func in entries:
+            _, _, tt, ct, _ = entries[func]
+            edge_total = sum(seconds for _, seconds in edges)
+            if edge_total > ct - tt > 0:
+                scale = (ct - tt) / edge_total
+                callees[func] = [(callee, s * scale) for callee, s in edges]
+
+    frames, frame_index = [], {}
+    samples, weights = [], []
+
+    def frame(func):
+        if func not in frame_index:
+            file, line, function = func
+            frame_index[func] = len(frames)
+            frames.append({"name": function, "file": file, "line": line})
+        return frame_index[func]
+
+    def walk(func, seconds, stack):
+        total = entries[func][3]
+        share = seconds / total if total else 0.0
+        stack = stack + [frame(func)]
+        samples.append(stack)
+        sample = len(weights)
+        weights.append(0.0)
+        weight = entries[func][2] * share
+        for callee, edge_seconds in callees.get(func, ()):
+            child = edge_seconds * share
+            if (
+                child < min_seconds
+                or len(stack) >= MAX_DEPTH
+                or frame_index.get(callee) in stack
+            ):
+                weight += child
+            else:
+                walk(callee, child, stack)
+        weights[sample] = weight
+
+    roots = [
+        func
+        for func, (*_, callers) in entries.items()
+        if not any(caller in entries for caller in callers)
+    ]
+    for root in roots:
+        walk(root, entries[root][3], [])
+
+    return {
+        "$schema": SPEEDSCOPE_SCHEMA,
+        "name": name,
+        "exporter": "heatmap_app",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+class CallbackProfiler:
+    """
+    On-demand profiling of Dash callbacks: arm() a callback (function name or
+    Dash output id) for its next `count` requests, which then run under
+    cProfile (and tracemalloc with `memory`). Each profiled request is saved to
+    `directory` as a .pstats file, a .speedscope.json file and, with memory, a
+    .memory.txt report of the top allocation sites. Only the last `max_profiles`
+    profiled requests are kept.
+
+    Nothing is hooked until register() is called, and requests are only
+    profiled one at a time per process (cProfile and tracemalloc are process
+    wide). The armed callbacks are in shared memory with a process shared
+    lock, created with the instance: created before gunicorn forks its workers
+    (preload_app), a count is used up by the requests of every worker.
+    """
+
+    def __init__(self, directory, max_profiles=MAX_PROFILES):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._slots = multiprocessing.RawArray(_Armed, MAX_ARMED)
+        self._lock = multiprocessing.Lock()
+        self._busy = threading.Lock()
+        self._saved = itertools.count(1)
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def armed(self):
+        """{callback: {"remaining", "memory"}} of the armed callbacks."""
+        with self._lock:
+            return {
+                slot.name.decode("utf-8"): {
+                    "remaining": slot.remaining,
+                    "memory": slot.memory,
+                }
+                for slot in self._slots
+                if slot.remaining > 0
+            }
+
+    def arm(self, callback, count=1, memory=False):
+        """
+        Arms `callback` for its next `count` requests (disarms it when count
+        is 0). Raises ValueError when the name is too long or MAX_ARMED
+        callbacks are already armed.
+        """
+        name = callback.encode("utf-8")
+        if len(name) > MAX_NAME_BYTES:
+            raise ValueError(f"callback name longer than {MAX_NAME_BYTES} bytes")
+        with self._lock:
+            slot = next(
+                (s for s in self._slots if s.remaining and s.name == name), None
+            )
+            if slot is None and count > 0:
+                slot = next((s for s in self._slots if not s.remaining), None)
+                if slot is None:
+                    raise ValueError(f"{MAX_ARMED} callbacks are already armed")
+            if slot is not None:
+                slot.name = name
+                slot.remaining = max(count, 0)
+                slot.memory = memory
+
+    def _take(self, names):
+        """Armed settings of the first of `names` armed, counting one request."""
+        names = [name.encode("utf-8") for name in names if name]
+        with self._lock:
+            for name in names:
+                for slot in self._slots:
+                    if slot.remaining and slot.name == name:
+                        slot.remaining -= 1
+                        return name.decode("utf-8"), slot.memory
+        return None
+
+    def profiles(self):
+        return sorted(os.listdir(self.directory))
+
+    def prune(self):
+        """Removes the files of the oldest profiled requests beyond max_profiles."""
+        saved = {}
+        for entry in os.scandir(self.directory):
+            for suffix in PROFILE_SUFFIXES:
+                if entry.name.endswith(suffix):
+                    base = entry.name[: -len(suffix)]
+                    try:
+                        mtime = entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+                    saved.setdefault(base, []).append((mtime, entry.path))
+        oldest = sorted(saved, key=lambda base: max(saved[base]))
+        for base in oldest[: max(len(oldest) - self.max_profiles, 0)]:
+            for _, path in saved[base]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def save(self, name, profile, snapshot=None):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        label = re.sub(r"[^\w.-]+", "_", name).strip("_.")
+        base = f"{label}_{stamp}_{os.getpid()}_{next(self._saved)}"
+        path = os.path.join(self.directory, base)
+        stats = pstats.Stats(profile)
+        stats.dump_stats(f"{path}.pstats")
+        with open(f"{path}.speedscope.json", "w", encoding="utf-8") as f:
+            json.dump(speedscope(stats, name), f)
+        if snapshot is not None:
+            with open(f"{path}.memory.txt", "w", encoding="utf-8") as f:
+                for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                    f.write(f"{stat}\n")
+        self.prune()
+        return base
+
+    def register(self, app, route="/_profile"):
+        """
+        Hooks the callback requests of a Dash app and adds the routes: a POST
+        to `route`/arm with callback=<name or output id>&count=<n>&memory=1
+        arms a callback of the app, `route` lists the armed callbacks and the
+        saved files, `route`/<file> downloads one.
+        """
+        from flask import abort, g, jsonify, request, send_from_directory
+
+        server = app.server
+
+        @server.before_request
+        def start_profile():
+            if request.path != CALLBACK_PATH:
+                return
+            # Unlocked hint, most requests are made with nothing armed
+            if not any(slot.remaining for slot in self._slots):
+                return
+            output = (request.get_json(silent=True) or {}).get("output")
+            callback = app.callback_map.get(output, {}).get("callback")
+            if not self._busy.acquire(blocking=False):
+                return
+            armed = self._take([getattr(callback, "__name__", None), output])
+            if armed is None:
+                self._busy.release()
+                return
+            name, memory = armed
+            if memory:
+                import tracemalloc
+
+                tracemalloc.start()
+            profile = cProfile.Profile()
+            g.profile = (name, profile, memory)
+            profile.enable()
+
+        def stop_profile():
+            name, profile, memory = g.pop("profile")
+            profile.disable()
+            snapshot = None
+            if memory:
+                import tracemalloc
+
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+            self._busy.release()
+            return name, profile, snapshot
+
+        @server.after_request
+        def end_profile(response):
+            if "profile" in g:
+                self.save(*stop_profile())
+            return response
+
+        @server.teardown_request
+        def abort_profile(exc):
+            if "profile" in g:
+                stop_profile()
+
+        def status():
+            return jsonify({"armed": self.armed, "profiles": self.profiles()})
+
+        def callback_names():
+            names = set(app.callback_map)
+            for spec in app.callback_map.values():
+                name = getattr(spec.get("callback"), "__name__", None)
+                if name:
+                    names.add(name)
+            return names
+
+        def arm():
+            callback = request.values.get("callback")
+            if not callback:
+                abort(400, "callback is required")
+            if callback not in callback_names():
+                abort(400, f"unknown callback {callback}")
+            try:
+                self.arm(
+                    callback,
+                    request.values.get("count", 1, type=int),
+                    request.values.get("memory", "") not in ("", "0"),
+                )
+            except ValueError as e:
+                abort(400, str(e))
+            return status()
+
+        def download(filename):
+            return send_from_directory(self.directory, filename, as_attachment=True)
+
+        server.add_url_rule(route, "profile_status", status)
+        server.add_url_rule(f"{route}/arm", "profile_arm", arm, methods=["POST"])
+        server.add_url_rule(f"{route}/<path:filename>", "profile_download", download)
@@ -0,0 +1,170 @@
+import json
+import os
+
+import numpy as np
+
+from decimate import minmax
+from run_cache import locked
+
+# Points sent per trace for a view, whatever the zoom level
+MAX_POINTS = 4000
+# Samples per bucket are multiplied by FACTOR from one level to the next
+FACTOR = 4
+PYRAMID_META_FILE = "pyramid.json"
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max pyramid over a set of channels sharing a time axis.
+
+    Level 0 holds every sample, level k the min and the max of buckets of
+    FACTOR**k samples, until the whole run fits in MAX_POINTS // 4 points.
+    `x` is the position of each sample on the graphs' x axis.
+    """
+
+    def __init__(self, x, values, columns, factor=FACTOR, max_points=MAX_POINTS):
+        x = np.asarray(x, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float32)
+        self.columns = list(columns)
+        self.max_points = max_points
+        self.levels = [(x, values)]
+
+        size = factor
+        while len(self.levels[-1][0]) > max_points // 4 and size < len(x):
+            n_buckets = -(-len(x) // size)
+            starts = np.arange(n_buckets) * size
+            # Each bucket gives 2 points, placed at its start and its middle
+            rows = np.stack((starts, np.minimum(starts + size // 2, len(x) - 1)), 1)
+            self.levels.append((x[rows.ravel()], minmax(values, size)))
+            size *= factor
+
+    @classmethod
+    def from_levels(cls, levels, columns, max_points=MAX_POINTS):
+        pyramid = cls.__new__(cls)
+        pyramid.columns = list(columns)
+        pyramid.max_points = max_points
+        pyramid.levels = levels
+        return pyramid
+
+    def save(self, directory):
+        """
+        Writes the x axis of level 0 and every coarser level to `directory`, the
+        level 0 values being the channels the pyramid was built from.
+        """
+        arrays = {"x0": self.levels[0][0]}
+        for k, (x, values) in enumerate(self.levels[1:], 1):
+            arrays[f"x{k}"] = x
+            arrays[f"values{k}"] = values
+        for name, array in arrays.items():
+            path = os.path.join(directory, f"pyramid_{name}.npy")
+            tmp = f"{path}.tmp{os.getpid()}.npy"
+            np.save(tmp, array)
+            os.replace(tmp, path)
+        meta = {
+            "columns": self.columns,
+            "rows": len(self.levels[0][0]),
+            "levels": len(self.levels),
+            "max_points": self.max_points,
+        }
+        meta_path = os.path.join(directory, PYRAMID_META_FILE)
+        meta_tmp = f"{meta_path}.tmp{os.getpid()}"
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_tmp, meta_path)
+
+    @classmethod
+    def open(cls, directory, values, columns):
+        """
+        Maps a saved pyramid over `values` (its level 0), or returns None when
+        there is none or when it was built for other channels.
+        """
+        try:
+            with open(
+                os.path.join(directory, PYRAMID_META_FILE), encoding="utf-8"
+            ) as f:
+                meta = json.load(f)
+            if meta["columns"] != list(columns) or meta["rows"] != len(values):
+                return None
+
+            def array(name):
+                path = os.path.join(directory, f"pyramid_{name}.npy")
+                return np.load(path, mmap_mode="r")
+
+            levels = [(array("x0"), values)] + [
+                (array(f"x{k}"), array(f"values{k}")) for k in range(1, meta["levels"])
+            ]
+        except (OSError, ValueError):
+            return None
+        return cls.from_levels(levels, columns, meta["max_points"])
+
+    @classmethod
+    def load(cls, x, values, columns, directory, factor=FACTOR, max_points=MAX_POINTS):
+        """
+        Opens the pyramid saved in `directory`, building and saving it first if
+        needed. The levels are memory-mapped, shared by the processes serving
+        the same run.
+        """
+        pyramid = cls.open(directory, values, columns)
+        if pyramid is None:
+            with locked(os.path.join(directory, PYRAMID_META_FILE)):
+                pyramid = cls.open(directory, values, columns)
+                if pyramid is None:
+                    cls(x, values, columns, factor, max_points).save(directory)
+                    pyramid = cls.open(directory, values, columns)
+        return pyramid
+
+    def _window(self, level, x0, x1):
+        x = self.levels[level][0]
+        lo = max(np.searchsorted(x, x0, side="left") - 1, 0)
+        hi = min(np.searchsorted(x, x1, side="right") + 1, len(x))
+        return lo, hi
+
+    def view(self, x0=None, x1=None, max_points=None):
+        """
+        Returns (x, values) for the visible window [x0, x1]: the finest level
+        with at most `max_points` points inside the window, surrounded by the
+        coarsest level outside of it so the graph can still be panned.
+        """
+        max_points = max_points or self.max_points
+        coarse = len(self.levels) - 1
+        x, values = self.levels[coarse]
+        if x0 is None or x1 is None:
+            return x, values
+
+        level = coarse
+        for k, (x_k, _) in enumerate(self.levels):
+            lo, hi = self._window(k, x0, x1)
+            if hi - lo <= max_points:
+                level = k
+                break
+
+        lo, hi = self._window(level, x0, x1)
+        fine_x, fine_values = self.levels[level]
+        before = x < fine_x[lo]
+        after = x > fine_x[hi - 1]
+        return (
+            np.concatenate((x[before], fine_x[lo:hi], x[after])),
+            np.concatenate((values[before], fine_values[lo:hi], values[after])),
+        )
+
+    def channel(self, name, x0=None, x1=None, max_points=None):
+        """(x, y) of one channel for the visible window."""
+        x, values = self.view(x0, x1, max_points)
+        return x, values[:, self.columns.index(name)]
+
+
+def zoom_window(relayout_data, previous=(None, None)):
+    """
+    Visible x range from a dcc.Graph relayoutData: (None, None) when the x axis
+    is autoscaled, `previous` for the events not moving it (y zoom, drag mode,
+    autosize).
+    """
+    if not relayout_data:
+        return tuple(previous or (None, None))
+    if relayout_data.get("xaxis.autorange"):
+        return None, None
+    if "xaxis.range[0]" in relayout_data:
+        return relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]
+    if "xaxis.range" in relayout_data:
+        return tuple(relayout_data["xaxis.range"])
+    return tuple(previous or (None, None))
@@ -0,0 +1,200 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking, concurrent builds only duplicate work
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+# Cache shared by the desktop viewer (heatmap.py) and the dashboard (app.py)
+DEFAULT_CACHE_DIR = "data_temp"
+CACHE_VERSION = 1
+
+INDEX_FILE = "index.json"
+META_FILE = "meta.json"
+VALUES_FILE = "values.npy"
+TIME_FILE = "time.npy"
+
+
+def content_hash(path, chunk_size=1 << 20):
+    """blake2b digest of the whole source file, read by blocks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, obj):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=1)
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def locked(path):
+    """
+    Exclusive lock on `path` (through `<path>.lock`) shared by every process,
+    so gunicorn workers starting together build a cache entry only once.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _index_entry(source, variant):
+    return f"{os.path.abspath(source)}|{variant}"
+
+
+def resolve_key(source, label, variant="", cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Returns the cache key of a source file: "<label>_<hash>[_<variant>]".
+
+    The content hash is only recomputed when the size or mtime of the source
+    changed since the last lookup, so a warm start never reads the source.
+    `label` may be a callable, it is only called when the key is rebuilt
+    (e.g. to read the .ld header datetime).
+    """
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    entry_name = _index_entry(source, variant)
+    fingerprint = _fingerprint(source)
+    entry = (_read_json(index_path) or {}).get(entry_name)
+    if entry and entry["fingerprint"] == fingerprint:
+        return entry["key"]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # The index is rewritten under its lock, so the processes updating it
+    # together do not drop each other's entries
+    with locked(index_path):
+        index = _read_json(index_path) or {}
+        entry = index.get(entry_name)
+        if entry and entry["fingerprint"] == fingerprint:
+            return entry["key"]
+
+        if callable(label):
+            label = label()
+        key = f"{label}_{content_hash(source)}"
+        if variant:
+            key = f"{key}_{variant}"
+
+        # The source changed: forget the entry built from its previous content,
+        # under the entry lock so it is not removed while being built. The
+        # processes still mapping it keep their pages until they unmap them.
+        if entry and entry["key"] != key:
+            old_path = os.path.join(cache_dir, entry["key"])
+            with locked(old_path):
+                shutil.rmtree(old_path, ignore_errors=True)
+
+        index[entry_name] = {"key": key, "fingerprint": fingerprint}
+        _write_json(index_path, index)
+    return key
+
+
+def write_run(path, data, metadata=None):
+    """
+    Writes a run as a columnar cache entry: a Fortran ordered float32 matrix
+    (one contiguous block per column), the Time index and a json metadata file.
+    """
+    tmp = f"{path}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = [col for col in data.columns if col != "Time"]
+    values = np.asfortranarray(
+        data[columns].apply(pd.to_numeric, errors="coerce").to_numpy(np.float32)
+    )
+    np.save(os.path.join(tmp, VALUES_FILE), values)
+    if "Time" in data.columns:
+        time = pd.to_datetime(data["Time"]).to_numpy("datetime64[ns]")
+        np.save(os.path.join(tmp, TIME_FILE), time)
+
+    meta = {
+        "version": CACHE_VERSION,
+        "columns": columns,
+        "rows": len(data),
+        **(metadata or {}),
+    }
+    _write_json(os.path.join(tmp, META_FILE), meta)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+def open_run(path):
+    """
+    Opens a cache entry with mmap, the returned DataFrame is a read-only view
+    of the files so nothing is parsed or copied. Returns None if the entry is
+    missing or was written by another cache version.
+    """
+    meta = _read_json(os.path.join(path, META_FILE))
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return None
+
+    values = np.load(os.path.join(path, VALUES_FILE), mmap_mode="r")
+    # A Fortran ordered matrix transposed is a C ordered (columns, rows) block,
+    # which pandas keeps as is
+    data = pd.DataFrame(values, columns=meta["columns"], copy=False)
+    time_path = os.path.join(path, TIME_FILE)
+    if os.path.exists(time_path):
+        data["Time"] = np.load(time_path, mmap_mode="r")
+    data.attrs["run_cache"] = {**meta, "path": path}
+    return data
+
+
+def load_run(source, build, label, variant="", cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Returns the decoded run of `source`, from the cache when it is up to date,
+    otherwise by calling `build()` (a DataFrame with a Time column) and caching it.
+    """
+    key = resolve_key(source, label, variant, cache_dir)
+    path = os.path.join(cache_dir, key)
+
+    data = open_run(path)
+    if data is not None:
+        return data
+
+    with locked(path):
+        # Another process may have built it while we waited for the lock
+        data = open_run(path)
+        if data is None:
+            data = build()
+            write_run(path, data, {"source": os.path.abspath(source), "key": key})
+            data = open_run(path)
+    return data
+
+
+def run_values(data):
+    """
+    The (rows, columns) float32 matrix of a cache entry opened by open_run,
+    memory-mapped read-only: processes mapping the same entry share its pages.
+    """
+    return np.load(
+        os.path.join(data.attrs["run_cache"]["path"], VALUES_FILE), mmap_mode="r"
+    )
@@ -0,0 +1,172 @@
+import numpy as np
+
+from frame_cube import group_slices
+
+# X position of each module, 6 modules spread across the 0-15 range
+MODULE_X = [2.5, 5.0, 7.5, 10.0, 12.5, 15.0]
+
+# Y,Z coordinates of sensors in a module (Group1..Group32)
+SENSOR_YZ = [
+    (18.5, 5),
+    (16, 2),
+    (17, 7),
+    (13.5, 1),
+    (15, 7),
+    (12, 2),
+    (10, 2),
+    (13, 7),
+    (11, 6),
+    (9, 2),
+    (13.5, 7),
+    (11.5, 3),
+    (12.5, 1),
+    (15, 6),
+    (15, 2),
+    (17, 6),
+    (2.5, 5),
+    (0.5, 1),
+    (5, 6),
+    (3, 2),
+    (7.5, 7),
+    (5.5, 3),
+    (6.5, 1),
+    (8.5, 5),
+    (10, 6),
+    (7.5, 1),
+    (9, 7),
+    (5.5, 1),
+    (3.5, 1),
+    (5.5, 5),
+    (1.5, 1),
+    (5, 7),
+]
+
+# Sensors closer than SLICE_GAP on X are one module slice, a slice holds the
+# sensors within SLICE_WIDTH of its position
+SLICE_GAP = 1.5
+SLICE_WIDTH = 1.0
+
+
+def parse_column(name):
+    """(module, group, value) of a Module_<m>_Group<g>_Value<v> column."""
+    _, module, group, value = name.split("_")
+    return int(module), int(group[5:]), int(value[5:])
+
+
+class SensorLayout:
+    """
+    Geometry of the temperature sensors, built once from the Module_*_Group*_Value*
+    column names: contiguous x, y, z and module arrays of the placed sensors,
+    their column in the temperature columns, and the slices of every module range.
+
+    Module -1 columns and unknown groups have no position and are left out, so
+    sensor k reads column `column_index[k]` of the temperature columns.
+    """
+
+    def __init__(self, columns, gap=SLICE_GAP, width=SLICE_WIDTH):
+        self.columns = list(columns)
+        self.gap = gap
+        self.width = width
+
+        index, x, y, z, module = [], [], [], [], []
+        for col, name in enumerate(self.columns):
+            m, group, _ = parse_column(name)
+            if m < 0:
+                continue
+            if not 1 <= group <= len(SENSOR_YZ) or m >= len(MODULE_X):
+                print(f"[Warning] Invalid sensor index: {name}")
+                continue
+            index.append(col)
+            x.append(MODULE_X[m])
+            y.append(SENSOR_YZ[group - 1][0])
+            z.append(SENSOR_YZ[group - 1][1])
+            module.append(m)
+
+        self.column_index = np.array(index, dtype=np.intp)
+        self.x = np.array(x, dtype=np.float64)
+        self.y = np.array(y, dtype=np.float64)
+        self.z = np.array(z, dtype=np.float64)
+        self.module = np.array(module, dtype=np.int64)
+        self.z_top = float(self.z.max()) if len(self.z) else 0.0
+
+        # Every run of consecutive X positions a module range can select, with its
+        # sensors and its slices
+        self.x_positions = np.unique(self.x)
+        self._ranges = {}
+        for lo in range(len(self.x_positions) + 1):
+            for hi in range(lo, len(self.x_positions) + 1):
+                self._ranges[lo, hi] = self._select(lo, hi)
+
+    def geometry(self):
+        """
+        Columns and positions of the placed sensors as JSON-able lists: layouts
+        with the same geometry read the same columns in the same order.
+        """
+        return {
+            "temp_columns": self.columns,
+            "sensor_columns": [self.columns[i] for i in self.column_index],
+            "x": self.x.tolist(),
+            "y": self.y.tolist(),
+            "z": self.z.tolist(),
+            "module": self.module.tolist(),
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, SensorLayout):
+            return NotImplemented
+        return (self.gap, self.width, self.geometry()) == (
+            other.gap,
+            other.width,
+            other.geometry(),
+        )
+
+    def __hash__(self):
+        return hash((self.gap, self.width, tuple(self.columns), self.x.tobytes()))
+
+    def _select(self, lo, hi):
+        if lo == hi:
+            return np.empty(0, dtype=np.intp), []
+        sensors = np.flatnonzero(
+            (self.x >= self.x_positions[lo]) & (self.x <= self.x_positions[hi - 1])
+        )
+        slices = group_slices(
+            self.x[sensors], self.z[sensors], gap=self.gap, width=self.width
+        )
+        return sensors, [(x_pos, sensors[idx]) for x_pos, idx in slices]
+
+    def range_key(self, module_range):
+        """
+        (first, last + 1) X position selected by a module range: ranges with the
+        same key have the same sensors and slices.
+        """
+        if module_range is None:
+            return 0, len(self.x_positions)
+        x_min, x_max = module_range
+        lo = np.searchsorted(self.x_positions, x_min - self.width, side="left")
+        hi = np.searchsorted(self.x_positions, x_max + self.width, side="right")
+        return int(lo), int(max(lo, hi))
+
+    def z_key(self, z_max):
+        """
+        Highest sensor height under z_max (None when it keeps every sensor):
+        z-cuts with the same key keep the same sensors.
+        """
+        if z_max is None or z_max >= self.z_top:
+            return None
+        heights = np.unique(self.z)
+        below = heights[heights <= z_max]
+        return float(below[-1]) if len(below) else float("-inf")
+
+    def sensors(self, module_range=None):
+        """Indices of the sensors within the module range (all by default)."""
+        return self._ranges[self.range_key(module_range)][0]
+
+    def slices(self, module_range=None, z_max=None):
+        """
+        (x_pos, sensor indices) of each slice in the module range, keeping the
+        sensors under z_max.
+        """
+        slices = self._ranges[self.range_key(module_range)][1]
+        if z_max is None or z_max >= self.z_top:
+            return slices
+        return [(x_pos, idx[self.z[idx] <= z_max]) for x_pos, idx in slices]
@@ -0,0 +1,71 @@
+import logging
+import time
+
+# Start of the startup reports: the first import of this module, done before the
+# heavy imports of the programs
+IMPORTED_AT = time.perf_counter()
+
+# Requests whose first response is reported: the page and the Dash layout
+FIRST_PATHS = ("/", "/_dash-layout")
+
+logger = logging.getLogger("heatmap.startup")
+
+
+class StartupReport:
+    """
+    Named and timed phases of a program start. Each mark() ends the phase
+    begun at the previous mark (the first one at the import of this module),
+    phases are logged as they end and collected by report().
+    """
+
+    def __init__(self, name, start=None):
+        self.name = name
+        self.start = IMPORTED_AT if start is None else start
+        self.last = self.start
+        self.phases = []
+        self.firsts = {}
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        seconds = now - self.last
+        self.phases.append((phase, seconds))
+        self.last = now
+        logger.info("%s startup: %-12s %7.3f s", self.name, phase, seconds)
+        return seconds
+
+    def first(self, event):
+        """Records the first time `event` happens, from the start."""
+        if event not in self.firsts:
+            self.firsts[event] = time.perf_counter() - self.start
+            logger.info(
+                "%s startup: first %s after %.3f s",
+                self.name,
+                event,
+                self.firsts[event],
+            )
+
+    def report(self):
+        return {
+            "name": self.name,
+            "phases": [
+                {"phase": phase, "seconds": round(seconds, 4)}
+                for phase, seconds in self.phases
+            ],
+            "total": round(self.last - self.start, 4),
+            "first": {event: round(t, 4) for event, t in self.firsts.items()},
+        }
+
+    def register(self, server, route="/_startup"):
+        """
+        Serves the report as JSON on `route` of a Flask server, with the time to
+        the first response of each of FIRST_PATHS.
+        """
+        from flask import jsonify, request
+
+        @server.after_request
+        def first_response(response):
+            if request.path in FIRST_PATHS:
+                self.first(request.path)
+            return response
+
+        server.add_url_rule(route, "startup_report", lambda: jsonify(self.report()))
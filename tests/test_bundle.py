@@ -0,0 +1,34 @@
+import json
+import os
+
+import pytest
+
+from bundle import BUNDLE_VERSION, LAYOUT_FILE, MANIFEST_FILE, Bundle, write_bundle
+from sensors import SensorLayout
+
+COLUMNS = [f"Module_{m}_Group{g}_Value1" for m in (0, 1) for g in (1, 2, 3)]
+
+
+def test_write_bundle_refuses_other_directories(tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "notes.txt").write_text("keep me")
+    with pytest.raises(ValueError, match="not a run bundle"):
+        write_bundle("missing.csv", str(other))
+    assert (other / "notes.txt").read_text() == "keep me"
+
+
+def write_layout(directory, layout):
+    os.makedirs(directory)
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump({"version": BUNDLE_VERSION, "key": "run"}, f)
+    with open(os.path.join(directory, LAYOUT_FILE), "w") as f:
+        json.dump(layout.geometry(), f)
+
+
+def test_bundle_layout_check(tmp_path):
+    write_layout(tmp_path / "run", SensorLayout(COLUMNS))
+    bundle = Bundle(str(tmp_path / "run"))
+    bundle.check_layout(SensorLayout(COLUMNS))
+    with pytest.raises(ValueError, match="another sensor layout"):
+        bundle.check_layout(SensorLayout(COLUMNS[:-1]))
@@ -0,0 +1,45 @@
+import gzip
+
+import pytest
+
+from compression import MIN_SIZE, gzip_responses
+
+flask = pytest.importorskip("flask")
+
+BODY = '{"values": [' + ", ".join(str(i) for i in range(2000)) + "]}"
+
+
+def served(level=5):
+    server = flask.Flask(__name__)
+    server.add_url_rule(
+        "/big", "big", lambda: flask.Response(BODY, mimetype="application/json")
+    )
+    server.add_url_rule(
+        "/small", "small", lambda: flask.Response("{}", mimetype="application/json")
+    )
+    gzip_responses(server, level=level)
+    return server.test_client()
+
+
+def test_gzipped_for_clients_accepting_it():
+    response = served().get("/big", headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert int(response.headers["Content-Length"]) == len(response.get_data())
+    assert gzip.decompress(response.get_data()).decode() == BODY
+
+
+@pytest.mark.parametrize(
+    "level, path, headers",
+    [
+        (0, "/big", {"Accept-Encoding": "gzip"}),
+        (5, "/small", {"Accept-Encoding": "gzip"}),
+        (5, "/big", {}),
+        (5, "/big", {"Accept-Encoding": "br"}),
+    ],
+)
+def test_sent_as_is(level, path, headers):
+    response = served(level).get(path, headers=headers)
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data(as_text=True) == (BODY if path == "/big" else "{}")
+    assert len(BODY) >= MIN_SIZE
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from decimate import decimate_frame, decimate_values, lttb, minmax
+
+
+def test_minmax_keeps_every_bucket_extremes():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(1003, 3)).astype(np.float32)
+    size = 10
+    out = minmax(values, size)
+    assert out.shape == (2 * 101, 3)
+    for b in range(101):
+        bucket = values[b * size : (b + 1) * size]
+        pair = out[2 * b : 2 * b + 2]
+        np.testing.assert_array_equal(
+            np.sort(pair, axis=0), [bucket.min(0), bucket.max(0)]
+        )
+
+
+def test_minmax_keeps_the_order_of_occurrence():
+    values = np.array([[5.0], [9.0], [1.0], [4.0]])
+    np.testing.assert_array_equal(minmax(values, 4).ravel(), [9.0, 1.0])
+
+
+def test_minmax_ignores_missing_samples():
+    values = np.array([[np.nan], [3.0], [np.nan], [7.0], [np.nan], [np.nan]])
+    out = minmax(values, 4)
+    np.testing.assert_array_equal(out[:2].ravel(), [3.0, 7.0])
+
+
+def test_lttb_keeps_the_ends_and_a_spike():
+    values = np.zeros((1000, 2))
+    values[437, 1] = 100.0
+    picked = lttb(values, 50)
+    assert picked.shape == (50, 2)
+    assert (picked[0] == 0).all() and (picked[-1] == 999).all()
+    assert (np.diff(picked, axis=0) > 0).all()
+    assert 437 in picked[:, 1]
+
+
+def test_every_mode_has_the_same_row_count():
+    values = np.arange(1000.0)[:, None]
+    rows = {
+        mode: len(decimate_values(values, 10, mode)[0])
+        for mode in ("stride", "lttb", "minmax")
+    }
+    assert rows == {"stride": 100, "lttb": 100, "minmax": 100}
+
+
+def test_decimate_frame_times_rows_within_their_bucket():
+    data = pd.DataFrame(
+        {"a": np.arange(100.0), "Time": pd.to_datetime(np.arange(100), unit="s")}
+    )
+    reduced = decimate_frame(data, 5, "minmax")
+    seconds = (reduced["Time"] - data["Time"][0]).dt.total_seconds().to_numpy()
+    np.testing.assert_array_equal(seconds[:4], [0, 5, 10, 15])
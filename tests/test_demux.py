@@ -0,0 +1,38 @@
+import numpy as np
+
+from demux import _synthetic_stream, demux_temps
+
+
+def test_frames_are_forward_filled():
+    # Module 0 groups 0 and 1, each frame only carries one group
+    frame = demux_temps([0, 0, 0], [0, 1, 0], [20, 30, 21], [40, 50, 41], [0, 1, 2])
+    assert list(frame.columns) == [
+        "Module_0_Group1_Value1",
+        "Module_0_Group2_Value1",
+        "Module_0_Group17_Value2",
+        "Module_0_Group18_Value2",
+        "Time",
+    ]
+    values = frame.drop(columns="Time").to_numpy()
+    np.testing.assert_array_equal(
+        values, [[20, 30, 40, 50], [20, 30, 40, 50], [21, 30, 41, 50]]
+    )
+
+
+def test_repeated_and_incomplete_samples_are_dropped():
+    frame = demux_temps(
+        [0, 0, 0, np.nan, 0], [0, 0, 1, 1, 1], [20, 20, 30, 31, 30], [40] * 5, range(5)
+    )
+    assert len(frame) == 2
+
+
+def test_every_sensor_of_a_cycle_has_a_column():
+    frame = demux_temps(*_synthetic_stream(5000, n_modules=3, n_groups=4))
+    assert frame.shape == (1000, 3 * 4 * 2 + 1)
+    assert not frame.drop(columns="Time").isna().any().any()
+
+
+def test_empty_stream():
+    frame = demux_temps([], [], [], [], [])
+    assert list(frame.columns) == ["Time"]
+    assert frame.empty
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from derivatives import fill_missing, seconds, sensor_derivatives, time_derivative
+
+
+def test_exact_on_linear_ramps():
+    t = np.arange(500) * 2.0
+    values = np.column_stack([20 + 0.05 * t, 60 - 0.01 * t])
+    np.testing.assert_allclose(
+        time_derivative(t, values), np.tile([0.05, -0.01], (500, 1)), atol=1e-10
+    )
+    # Same rates per second from a datetime axis
+    time = pd.Timestamp("2024-01-01") + pd.to_timedelta(t, unit="s")
+    np.testing.assert_allclose(time_derivative(time.values, values[:, 0]), 0.05)
+    np.testing.assert_allclose(seconds(time.values), t)
+
+
+def test_exact_on_quadratics():
+    t = np.arange(300) * 0.5
+    values = 0.002 * t**2 - 0.3 * t + 25
+    np.testing.assert_allclose(time_derivative(t, values), 0.004 * t - 0.3, atol=1e-9)
+
+
+def test_non_uniform_time():
+    rng = np.random.default_rng(0)
+    # Decimated run: uneven steps and a long gap
+    steps = rng.choice([1.0, 2.0, 5.0], size=400)
+    steps[200] = 300.0
+    t = np.concatenate([[0.0], np.cumsum(steps)])
+    deriv = time_derivative(t, 40 + 0.02 * t)
+    assert deriv.shape == t.shape
+    np.testing.assert_allclose(deriv, 0.02, atol=1e-9)
+
+
+def test_short_inputs():
+    assert np.array_equal(time_derivative([0.0], [[1.0, 2.0]]), [[0.0, 0.0]])
+    # Fewer rows than the window: the window shrinks to the rows
+    np.testing.assert_allclose(time_derivative(np.arange(7.0), 3 * np.arange(7.0)), 3)
+
+
+def test_missing_readings():
+    temps = np.array(
+        [[0, 20], [30, np.nan], [0, 22], [32, 0], [33, 24]], dtype=np.float64
+    )
+    filled, valid = fill_missing(temps)
+    np.testing.assert_array_equal(
+        filled, [[30, 20], [30, 20], [30, 22], [32, 22], [33, 24]]
+    )
+    np.testing.assert_array_equal(valid, temps > 0)
+
+    t = np.arange(200.0)
+    ramp = 20 + 0.1 * t
+    ramp[50:60] = 0
+    deriv = sensor_derivatives(t, ramp[:, None], window=11)[:, 0]
+    assert np.isnan(deriv[50:60]).all()
+    np.testing.assert_allclose(deriv[:40], 0.1, atol=1e-9)
+    np.testing.assert_allclose(deriv[70:], 0.1, atol=1e-9)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from events import (
+    EVENT_KINDS,
+    EVENT_WINDOW,
+    MAX_EVENTS,
+    TOP_K,
+    event_index,
+    run_peaks,
+    runs,
+)
+from stats import masked_stats
+
+
+def naive_runs(mask, gap=0):
+    found = []
+    for col in range(mask.shape[1]):
+        run = None
+        for row, on in enumerate(mask[:, col]):
+            if on and run is not None and row - run[1] < gap:
+                run[1] = row + 1
+            elif on and run is not None and run[1] == row:
+                run[1] = row + 1
+            elif on:
+                if run is not None:
+                    found.append((run[0], run[1], col))
+                run = [row, row + 1]
+        if run is not None:
+            found.append((run[0], run[1], col))
+    return found
+
+
+def test_runs_match_a_loop():
+    rng = np.random.default_rng(0)
+    mask = rng.random((300, 6)) < 0.3
+    mask[:, 5] = False
+    mask[-1, 0] = mask[0, 1] = True
+    for gap in (0, 3, 10):
+        starts, ends, columns = runs(mask, gap)
+        assert list(zip(starts, ends, columns)) == naive_runs(mask, gap)
+
+
+def test_run_peaks_match_a_loop():
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 20, (200, 4)).astype(np.float32)
+    starts, ends, columns = runs(values > 8, 2)
+    peaks, rows = run_peaks(values, starts, ends, columns)
+    for start, end, col, peak, row in zip(starts, ends, columns, peaks, rows):
+        segment = values[start:end, col]
+        assert peak == segment.max()
+        assert row == start + np.argmax(segment)
+    empty = run_peaks(values, *runs(values > 100))
+    assert len(empty[0]) == len(empty[1]) == 0
+
+
+def test_event_index():
+    rng = np.random.default_rng(2)
+    # More hottest events (TOP_K per window) than MAX_EVENTS
+    n_frames, n_sensors = 10_000, 12
+    assert n_frames // EVENT_WINDOW * TOP_K > MAX_EVENTS
+    temps = 30 + rng.normal(0, 1, (n_frames, n_sensors)).cumsum(axis=0) * 0.3
+    temps = np.clip(temps, 1, None).astype(np.float32)
+    temps[rng.random(temps.shape) < 0.02] = 0
+    columns = [f"T{i}" for i in range(n_sensors)]
+    modules = np.repeat(np.arange(4), 3)
+    rates = np.gradient(temps, axis=0)
+
+    found = event_index(temps, columns, modules, masked_stats(temps), rates)
+
+    assert set(found["kind"]) <= set(EVENT_KINDS)
+    capped = found[found["kind"].isin(["threshold", "spread"])]
+    assert (capped.groupby(["kind", "label"]).size() <= MAX_EVENTS).all()
+    assert (found["start"] <= found["frame"]).all()
+    assert (found["frame"] < found["end"]).all()
+    assert (found["end"] <= n_frames).all()
+    assert found["start"].is_monotonic_increasing
+
+    sensors = found[found["kind"] != "spread"]
+    index = sensors["sensor"].map(columns.index).to_numpy()
+    np.testing.assert_array_equal(sensors["module"], modules[index])
+    hottest = sensors[sensors["kind"] == "hottest"]
+    np.testing.assert_array_equal(
+        hottest["value"], temps[hottest["frame"], index[sensors["kind"] == "hottest"]]
+    )
+    # TOP_K hottest sensors in every window of the run, not only the hottest windows
+    window = hottest["start"].to_numpy() // EVENT_WINDOW
+    assert (np.bincount(window) == TOP_K).all()
+    assert window.max() + 1 == n_frames // EVENT_WINDOW
+    assert len(hottest) == n_frames // EVENT_WINDOW * TOP_K > MAX_EVENTS
+    window_max = temps.reshape(-1, EVENT_WINDOW, n_sensors).max(axis=1)
+    top = np.sort(window_max, axis=1)[:, -TOP_K:]
+    values = hottest["value"].to_numpy().reshape(-1, TOP_K)
+    np.testing.assert_allclose(np.sort(values, axis=1), top)
+    assert pd.api.types.is_integer_dtype(found["frame"])
@@ -0,0 +1,66 @@
+import os
+
+import plotly.graph_objects as go
+
+import figure_cache
+
+from figure_cache import DISK_PRUNE_TARGET, FigureCache, entry_key
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    cache = FigureCache(directory=str(tmp_path), namespace="run")
+    assert cache.get("a") is None
+    cache.put("a", b'{"a": 1}')
+    assert cache.get("a") == b'{"a": 1}'
+
+    # A new process sees the entry on disk
+    other = FigureCache(directory=str(tmp_path), namespace="run")
+    assert other.get("a") == b'{"a": 1}'
+    assert other.stats()["disk_hits"] == 1
+    assert FigureCache(directory=str(tmp_path), namespace="other").get("a") is None
+
+
+def test_disk_tier_pruned_oldest_first(tmp_path):
+    payload = b"x" * 1000
+    cache = FigureCache(directory=str(tmp_path), max_disk_bytes=10_000)
+    for i in range(30):
+        cache.put(i, payload)
+        # Distinct modification times, oldest first
+        path = cache._disk_path(entry_key([cache.namespace, i]))
+        os.utime(path, (i, i))
+
+    sizes = [entry.stat().st_size for entry in os.scandir(tmp_path)]
+    assert sum(sizes) <= 10_000
+    assert cache.stats()["disk_bytes"] == sum(sizes)
+
+    # The newest entries are kept
+    cache.clear()
+    assert cache.get(29) == payload
+    assert cache.get(0) is None
+
+    # A budget already exceeded is pruned when the cache is created
+    smaller = FigureCache(directory=str(tmp_path), max_disk_bytes=4000)
+    assert smaller.stats()["disk_bytes"] <= DISK_PRUNE_TARGET * 4000
+
+
+def test_memoize_parses_only_hits(monkeypatch):
+    cache = FigureCache()
+    built = []
+
+    def build():
+        built.append(1)
+        return {"figure": go.Figure(go.Scatter(y=[1, 2], name="a")), "masks": ["k"]}
+
+    parsed = []
+    loads = figure_cache.loads
+    monkeypatch.setattr(
+        figure_cache, "loads", lambda payload: parsed.append(1) or loads(payload)
+    )
+    miss = cache.memoize(["3d", 1], build)
+    assert not parsed
+    hit = cache.memoize(["3d", 1], build)
+    assert built == [1] and parsed == [1]
+    # Both in the JSON form of the figures
+    assert miss["masks"] == hit["masks"] == ["k"]
+    assert miss["figure"]["data"][0]["name"] == hit["figure"]["data"][0]["name"] == "a"
+    assert list(miss["figure"]["data"][0]["y"]) == list(hit["figure"]["data"][0]["y"])
@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from figure_patch import patch_3d_figure, trace_mask_key
+
+# Sensors of one slice, the last one drops out in the second frame
+Y = np.array([1.0, 2.0, 3.0, 4.0])
+Z = np.array([1.0, 3.0, 1.0, 3.0])
+
+
+def frame_figure(temps, triangles=((0, 1, 2), (1, 2, 3))):
+    """Slices Mesh3d and sensors Scatter3d of one frame, as build_3d_figure."""
+    valid = temps > 0
+    i, j, k = np.array(triangles).T
+    fig = go.Figure(
+        [
+            go.Mesh3d(
+                x=np.full(4, 2.5),
+                y=Y,
+                z=Z,
+                i=i,
+                j=j,
+                k=k,
+                intensity=temps,
+                cmin=20,
+                cmax=50,
+                opacity=0.5,
+                name="Module slices",
+            ),
+            go.Scatter3d(
+                x=np.full(valid.sum(), 2.5),
+                y=Y[valid],
+                z=Z[valid],
+                mode="markers",
+                marker=dict(color=temps[valid], cmin=20, cmax=50),
+                name="Sensors",
+            ),
+        ]
+    )
+    fig.update_layout(title="Battery Temperature at Time 0")
+    masks = [trace_mask_key(trace) for trace in fig.data]
+    return json.loads(pio.to_json(fig, validate=False)), masks
+
+
+def operations(patch):
+    return {
+        tuple(op["location"]): op["params"]["value"]
+        for op in patch.to_plotly_json()["operations"]
+    }
+
+
+def test_scrub_patches_only_the_frame_values():
+    _, previous = frame_figure(np.array([30.0, 31.0, 32.0, 33.0]))
+    fig, masks = frame_figure(np.array([35.0, 36.0, 37.0, 38.0]))
+    assert masks == previous
+
+    patched = operations(patch_3d_figure(fig, masks, previous))
+    assert set(patched) == {
+        ("data", 0, "intensity"),
+        ("data", 0, "cmin"),
+        ("data", 0, "cmax"),
+        ("data", 0, "opacity"),
+        ("data", 1, "marker", "color"),
+        ("data", 1, "marker", "cmin"),
+        ("data", 1, "marker", "cmax"),
+        ("layout", "title", "text"),
+    }
+
+
+def test_sensor_dropping_out_resends_the_positions():
+    _, previous = frame_figure(np.array([30.0, 31.0, 32.0, 33.0]))
+    fig, masks = frame_figure(np.array([30.0, 31.0, 32.0, 0.0]), ((0, 1, 2),))
+    assert masks[1] != previous[1]
+
+    patched = operations(patch_3d_figure(fig, masks, previous))
+    for axis in "xyz":
+        assert patched["data", 1, axis] == fig["data"][1][axis]
+    assert patched["data", 1, "marker", "color"] == fig["data"][1]["marker"]["color"]
+    # The changed triangles of the mesh, never its vertices
+    assert {("data", 0, axis) for axis in "ijk"} <= set(patched)
+    assert not {("data", 0, axis) for axis in "xyz"} & set(patched)
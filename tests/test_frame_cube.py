@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+from scipy.interpolate import griddata
+
+from frame_cube import FrameCube, group_slices
+
+
+def _run(n_frames=20, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.repeat([1.0, 5.0], 8)
+    y = np.tile(np.arange(8) % 4, 2).astype(float)
+    z = np.tile(np.arange(8) // 4, 2).astype(float) * 2 + rng.uniform(0, 0.1, 16)
+    temps = rng.uniform(20, 60, size=(n_frames, 16))
+    return temps, x, y, z
+
+
+def test_cube_matches_the_frames_and_follows_the_dtype(tmp_path):
+    temps, x, y, z = _run()
+    slices = group_slices(x, z)
+    cube = FrameCube.load(temps, y, z, slices, str(tmp_path), dtype=np.float32)
+    assert cube.cube.shape[:2] == (20, 2) and cube.cube.dtype == np.float32
+    grid = cube.frame(3, 0)
+    idx = slices[0][1]
+    grid_y, grid_z = cube.grid(0)
+    expected = griddata(
+        np.column_stack((y[idx], z[idx])), temps[3, idx], (grid_y, grid_z), "cubic"
+    )
+    np.testing.assert_allclose(grid, expected, atol=1e-4, equal_nan=True)
+
+    # Another storage type rebuilds the cube
+    cube = FrameCube.load(temps, y, z, slices, str(tmp_path), dtype=np.float16)
+    assert cube.cube.dtype == np.float16
+    np.testing.assert_allclose(cube.frame(3, 0), grid, rtol=1e-3, equal_nan=True)
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
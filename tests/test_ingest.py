@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+from ingest import ingest_telemetry
+
+TEMPS = ["Module_0_Group1_Value1", "Module_1_Group2_Value1", "Module_-1_Group1_Value1"]
+
+
+def write_csv(path, rows=537, drop=()):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(
+        {
+            "Time": pd.date_range("2024-05-01", periods=rows, freq="100ms"),
+            **{col: rng.uniform(20, 60, rows).round(2) for col in TEMPS},
+            "D4 DC Bus Current": rng.normal(50, 10, rows).round(2),
+            "D1 DC Bus Voltage": rng.normal(400, 5, rows).round(2),
+            "SOC PERCENT": np.linspace(100, 80, rows).round(2),
+            "Unused Channel": rng.normal(size=rows),
+        }
+    )
+    frame.loc[::13, TEMPS[0]] = 0  # missing readings
+    frame.drop(columns=list(drop)).to_csv(path, index=False)
+    return frame
+
+
+@pytest.mark.parametrize("mode", ["minmax", "stride"])
+def test_result_does_not_depend_on_the_chunks(tmp_path, monkeypatch, mode):
+    path = tmp_path / "run.csv"
+    write_csv(path)
+    results = []
+    for buckets in (1, 7, 10_000):
+        monkeypatch.setattr(ingest, "BUCKETS_PER_CHUNK", buckets)
+        results.append(ingest_telemetry(path, step=10, mode=mode))
+    for data, trends in results[1:]:
+        pd.testing.assert_frame_equal(data, results[0][0])
+        pd.testing.assert_frame_equal(trends, results[0][1])
+
+
+def test_projected_float32_columns(tmp_path):
+    path = tmp_path / "run.csv"
+    source = write_csv(path)
+    data, trends = ingest_telemetry(path, step=10)
+
+    assert "Unused Channel" not in data.columns
+    assert set(data.columns) == set(TEMPS) | {
+        "Time",
+        "D4 DC Bus Current",
+        "D1 DC Bus Voltage",
+        "SOC PERCENT",
+        "POWER",
+        "THERMAL LOSS (W)",
+    }
+    assert pd.api.types.is_datetime64_any_dtype(data["Time"])
+    assert (data.drop(columns="Time").dtypes == np.float32).all()
+    assert (trends.dtypes == np.float32).all()
+    assert len(trends) == len(source)
+    expected_power = (
+        source["D4 DC Bus Current"].astype(np.float32)
+        * source["D1 DC Bus Voltage"].astype(np.float32)
+    ).to_numpy()
+    np.testing.assert_allclose(trends["POWER"], expected_power, rtol=1e-6)
+
+
+def test_missing_optional_columns(tmp_path):
+    path = tmp_path / "run.csv"
+    write_csv(path, drop=["D1 DC Bus Voltage", "SOC PERCENT"])
+    data, trends = ingest_telemetry(path, step=10)
+    # No power without the bus voltage, no SOC trend
+    assert {"POWER", "THERMAL LOSS (W)", "SOC PERCENT"}.isdisjoint(data.columns)
+    assert list(trends.columns) == ["min_temp", "avg_temp", "max_temp", "fan_speed"]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from scipy.interpolate import griddata
+
+from interpolation import InterpolationOperator, get_operator, grid_bounds, slice_grid
+
+
+@pytest.fixture
+def layout():
+    rng = np.random.default_rng(1)
+    points = rng.uniform(0, 10, size=(24, 2))
+    grid_y, grid_z = slice_grid(grid_bounds(points[:, 0], points[:, 1]))
+    return points, grid_y, grid_z, rng.uniform(20, 60, size=(24, 5))
+
+
+@pytest.mark.parametrize("method", ["linear", "cubic"])
+def test_operator_matches_griddata(layout, method):
+    points, grid_y, grid_z, frames = layout
+    operator = InterpolationOperator(points, grid_y, grid_z, method)
+    grids = operator(frames)
+    assert grids.shape == grid_y.shape + (5,)
+    for f in range(frames.shape[1]):
+        expected = griddata(points, frames[:, f], (grid_y, grid_z), method=method)
+        np.testing.assert_array_equal(np.isnan(grids[..., f]), np.isnan(expected))
+        np.testing.assert_allclose(
+            grids[..., f], expected, atol=1e-5, rtol=0, equal_nan=True
+        )
+
+
+def test_single_frame(layout):
+    points, grid_y, grid_z, frames = layout
+    operator = InterpolationOperator(points, grid_y, grid_z)
+    np.testing.assert_allclose(
+        operator(frames[:, 0]), operator(frames)[..., 0], rtol=1e-12, equal_nan=True
+    )
+
+
+def test_unknown_method(layout):
+    points, grid_y, grid_z, _ = layout
+    with pytest.raises(ValueError):
+        InterpolationOperator(points, grid_y, grid_z, "nearest")
+
+
+def test_get_operator_restricted_to_valid_sensors(layout):
+    points, _, _, frames = layout
+    valid = np.ones(len(points), dtype=bool)
+    valid[[3, 7]] = False
+    bounds = grid_bounds(points[:, 0], points[:, 1])
+    grid_y, grid_z, operator = get_operator(
+        points[:, 0], points[:, 1], bounds=bounds, valid=valid
+    )
+    expected = griddata(
+        points[valid], frames[valid, 0], (grid_y, grid_z), method="cubic"
+    )
+    np.testing.assert_allclose(
+        operator(frames[valid, 0]), expected, atol=1e-5, equal_nan=True
+    )
@@ -0,0 +1,90 @@
+import struct
+
+import numpy as np
+
+import ld_reader
+from ld_reader import (
+    CHAN_FMT,
+    CHAN_SIZE,
+    HEAD_FMT,
+    read_channel_directory,
+    read_channels,
+)
+
+HEAD_SIZE = struct.calcsize(HEAD_FMT)
+
+
+def write_ld(path, channels):
+    """
+    Minimal .ld file: the header, the linked channel descriptors, then the
+    samples of each channel. `channels` are (name, dtype_a, dtype, samples,
+    shift, mul, scale, dec) tuples.
+    """
+    meta = [HEAD_SIZE + i * CHAN_SIZE for i in range(len(channels))]
+    data_ptr = HEAD_SIZE + len(channels) * CHAN_SIZE
+    records, blobs = [], []
+    for i, (name, dtype_a, dtype, samples, shift, mul, scale, dec) in enumerate(
+        channels
+    ):
+        records.append(
+            struct.pack(
+                CHAN_FMT,
+                meta[i - 1] if i else 0,
+                meta[i + 1] if i + 1 < len(channels) else 0,
+                data_ptr,
+                len(samples),
+                i,
+                dtype_a,
+                dtype,
+                10,
+                shift,
+                mul,
+                scale,
+                dec,
+                name.encode("ascii"),
+                name[:8].encode("ascii"),
+                b"C",
+            )
+        )
+        blobs.append(samples.tobytes())
+        data_ptr += samples.nbytes
+    with open(path, "wb") as f:
+        f.write(struct.pack(HEAD_FMT, 0x40, meta[0], HEAD_SIZE))
+        f.write(b"".join(records + blobs))
+
+
+def test_channels_scaled_and_read_on_demand(tmp_path, monkeypatch):
+    path = tmp_path / "run.ld"
+    write_ld(
+        path,
+        [
+            ("Temp", 0x03, 2, np.array([100, -50, 2000], "<i2"), 5, 2, 10, 1),
+            ("Current", 0x05, 4, np.array([123456, -7], "<i4"), 0, 1, 1, 3),
+            ("Speed", 0x07, 4, np.array([1.5, 2.25], "<f4"), 1, 1, 1, 0),
+            ("Temp", 0x07, 2, np.array([9.0], "<f2"), 0, 1, 1, 0),
+        ],
+    )
+    with open(path, "rb") as f:
+        channels = read_channel_directory(f)
+
+    # Duplicate names keep the first descriptor
+    assert list(channels) == ["Temp", "Current", "Speed"]
+    temp = channels["Temp"]
+    assert temp.dtype == np.dtype("<i2") and temp.data_len == 3 and temp.unit == "C"
+    assert channels["Current"].dtype == np.dtype("<i4")
+    assert channels["Speed"].dtype == np.dtype("<f4")
+
+    seeks = []
+    fromfile = np.fromfile
+    monkeypatch.setattr(
+        ld_reader.np,
+        "fromfile",
+        lambda f, **kwargs: seeks.append(f.tell()) or fromfile(f, **kwargs),
+    )
+    data = read_channels(path, channels, ["Temp", "Current"])
+    assert sorted(data) == ["Current", "Temp"]
+    assert seeks == [temp.data_ptr, channels["Current"].data_ptr]
+    # (raw / scale * 10^-dec + shift) * mul
+    np.testing.assert_allclose(data["Temp"], [12, 9, 50])
+    np.testing.assert_allclose(data["Current"], [123.456, -0.007])
+    assert data["Temp"].dtype == np.float64
@@ -0,0 +1,64 @@
+import multiprocessing
+
+import pytest
+
+from metrics import CALLBACK_PATH, CallbackMetrics, Histogram, cache_lookup, mark
+
+flask = pytest.importorskip("flask")
+
+
+def test_histogram_buckets():
+    histogram = Histogram((1, 5, 10))
+    for value in (0.5, 1, 3, 10, 50):
+        histogram.observe(value)
+    assert histogram.counts.tolist() == [2, 1, 1]
+    assert (histogram.count, histogram.sum) == (5, 64.5)
+    lines = list(histogram.lines("h", 'callback="a"'))
+    assert 'h_bucket{callback="a",le="10"} 4' in lines
+    assert 'h_bucket{callback="a",le="+Inf"} 5' in lines
+
+
+def served_app(metrics):
+    server = flask.Flask(__name__)
+
+    @metrics.instrument
+    def update(value):
+        cache_lookup(value % 2 == 0)
+        mark("figure")
+        return "x" * value
+
+    server.add_url_rule(
+        CALLBACK_PATH, "update", lambda: update(int(flask.request.args["v"]))
+    )
+    metrics.register(server)
+    return server
+
+
+def request_in_child(server, value):
+    server.test_client().get(f"{CALLBACK_PATH}?v={value}")
+
+
+def test_counters_are_shared_by_forked_workers():
+    metrics = CallbackMetrics()
+    server = served_app(metrics)
+    server.test_client().get(f"{CALLBACK_PATH}?v=100")
+
+    # Workers forked after the app is loaded, as with gunicorn preload_app
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=request_in_child, args=(server, value))
+        for value in (2001, 3000)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    (row,) = metrics.summary()
+    assert row["callback"] == "update" and row["requests"] == 3
+    assert row["mean_kb"] == pytest.approx((100 + 2001 + 3000) / 3 / 1024)
+    assert row["hit_rate"] == pytest.approx(2 / 3)
+    text = server.test_client().get("/metrics").get_data(as_text=True)
+    assert 'heatmap_callback_seconds_count{callback="update"} 3' in text
+    assert 'heatmap_callback_cache_misses_total{callback="update"} 1' in text
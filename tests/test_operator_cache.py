@@ -0,0 +1,38 @@
+import numpy as np
+
+from interpolation import OperatorCache, get_operator, operator_cache
+
+
+def test_lru_eviction_and_counters():
+    cache = OperatorCache(maxsize=2)
+    built = []
+
+    def build(key):
+        return lambda: built.append(key) or key
+
+    assert cache.get("a", build("a")) == "a"
+    assert cache.get("b", build("b")) == "b"
+    assert cache.get("a", build("a")) == "a"  # a is now the most recent
+    assert cache.get("c", build("c")) == "c"  # evicts b
+    assert cache.get("a", build("a")) == "a"
+    assert cache.get("b", build("b")) == "b"
+    assert built == ["a", "b", "c", "b"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 4, 2)
+    cache.clear()
+    assert cache.stats()["size"] == 0 and cache.stats()["hits"] == 0
+
+
+def test_operators_are_shared_per_valid_mask():
+    rng = np.random.default_rng(2)
+    y, z = rng.uniform(0, 10, size=(2, 12))
+    operator_cache.clear()
+    valid = np.ones(12, dtype=bool)
+    first = get_operator(y, z, valid=valid)
+    assert get_operator(y, z, valid=valid.copy()) is first
+    valid[5] = False
+    other = get_operator(y, z, valid=valid)
+    assert other is not first
+    assert get_operator(y, z, valid=valid) is other
+    assert operator_cache.stats()["misses"] == 2
+    assert operator_cache.stats()["hits"] == 2
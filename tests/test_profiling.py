@@ -0,0 +1,66 @@
+import cProfile
+import multiprocessing
+import pytest
+
+from profiling import CallbackProfiler
+
+dash = pytest.importorskip("dash")
+
+
+def test_saved_profiles_are_capped(tmp_path):
+    profiler = CallbackProfiler(str(tmp_path), max_profiles=3)
+    profile = cProfile.Profile()
+    profile.enable()
+    sum(range(100))
+    profile.disable()
+    saved = [profiler.save("update_3d_graph", profile) for _ in range(5)]
+    assert sorted({name.split(".")[0] for name in profiler.profiles()}) == saved[-3:]
+
+
+def test_arm_is_a_post_of_a_known_callback(tmp_path):
+    app = dash.Dash(__name__)
+    app.layout = dash.html.Div([dash.dcc.Input(id="x"), dash.html.Div(id="y")])
+
+    @app.callback(dash.Output("y", "children"), dash.Input("x", "value"))
+    def update_y(value):
+        return value
+
+    profiler = CallbackProfiler(str(tmp_path))
+    profiler.register(app)
+    client = app.server.test_client()
+    assert client.post("/_profile/arm?callback=unknown").status_code == 400
+    assert client.get("/_profile/arm?callback=update_y").status_code != 200
+    assert not profiler.armed
+    assert client.post("/_profile/arm?callback=update_y&count=2").status_code == 200
+    assert (
+        client.post("/_profile/arm", data={"callback": "y.children"}).status_code == 200
+    )
+    assert profiler.armed == {
+        "update_y": {"remaining": 2, "memory": False},
+        "y.children": {"remaining": 1, "memory": False},
+    }
+
+
+def take_in_child(profiler):
+    raise SystemExit(0 if profiler._take(["update_y"]) else 1)
+
+
+def test_armed_count_is_shared_by_forked_workers(tmp_path):
+    profiler = CallbackProfiler(str(tmp_path))
+    profiler.arm("update_y", count=2, memory=True)
+
+    # Workers forked after the app is loaded, as with gunicorn preload_app
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=take_in_child, args=(profiler,)) for _ in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sorted(worker.exitcode for worker in workers) == [0, 0, 1]
+    assert profiler.armed == {}
+
+    profiler.arm("update_y", count=1)
+    profiler.arm("update_y", count=0)
+    assert profiler.armed == {}
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from pyramid import MinMaxPyramid, zoom_window
+
+
+@pytest.fixture
+def pyramid():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(100_000, 2)).astype(np.float32)
+    values[61_234, 0] = 50.0
+    return MinMaxPyramid(np.arange(len(values)) / 10, values, ["a", "b"])
+
+
+def test_levels_shrink_down_to_the_point_budget(pyramid):
+    sizes = [len(x) for x, _ in pyramid.levels]
+    assert sizes[0] == 100_000
+    assert all(a > b for a, b in zip(sizes, sizes[1:]))
+    assert sizes[-1] <= pyramid.max_points // 4
+
+
+def test_every_level_keeps_the_extremes(pyramid):
+    for _, values in pyramid.levels:
+        assert values[:, 0].max() == 50.0
+        np.testing.assert_array_equal(values.min(0), pyramid.levels[0][1].min(0))
+
+
+def test_zoomed_view_is_full_rate_and_bounded(pyramid):
+    x, values = pyramid.view(6100, 6200)
+    inside = (x >= 6100) & (x <= 6200)
+    assert inside.sum() >= 1000  # every sample of the window
+    assert len(x) <= pyramid.max_points + len(pyramid.levels[-1][0])
+    assert (np.diff(x) >= 0).all()
+    assert values[inside, 0].max() == 50.0
+
+    x, _ = pyramid.view(0, 10_000)
+    assert ((x >= 0) & (x <= 10_000)).sum() <= pyramid.max_points
+
+
+def test_unzoomed_view_is_the_coarsest_level(pyramid):
+    x, _ = pyramid.view()
+    assert len(x) == len(pyramid.levels[-1][0])
+
+
+def test_zoom_window():
+    assert zoom_window(None) == (None, None)
+    assert zoom_window({"xaxis.range[0]": 1, "xaxis.range[1]": 2}) == (1, 2)
+    assert zoom_window({"xaxis.range": [3, 4]}, (1, 2)) == (3, 4)
+    assert zoom_window({"xaxis.autorange": True}, (1, 2)) == (None, None)
+    # Events not moving the x axis keep the window
+    for event in ({"yaxis.range[0]": 0, "yaxis.range[1]": 1}, {"dragmode": "pan"}):
+        assert zoom_window(event, (1, 2)) == (1, 2)
+    assert zoom_window({"autosize": True}, [1, 2]) == (1, 2)
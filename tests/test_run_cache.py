@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from run_cache import INDEX_FILE, _read_json, load_run, resolve_key
+
+
+def _source(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def _resolve(args):
+    return resolve_key(*args)
+
+
+def test_concurrent_lookups_keep_every_entry(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    sources = [_source(tmp_path, f"run{i}.csv", str(i)) for i in range(8)]
+    with ProcessPoolExecutor(4) as pool:
+        keys = list(
+            pool.map(
+                _resolve, [(s, f"run{i}", "", cache_dir) for i, s in enumerate(sources)]
+            )
+        )
+    index = _read_json(os.path.join(cache_dir, INDEX_FILE))
+    assert sorted(entry["key"] for entry in index.values()) == sorted(keys)
+
+
+def test_changed_source_drops_the_old_entry(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    source = _source(tmp_path, "run.csv", "a")
+    frame = pd.DataFrame({"x": np.arange(3.0)})
+    first = load_run(source, lambda: frame, "run", cache_dir=cache_dir)
+    old_path = first.attrs["run_cache"]["path"]
+    del first
+
+    with open(source, "w") as f:
+        f.write("changed")
+    second = load_run(source, lambda: frame * 2, "run", cache_dir=cache_dir)
+    assert second.attrs["run_cache"]["path"] != old_path
+    assert not os.path.exists(old_path)
+    np.testing.assert_array_equal(second["x"], [0, 2, 4])
+
+
+def test_missing_source(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        resolve_key(str(tmp_path / "missing.ld"), "run", cache_dir=str(tmp_path))
@@ -0,0 +1,63 @@
+import numpy as np
+
+from sensors import MODULE_X, SENSOR_YZ, SensorLayout, parse_column
+
+# Every group of modules 0-5, a module -1 column and an unknown group
+COLUMNS = [f"Module_{m}_Group{g}_Value1" for m in range(6) for g in range(1, 33)]
+COLUMNS += ["Module_-1_Group1_Value1", "Module_2_Group40_Value1"]
+
+
+def test_placed_sensors():
+    layout = SensorLayout(COLUMNS)
+    assert parse_column("Module_-1_Group3_Value7") == (-1, 3, 7)
+    # Module -1 and the unknown group have no position
+    assert len(layout.column_index) == 6 * 32
+    assert all(not COLUMNS[i].startswith("Module_-1") for i in layout.column_index)
+    assert COLUMNS.index("Module_2_Group40_Value1") not in layout.column_index
+    k = COLUMNS.index("Module_3_Group5_Value1")
+    sensor = list(layout.column_index).index(k)
+    assert (layout.x[sensor], layout.y[sensor], layout.z[sensor]) == (
+        MODULE_X[3],
+        *SENSOR_YZ[4],
+    )
+    assert layout.module[sensor] == 3
+    assert layout.z_top == max(z for _, z in SENSOR_YZ)
+
+
+def test_slices_of_module_ranges():
+    layout = SensorLayout(COLUMNS)
+    slices = layout.slices()
+    # One slice per module, holding its 32 sensors
+    assert [x_pos for x_pos, _ in slices] == MODULE_X
+    for x_pos, idx in slices:
+        assert len(idx) == 32 and (layout.x[idx] == x_pos).all()
+
+    # Ranges selecting the same modules share a key, sensors and slices
+    assert layout.range_key([5, 10]) == layout.range_key([4.2, 10.9]) == (1, 4)
+    assert layout.range_key(None) == (0, 6)
+    assert np.array_equal(layout.sensors([5, 10]), layout.sensors([4.2, 10.9]))
+    assert [x for x, _ in layout.slices([5, 10])] == [5.0, 7.5, 10.0]
+    assert len(layout.sensors([20, 30])) == 0 and layout.slices([20, 30]) == []
+
+
+def test_z_cuts():
+    layout = SensorLayout(COLUMNS)
+    assert layout.z_key(None) is None and layout.z_key(layout.z_top) is None
+    assert layout.z_key(6.5) == layout.z_key(6) == 6.0
+    assert layout.z_key(0.5) == float("-inf")
+    for x_pos, idx in layout.slices(None, 4):
+        assert len(idx) and (layout.z[idx] <= 4).all()
+    total = sum(len(idx) for _, idx in layout.slices(None, 4))
+    assert total == np.count_nonzero(layout.z <= 4)
+
+
+def test_equality():
+    layout = SensorLayout(COLUMNS)
+    same = SensorLayout(list(COLUMNS))
+    assert layout == same and hash(layout) == hash(same)
+    assert len({layout, same}) == 1
+    assert layout != SensorLayout(COLUMNS[:-3])
+    assert layout != SensorLayout(COLUMNS, width=0.5)
+    assert layout.geometry()["sensor_columns"] == [
+        COLUMNS[i] for i in layout.column_index
+    ]
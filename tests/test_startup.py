@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from startup import StartupReport
+
+flask = pytest.importorskip("flask")
+
+
+def test_phases_in_order():
+    report = StartupReport("test", start=time.perf_counter())
+    for phase in ("imports", "data load", "layout"):
+        time.sleep(0.001)
+        assert report.mark(phase) > 0
+    result = report.report()
+    assert [p["phase"] for p in result["phases"]] == ["imports", "data load", "layout"]
+    assert all(p["seconds"] >= 0 for p in result["phases"])
+    assert result["total"] == pytest.approx(
+        sum(p["seconds"] for p in result["phases"]), abs=1e-3
+    )
+
+
+def test_served_with_the_first_responses():
+    report = StartupReport("test", start=time.perf_counter())
+    report.mark("imports")
+    server = flask.Flask(__name__)
+    server.add_url_rule("/", "index", lambda: "page")
+    report.register(server)
+    client = server.test_client()
+    assert client.get("/").status_code == 200
+    first = report.firsts["/"]
+    client.get("/")
+
+    result = client.get("/_startup").get_json()
+    assert result["name"] == "test"
+    assert [p["phase"] for p in result["phases"]] == ["imports"]
+    # Only the first response of each page is kept
+    assert result["first"] == {"/": round(first, 4)}
+    assert first >= result["total"]
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from stats import masked_stats, module_stats, pack_stats, run_stats, split_modules
+
+
+def reference(temps, percentiles):
+    """Row statistics of the valid (> 0) readings with the numpy reductions."""
+    rows = {name: [] for name in ["min_temp", "max_temp", "avg_temp"]}
+    rows.update({f"p{p}_temp": [] for p in percentiles})
+    for row in temps:
+        valid = row[row > 0]
+        if not len(valid):
+            for values in rows.values():
+                values.append(0.0)
+            continue
+        rows["min_temp"].append(valid.min())
+        rows["max_temp"].append(valid.max())
+        rows["avg_temp"].append(valid.mean())
+        for p in percentiles:
+            rows[f"p{p}_temp"].append(np.percentile(valid, p))
+    return rows
+
+
+def test_masked_stats_match_numpy():
+    rng = np.random.default_rng(0)
+    temps = rng.uniform(20, 60, (200, 24)).astype(np.float32)
+    temps[rng.random(temps.shape) < 0.2] = 0
+    temps[rng.random(temps.shape) < 0.05] = np.nan
+    temps[7] = 0  # no valid reading
+    temps[8, 1:] = 0  # a single one
+
+    stats = masked_stats(temps, percentiles=(5, 50, 95))
+    for name, values in reference(temps, (5, 50, 95)).items():
+        np.testing.assert_allclose(stats[name], values, rtol=1e-5, err_msg=name)
+        assert stats[name].dtype == np.float32
+    np.testing.assert_array_equal(stats["valid_count"], (temps > 0).sum(axis=1))
+    assert stats["max_temp"][7] == 0 and stats["valid_count"][7] == 0
+    assert stats["min_temp"][8] == stats["max_temp"][8] == temps[8, 0]
+
+
+def test_masked_stats_without_percentiles():
+    rng = np.random.default_rng(1)
+    temps = rng.uniform(20, 60, (50, 10)).astype(np.float32)
+    temps[rng.random(temps.shape) < 0.3] = 0
+    with_p = masked_stats(temps)
+    without = masked_stats(temps, percentiles=(), empty=np.nan)
+    assert set(without) == {"min_temp", "max_temp", "avg_temp", "valid_count"}
+    for name in ("min_temp", "max_temp", "avg_temp"):
+        np.testing.assert_array_equal(
+            np.where(with_p["valid_count"] > 0, with_p[name], np.nan), without[name]
+        )
+
+
+def test_run_stats_round_trip():
+    rng = np.random.default_rng(2)
+    sensor_temps = rng.uniform(20, 60, (30, 12)).astype(np.float32)
+    sensor_temps[rng.random(sensor_temps.shape) < 0.1] = 0
+    modules = np.repeat([3, 1, 2], 4)
+
+    stats = run_stats(sensor_temps, sensor_temps, modules)
+    pd.testing.assert_frame_equal(
+        stats[pack_stats(sensor_temps).columns], pack_stats(sensor_temps)
+    )
+    np.testing.assert_array_equal(stats["timestamp"], np.arange(30))
+
+    split = split_modules(stats)
+    expected = module_stats(sensor_temps, modules)
+    assert sorted(split) == [1, 2, 3]
+    for module, frame in expected.items():
+        pd.testing.assert_frame_equal(split[module], frame, check_names=False)
+        np.testing.assert_allclose(
+            frame["max_temp"],
+            masked_stats(sensor_temps[:, modules == module])["max_temp"],
+        )